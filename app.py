@@ -1,8 +1,14 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, g, has_request_context, Response, stream_with_context
 import firebase_admin
 from firebase_admin import credentials, firestore
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from fractions import Fraction
+import base64
+import bisect
+import hashlib
 import json
+import logging
+import math
 import os
 import re
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,10 +20,25 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import threading
 import time
+from storage import FirestoreStorage, MemoryStorage, MemoizingStorage, ReadMemo
+from cache import TTLCache
+from mailer import SMTPConnectionPool, EmailOutbox
+from coordination import LeaseLock, FileLock
+from reminder_parser import parse_date_from_text, extract_title_from_message, extract_subject_from_message, ReminderClassifier, DEFAULT_KEYWORDS_FILE, SubjectCatalogueStore, DEFAULT_SUBJECTS_DIR, split_chat_export
+from logging_config import configure_logging
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Logging is configured from LOG_LEVEL / LOG_LEVELS / LOG_FORMAT (see logging_config.py)
+configure_logging()
+logger = logging.getLogger('app')
+auth_logger = logging.getLogger('app.auth')
+reminder_logger = logging.getLogger('app.reminders')
+email_logger = logging.getLogger('app.email')
+scheduler_logger = logging.getLogger('app.scheduler')
+social_logger = logging.getLogger('app.social')
+
 app = Flask(__name__)
 
 # Use environment variables for configuration
@@ -30,535 +51,806 @@ app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_ENV') == 'production'
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=int(os.getenv('SESSION_TIMEOUT_MINUTES', '30')))
 
-# Initialize Firebase using environment variables or service account file
+# Initialize storage. STORAGE_BACKEND=memory runs the app against an in-process
+# Firestore stand-in (no network); otherwise Firebase is configured from
+# environment variables or a service account file.
 db = None
-try:
-    # Try to use environment variables first
-    firebase_config = {
-        "type": "service_account",
-        "project_id": os.getenv('FIREBASE_PROJECT_ID'),
-        "private_key_id": os.getenv('FIREBASE_PRIVATE_KEY_ID'),
-        "private_key": os.getenv('FIREBASE_PRIVATE_KEY', '').replace('\\n', '\n'),
-        "client_email": os.getenv('FIREBASE_CLIENT_EMAIL'),
-        "client_id": os.getenv('FIREBASE_CLIENT_ID'),
-        "auth_uri": os.getenv('FIREBASE_AUTH_URI', 'https://accounts.google.com/o/oauth2/auth'),
-        "token_uri": os.getenv('FIREBASE_TOKEN_URI', 'https://oauth2.googleapis.com/token'),
-        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-        "client_x509_cert_url": os.getenv('FIREBASE_CLIENT_CERT_URL')
-    }
-    
-    # Check if all required Firebase environment variables are present
-    required_firebase_vars = ['FIREBASE_PROJECT_ID', 'FIREBASE_PRIVATE_KEY', 'FIREBASE_CLIENT_EMAIL']
-    if all(os.getenv(var) for var in required_firebase_vars):
-        print("Using Firebase configuration from environment variables")
-        cred = credentials.Certificate(firebase_config)
-        firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        print("Firebase initialized successfully from environment variables")
-    else:
-        # Fallback to service account file
-        if os.path.exists('firebase_key.json'):
-            print("Using Firebase configuration from service account file")
+storage = None
+if os.getenv('STORAGE_BACKEND', 'firestore').lower() == 'memory':
+    storage = MemoryStorage()
+    logger.info("Using in-memory storage backend (data is not persisted)")
+else:
+    try:
+        # Try to use environment variables first
+        firebase_config = {
+            "type": "service_account",
+            "project_id": os.getenv('FIREBASE_PROJECT_ID'),
+            "private_key_id": os.getenv('FIREBASE_PRIVATE_KEY_ID'),
+            "private_key": os.getenv('FIREBASE_PRIVATE_KEY', '').replace('\\n', '\n'),
+            "client_email": os.getenv('FIREBASE_CLIENT_EMAIL'),
+            "client_id": os.getenv('FIREBASE_CLIENT_ID'),
+            "auth_uri": os.getenv('FIREBASE_AUTH_URI', 'https://accounts.google.com/o/oauth2/auth'),
+            "token_uri": os.getenv('FIREBASE_TOKEN_URI', 'https://oauth2.googleapis.com/token'),
+            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+            "client_x509_cert_url": os.getenv('FIREBASE_CLIENT_CERT_URL')
+        }
+
+        # Check if all required Firebase environment variables are present
+        required_firebase_vars = ['FIREBASE_PROJECT_ID', 'FIREBASE_PRIVATE_KEY', 'FIREBASE_CLIENT_EMAIL']
+        if all(os.getenv(var) for var in required_firebase_vars):
+            logger.info("Using Firebase configuration from environment variables")
+            cred = credentials.Certificate(firebase_config)
+            firebase_admin.initialize_app(cred)
+            db = firestore.client()
+            logger.info("Firebase initialized successfully from environment variables")
+        elif os.path.exists('firebase_key.json'):
+            # Fallback to service account file
+            logger.info("Using Firebase configuration from service account file")
             cred = credentials.Certificate('firebase_key.json')
             firebase_admin.initialize_app(cred)
             db = firestore.client()
-            print("Firebase initialized successfully from service account file")
+            logger.info("Firebase initialized successfully from service account file")
         else:
-            print("ERROR: No Firebase configuration found!")
-            print("Please either:")
-            print("1. Set Firebase environment variables in .env file, or")
-            print("2. Place firebase_key.json in the project root")
-            exit(1)
-            
-except Exception as e:
-    print(f"ERROR: Firebase initialization failed: {e}")
-    exit(1)
+            raise RuntimeError(
+                "No Firebase configuration found. Set the Firebase environment variables in .env, "
+                "place firebase_key.json in the project root, or set STORAGE_BACKEND=memory"
+            )
+
+    except Exception as e:
+        logger.error("Firebase initialization failed: %s", e)
+        raise
 
-def get_user_profile_ref(username):
-    """Get Firebase reference for user profile"""
-    return db.collection('users').document('students').collection('profiles').document(username)
+    storage = FirestoreStorage(db)
 
-def get_user_data_ref(username):
-    """Get Firebase reference for user data (cgpa, attendance, timetable, reminders)"""
-    return db.collection('users').document('students').collection('profiles').document(username).collection('data')
+def get_request_read_memo():
+    """Per-request document memo stored on flask.g (None outside a request)"""
+    if not has_request_context():
+        return None
+    if 'read_memo' not in g:
+        g.read_memo = ReadMemo()
+    return g.read_memo
+
+# Within a request every document is fetched at most once; see X-Storage-Reads
+storage = MemoizingStorage(storage, get_request_read_memo)
+
+PROFILES_COLLECTION = 'users/students/profiles'
+
+# Read-through cache for get_user_data, keyed by (username, data_type). The
+# cache is per process: with several gunicorn workers a write on one worker is
+# only seen by the others once their entry expires, so keep the TTL short and
+# only serve plain reads from it.  Writes that depend on the current value go
+# through update_user_data, which reads straight from storage in a
+# transaction.  USER_DATA_CACHE_SIZE=0 or USER_DATA_CACHE_TTL=0 disables it.
+user_data_cache = TTLCache(
+    max_size=int(os.getenv('USER_DATA_CACHE_SIZE', '2048')),
+    ttl=float(os.getenv('USER_DATA_CACHE_TTL', '30'))
+)
+
+def get_user_profile_path(username):
+    """Get storage path for user profile"""
+    return f"{PROFILES_COLLECTION}/{username}"
+
+def get_user_data_path(username, data_type):
+    """Get storage path for user data (cgpa, attendance, timetable, reminders)"""
+    return f"{PROFILES_COLLECTION}/{username}/data/{data_type}"
 
 def find_user_by_username(username):
     """Find user by username in Firebase"""
     try:
-        user_ref = get_user_profile_ref(username)
-        user_doc = user_ref.get()
-        if user_doc.exists:
-            return user_doc.to_dict()
-        return None
+        return storage.get(get_user_profile_path(username))
     except Exception as e:
-        print(f"Error finding user {username}: {e}")
+        logger.error("Error finding user %s: %s", username, e)
         return None
 
 def find_user_by_email(email):
     """Find user by email in Firebase"""
     try:
-        users_ref = db.collection('users').document('students').collection('profiles')
-        query = users_ref.where('email', '==', email).limit(1)
-        docs = query.get()
-        
-        for doc in docs:
-            return doc.id, doc.to_dict()
+        for doc_id, data in storage.stream(PROFILES_COLLECTION, [('email', '==', email)], limit=1):
+            return doc_id, data
         return None, None
     except Exception as e:
-        print(f"Error finding user by email {email}: {e}")
+        logger.error("Error finding user by email %s: %s", email, e)
         return None, None
 
 def create_user_profile(username, user_data):
     """Create user profile in Firebase"""
     try:
-        user_ref = get_user_profile_ref(username)
-        user_ref.set(user_data)
-        print(f"User profile '{username}' created in Firebase")
+        storage.set(get_user_profile_path(username), user_data)
+        logger.info("User profile '%s' created in Firebase", username)
         return True
     except Exception as e:
-        print(f"Error creating user profile {username}: {e}")
+        logger.error("Error creating user profile %s: %s", username, e)
         return False
 
 def save_user_data(username, data_type, data):
     """Save user data (cgpa, attendance, timetable, reminders) to Firebase"""
     try:
-        data_ref = get_user_data_ref(username).document(data_type)
-        data_ref.set({
+        storage.set(get_user_data_path(username, data_type), {
             'data': data,
             'updated_at': datetime.now().isoformat()
         })
+        user_data_cache.set((username, data_type), data)
         return True
     except Exception as e:
-        print(f"Error saving {data_type} data for {username}: {e}")
+        # The write may or may not have landed, so don't trust the cached copy
+        user_data_cache.invalidate((username, data_type))
+        logger.error("Error saving %s data for %s: %s", data_type, username, e)
         return False
 
-def get_user_data(username, data_type):
-    """Get user data (cgpa, attendance, timetable, reminders) from Firebase"""
+def get_user_data(username, data_type, fresh=False):
+    """Get user data (cgpa, attendance, timetable, reminders) from Firebase; fresh=True skips the cache"""
     try:
-        data_ref = get_user_data_ref(username).document(data_type)
-        doc = data_ref.get()
-        if doc.exists:
-            return doc.to_dict().get('data', {})
-        return {}
+        cached = None if fresh else user_data_cache.get((username, data_type))
+        if cached is not None:
+            return cached
+        doc = storage.get(get_user_data_path(username, data_type))
+        data = doc.get('data', {}) if doc is not None else {}
+        user_data_cache.set((username, data_type), data)
+        return data
     except Exception as e:
-        print(f"Error getting {data_type} data for {username}: {e}")
+        logger.error("Error getting %s data for %s: %s", data_type, username, e)
         return {}
 
+def update_user_data(username, data_type, update_fn):
+    """Atomically read-modify-write user data, reading straight from storage.
+
+    update_fn receives the current data (never the per-process cache) and
+    returns the new data, or None to leave it unchanged.  It may run more
+    than once on contention.  Returns the stored data, or None if nothing
+    was written.
+    """
+    def apply(doc):
+        data = update_fn((doc or {}).get('data') or {})
+        if data is None:
+            return None
+        return {'data': data, 'updated_at': datetime.now().isoformat()}
+
+    try:
+        doc = storage.transact(get_user_data_path(username, data_type), apply)
+    except Exception:
+        user_data_cache.invalidate((username, data_type))
+        raise
+    if doc is None:
+        user_data_cache.invalidate((username, data_type))
+        return None
+    user_data_cache.set((username, data_type), doc['data'])
+    return doc['data']
+
+# Known corruption in stored due dates: "+00:00Z" and doubled offsets like "+00:00+00:00"
+DOUBLE_TZ_SUFFIX = re.compile(r'(\+\d{2}:\d{2})\+\d{2}:\d{2}$')
+
+def repair_due_date(due_date_str):
+    """Undo the known due_date corruptions; anything else is returned unchanged"""
+    if not isinstance(due_date_str, str) or not due_date_str:
+        return due_date_str
+    repaired = due_date_str.strip().replace('+00:00Z', 'Z')
+    return DOUBLE_TZ_SUFFIX.sub(r'\1', repaired)
+
 def remove_duplicate_reminders(reminders_list):
-    """Remove duplicate reminders based on title, type, and due_date"""
+    """Normalize due dates and drop reminders that repeat an earlier one's title, type and due time"""
     seen = set()
     unique_reminders = []
-    fixed_count = 0
-
     for reminder in reminders_list:
-        # Auto-fix corrupted dates before processing
-        due_date_str = reminder.get('due_date', '')
-        if due_date_str:
-            original_date = due_date_str
-
-            # Fix dates with timezone + Z like +00:00Z
-            if '+00:00Z' in due_date_str:
-                due_date_str = due_date_str.replace('+00:00Z', 'Z')
-                fixed_count += 1
-
-            # Fix dates with double timezone suffixes like +00:00+00:00
-            import re
-            double_tz_pattern = r'(\+\d{2}:\d{2})\+\d{2}:\d{2}$'
-            if re.search(double_tz_pattern, due_date_str):
-                due_date_str = re.sub(double_tz_pattern, r'\1', due_date_str)
-                fixed_count += 1
-
-            # Update the reminder if we fixed the date
-            if due_date_str != original_date:
-                print(f"DEBUG: Auto-fixed corrupted date for '{reminder.get('title', 'Unknown')}': {original_date} -> {due_date_str}")
-                reminder['due_date'] = due_date_str
-
-        # Create a unique key based on title, type, and due_date
-        key = (
-            reminder.get('title', '').strip().lower(),
-            reminder.get('type', '').strip().lower(),
-            due_date_str.strip()
-        )
-
+        normalize_reminder_due_date(reminder)
+        key = reminder_duplicate_key(reminder)
         if key not in seen:
             seen.add(key)
             unique_reminders.append(reminder)
-        else:
-            print(f"DEBUG: Removing duplicate reminder: {reminder.get('title')} ({reminder.get('type')})")
-
-    print(f"DEBUG: Removed {len(reminders_list) - len(unique_reminders)} duplicates")
-    if fixed_count > 0:
-        print(f"DEBUG: Auto-fixed {fixed_count} corrupted dates")
     return unique_reminders
 
-def is_duplicate_reminder(new_reminder, existing_reminders):
-    """Check if a new reminder is a duplicate of existing ones"""
-    new_key = (
-        new_reminder.get('title', '').strip().lower(),
-        new_reminder.get('type', '').strip().lower(),
-        new_reminder.get('due_date', '').strip()
-    )
-
-    for existing in existing_reminders:
-        existing_key = (
-            existing.get('title', '').strip().lower(),
-            existing.get('type', '').strip().lower(),
-            existing.get('due_date', '').strip()
-        )
-        if new_key == existing_key:
-            return True
-    return False
-
-def add_user_calculation(username, calc_type, calculation_data):
-    """Add calculation record to user's data"""
+def reminder_due_at(reminder):
+    """Get a reminder's due time as UTC epoch seconds, or None if it has no usable due date"""
+    due_at = reminder.get('due_at')
+    if due_at is not None:
+        return due_at
+    due_date = reminder.get('due_date')
+    if not isinstance(due_date, str):
+        return None
     try:
-        # Get existing calculations
-        calculations = get_user_data(username, 'calculations')
-        if not calculations:
-            calculations = {'cgpa': [], 'attendance': []}
-        
-        # Add new calculation
-        if calc_type not in calculations:
-            calculations[calc_type] = []
-        
-        calculation_record = {
-            'result': calculation_data,
-            'timestamp': datetime.now().isoformat()
-        }
-        calculations[calc_type].append(calculation_record)
-        
-        # Keep only last 50 records
-        calculations[calc_type] = calculations[calc_type][-50:]
-        
-        # Save back to Firebase
-        return save_user_data(username, 'calculations', calculations)
-    except Exception as e:
-        print(f"Error adding {calc_type} calculation for {username}: {e}")
-        return False
-
-def parse_time_from_text(text):
-    """Parse time from various text formats"""
-    import re
-
-    text = text.lower().strip()
-
-    # Time patterns
-    time_patterns = [
-        # 12-hour format with AM/PM (e.g., "11:59 PM", "11am", "1:30 pm")
-        (r'(\d{1,2}):?(\d{2})?\s*(am|pm)', lambda m: (
-            int(m.group(1)) % 12 + (12 if m.group(3) == 'pm' else 0),
-            int(m.group(2)) if m.group(2) else 0
-        )),
-        # O'clock variations (e.g., "12 o'clock", "12'o clock", "12 oclock")
-        (r'(\d{1,2})\s*[\'o]*\s*clock', lambda m: (int(m.group(1)) % 24, 0)),
-        # 24-hour format (e.g., "23:59", "1430")
-        (r'(\d{1,2}):(\d{2})', lambda m: (int(m.group(1)), int(m.group(2)))),
-        # 4-digit time format (e.g., "1159", "0800")
-        (r'\b(\d{4})\b', lambda m: (int(m.group(1)[:2]), int(m.group(1)[2:]))),
-        # Simple hour with AM/PM (e.g., "11am", "3pm")
-        (r'\b(\d{1,2})\s*(am|pm)', lambda m: (
-            int(m.group(1)) % 12 + (12 if m.group(2) == 'pm' else 0), 0
-        )),
-    ]
-
-    for pattern, converter in time_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                hour, minute = converter(match)
-                if 0 <= hour <= 23 and 0 <= minute <= 59:
-                    return hour, minute
-            except (ValueError, IndexError):
-                continue
+        return int(parse_reminder_due_date(due_date.strip()).timestamp())
+    except (TypeError, ValueError):
+        return None
 
+def due_date_field_error(data):
+    """Get an error message if data carries a due_date that is neither a string nor null"""
+    due_date = data.get('due_date')
+    if due_date is not None and not isinstance(due_date, str):
+        return 'due_date must be a date string'
     return None
 
-def parse_date_from_text(text):
-    """Parse date and time from various text formats including WhatsApp and email formats"""
-    import re
-    from datetime import datetime, timedelta
-
-    text = text.lower().strip()
-    today = datetime.now()
-
-    # Month name mappings for different formats
-    months = {
-        'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
-        'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6,
-        'july': 7, 'jul': 7, 'august': 8, 'aug': 8, 'september': 9, 'sep': 9, 'sept': 9,
-        'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12
-    }
-
-    # Enhanced date patterns
-    patterns = [
-        # DD/MM/YYYY, DD-MM-YYYY, DD.MM.YYYY
-        (r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})', lambda m: datetime(int(m.group(3)), int(m.group(2)), int(m.group(1)))),
-        # MM/DD/YYYY (US format)
-        (r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})', lambda m: datetime(int(m.group(3)), int(m.group(1)), int(m.group(2)))),
-        # DD/MM, DD-MM, DD.MM (current year)
-        (r'(\d{1,2})[/\-\.](\d{1,2})(?![/\-\.]\d)', lambda m: datetime(today.year, int(m.group(2)), int(m.group(1)))),
-        # YYYY-MM-DD (ISO format)
-        (r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})', lambda m: datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))),
-        # Month DD, YYYY or Month DD
-        (r'(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\s+(\d{1,2}),?\s*(\d{4})?',
-         lambda m: datetime(int(m.group(3)) if m.group(3) else today.year, months[m.group(1)], int(m.group(2)))),
-        # DD Month YYYY or DD Month
-        (r'(\d{1,2})\s+(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\s*(\d{4})?',
-         lambda m: datetime(int(m.group(3)) if m.group(3) else today.year, months[m.group(2)], int(m.group(1)))),
-        # DDth/st/nd/rd Month YYYY (e.g., "14th July", "1st March")
-        (r'(\d{1,2})(?:st|nd|rd|th)?\s+(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\s*(\d{4})?',
-         lambda m: datetime(int(m.group(3)) if m.group(3) else today.year, months[m.group(2)], int(m.group(1)))),
-        # Month DDth/st/nd/rd (e.g., "July 14th", "March 1st")
-        (r'(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\s+(\d{1,2})(?:st|nd|rd|th)?\s*(\d{4})?',
-         lambda m: datetime(int(m.group(3)) if m.group(3) else today.year, months[m.group(1)], int(m.group(2)))),
-    ]
-
-    # Enhanced relative dates
-    relative_patterns = [
-        (r'\btoday\b', lambda: today),
-        (r'\btomorrow\b', lambda: today + timedelta(days=1)),
-        (r'\byesterday\b', lambda: today - timedelta(days=1)),
-        (r'\bnext week\b', lambda: today + timedelta(days=7)),
-        (r'\bnext month\b', lambda: today + timedelta(days=30)),
-        (r'\bin (\d+) days?\b', lambda m: today + timedelta(days=int(m.group(1)))),
-        (r'\bin (\d+) weeks?\b', lambda m: today + timedelta(weeks=int(m.group(1)))),
-        (r'\bin a week\b', lambda: today + timedelta(days=7)),
-        (r'\bin a month\b', lambda: today + timedelta(days=30)),
-        (r'\bday after tomorrow\b', lambda: today + timedelta(days=2)),
-        (r'\bthis (monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
-         lambda m: today + timedelta(days=((['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'].index(m.group(1)) - today.weekday()) % 7))),
-        (r'\bnext (monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
-         lambda m: today + timedelta(days=(((['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'].index(m.group(1)) - today.weekday()) % 7) or 7))),
-    ]
-
-    # Parse date first
-    parsed_date = None
-
-    # Try relative patterns first
-    for pattern, converter in relative_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                # Check if the lambda expects arguments by checking parameter count
-                import inspect
-                sig = inspect.signature(converter)
-                if len(sig.parameters) > 0:
-                    parsed_date = converter(match)
-                else:
-                    parsed_date = converter()
-                break
-            except (ValueError, IndexError, TypeError):
-                continue
-
-    # If no relative date found, try day names
-    if not parsed_date:
-        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        for i, day in enumerate(days):
-            if f' {day}' in text or text.startswith(day):
-                days_ahead = i - today.weekday()
-                if days_ahead <= 0:  # Target day already happened this week
-                    days_ahead += 7
-                parsed_date = today + timedelta(days=days_ahead)
-                break
-
-    # If no relative date found, try date patterns
-    if not parsed_date:
-        for pattern, converter in patterns:
-            match = re.search(pattern, text)
-            if match:
-                try:
-                    parsed_date = converter(match)
-                    break
-                except (ValueError, IndexError):
-                    continue
-
-    # If no date found, default to today
-    if not parsed_date:
-        parsed_date = today
-
-    # Now parse time and combine with date
-    time_info = parse_time_from_text(text)
-    if time_info:
-        hour, minute = time_info
-        # Replace the time in the parsed date
-        parsed_date = parsed_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    else:
-        # If no time specified, default to 11:59 PM for assignments/projects, 9:00 AM for exams, 2:00 PM for labs
-        if any(keyword in text for keyword in ['assignment', 'homework', 'submit', 'due', 'project']):
-            parsed_date = parsed_date.replace(hour=23, minute=59, second=0, microsecond=0)
-        elif any(keyword in text for keyword in ['exam', 'test', 'quiz', 'examination']):
-            parsed_date = parsed_date.replace(hour=9, minute=0, second=0, microsecond=0)
-        elif any(keyword in text for keyword in ['lab', 'laboratory', 'labsheet', 'practical']):
-            parsed_date = parsed_date.replace(hour=14, minute=0, second=0, microsecond=0)  # 2:00 PM for labs
-        else:
-            # Default to end of day for other reminders
-            parsed_date = parsed_date.replace(hour=23, minute=59, second=0, microsecond=0)
-
-    return parsed_date
-
-def classify_reminder_type(text):
-    """Enhanced classification of reminder type based on text content with weighted scoring"""
-    text = text.lower()
-
-    # Enhanced keywords with weights
-    exam_keywords = {
-        'exam': 3, 'examination': 3, 'test': 2, 'quiz': 2, 'midterm': 3, 'final': 3,
-        'assessment': 2, 'evaluation': 2, 'viva': 3, 'oral': 2, 'written': 1,
-        'hall': 2, 'room': 1, 'invigilator': 3, 'duration': 2, 'marks': 1
-    }
-
-    assignment_keywords = {
-        'assignment': 3, 'homework': 3, 'task': 2, 'submit': 2, 'submission': 2,
-        'due': 2, 'deadline': 3, 'upload': 2, 'file': 1, 'document': 1,
-        'pdf': 1, 'word': 1, 'plagiarism': 2, 'turnitin': 2, 'late': 2,
-        'penalty': 2, 'extension': 2, 'work': 1
-    }
-
-    project_keywords = {
-        'project': 4, 'presentation': 3, 'seminar': 3, 'thesis': 3, 'research': 3,
-        'report': 2, 'paper': 2, 'study': 1, 'analysis': 2, 'survey': 2,
-        'experiment': 2, 'data': 1, 'findings': 2, 'conclusion': 2, 'abstract': 2,
-        'bibliography': 2, 'references': 2, 'slides': 2, 'ppt': 2, 'powerpoint': 2,
-        'demo': 2, 'prototype': 2, 'implementation': 2
-    }
-
-    lab_keywords = {
-        'lab': 4, 'laboratory': 4, 'labsheet': 4, 'lab sheet': 4, 'practical': 3,
-        'experiment': 3, 'observation': 2, 'procedure': 2, 'apparatus': 2,
-        'specimen': 2, 'sample': 2, 'microscope': 2, 'beaker': 2, 'flask': 2,
-        'titration': 3, 'reaction': 2, 'solution': 2, 'compound': 2, 'element': 2,
-        'circuit': 2, 'voltage': 2, 'current': 2, 'resistance': 2, 'oscilloscope': 2,
-        'manual': 2, 'protocol': 2, 'safety': 2, 'gloves': 2, 'goggles': 2
-    }
+def format_due_date(due_at):
+    """Canonical due_date string for an epoch: UTC ISO 8601 with a Z suffix"""
+    return datetime.fromtimestamp(due_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def normalize_reminder_due_date(reminder):
+    """Store the due date as due_at (UTC epoch seconds) plus its canonical due_date string.
+
+    Every write goes through here, so readers compare due_at instead of
+    re-parsing strings.  A due_date that can't be parsed is kept as it was,
+    with due_at None.
+    """
+    reminder.pop('due_at', None)
+    due_at = reminder_due_at(reminder)
+    reminder['due_at'] = due_at
+    if due_at is not None:
+        reminder['due_date'] = format_due_date(due_at)
+    return reminder
+
+def reminder_duplicate_key(reminder):
+    """Key for spotting duplicates: title, type and due time.
+
+    The due time is compared as an instant, so a stored UTC "...Z" value and
+    a freshly parsed local one for the same moment are the same key.
+    """
+    due_at = reminder_due_at(reminder)
+    return (
+        (reminder.get('title') or '').strip().lower(),
+        (reminder.get('type') or '').strip().lower(),
+        due_at if due_at is not None else str(reminder.get('due_date') or '').strip()
+    )
 
-    # Calculate weighted scores
-    exam_score = sum(weight for keyword, weight in exam_keywords.items() if keyword in text)
-    assignment_score = sum(weight for keyword, weight in assignment_keywords.items() if keyword in text)
-    project_score = sum(weight for keyword, weight in project_keywords.items() if keyword in text)
-    lab_score = sum(weight for keyword, weight in lab_keywords.items() if keyword in text)
+def reminder_key_hash(reminder):
+    """Stable id for a reminder's duplicate key, used as its index document id"""
+    return hashlib.sha1(json.dumps(reminder_duplicate_key(reminder)).encode('utf-8')).hexdigest()
+
+# Reminders live one document per reminder under
+# users/students/profiles/{username}/reminders/{reminder_id}. Older accounts
+# still have a single data/reminders document holding {'reminders': [...]};
+# it is migrated the first time the user's reminders are touched.
+reminder_list_cache = TTLCache(
+    max_size=int(os.getenv('USER_DATA_CACHE_SIZE', '2048')),
+    ttl=float(os.getenv('USER_DATA_CACHE_TTL', '30'))
+)
+
+def get_user_reminders_path(username):
+    """Get storage path for the user's reminders collection"""
+    return f"{PROFILES_COLLECTION}/{username}/reminders"
+
+def get_user_reminder_path(username, reminder_id):
+    """Get storage path for a single reminder"""
+    return f"{get_user_reminders_path(username)}/{reminder_id}"
+
+# Each distinct (title, type, due time) is claimed by one reminder through a
+# document at users/students/profiles/{username}/reminder_keys/{key hash}.
+# The owning reminder records the hash in its 'dedup_key' field, so saves
+# check for duplicates with one transaction instead of scanning the list.
+def get_reminder_key_path(username, key_hash):
+    """Get storage path for one duplicate-index entry"""
+    return f"{PROFILES_COLLECTION}/{username}/reminder_keys/{key_hash}"
+
+def claim_reminder_key(username, reminder):
+    """Make reminder the owner of its duplicate key; False if another reminder already owns it"""
+    key_hash = reminder_key_hash(reminder)
+    path = get_reminder_key_path(username, key_hash)
+    stale_owner = None
+    while True:
+        owners = []
 
-    # Context-based adjustments
-    if any(phrase in text for phrase in ['group project', 'team project', 'final project', 'project submission']):
-        project_score += 6  # Strong indicator for project
+        def claim(current):
+            owner = current.get('reminder_id') if current else None
+            owners.append(owner)
+            if owner not in (None, reminder['id'], stale_owner):
+                return None
+            return {'reminder_id': reminder['id'], 'claimed_at': time.time()}
 
-    if any(phrase in text for phrase in ['individual assignment', 'personal task', 'homework']):
-        assignment_score += 3
+        if storage.transact(path, claim) is not None:
+            reminder['dedup_key'] = key_hash
+            return True
+        # An owner whose save failed or that was removed outside these helpers
+        # never released the key; take it over
+        owner = owners[-1]
+        if owner == stale_owner or get_user_reminder(username, owner) is not None:
+            return False
+        stale_owner = owner
+
+def release_reminder_key_operations(username, previous, reminder=None):
+    """Get batch operations that drop previous's index entry once it no longer owns that key"""
+    key_hash = previous.get('dedup_key') if previous else None
+    if key_hash and (reminder is None or reminder.get('dedup_key') != key_hash):
+        return [('delete', get_reminder_key_path(username, key_hash), None)]
+    return []
+
+def sort_reminders(reminders_list):
+    """Order reminders by creation time, matching the legacy array order"""
+    reminders_list.sort(key=lambda r: (r.get('created_at') or '', str(r.get('id', ''))))
+    return reminders_list
+
+def migrate_legacy_reminders(username):
+    """Move reminders from the legacy array document into per-reminder documents"""
+    legacy = get_user_data(username, 'reminders')
+    if 'reminders' in legacy:
+        # A cached legacy copy may predate another worker's migration
+        legacy = get_user_data(username, 'reminders', fresh=True)
+    if 'reminders' not in legacy:
+        return 0
 
-    if any(phrase in text for phrase in ['final exam', 'midterm exam', 'entrance exam']):
-        exam_score += 5
+    operations = []
+    for reminder in legacy['reminders']:
+        reminder_id = str(reminder.get('id') or '')
+        if not reminder_id or '/' in reminder_id:
+            reminder_id = str(uuid.uuid4())
+        reminder['id'] = reminder_id
+        operations.append(('set', get_user_reminder_path(username, reminder_id), reminder))
+        operations.extend(reminder_schedule_operations(username, reminder_id, reminder))
+
+    # Leave a marker behind so the legacy document isn't migrated twice
+    marker = {'migrated_to': get_user_reminders_path(username), 'migrated_at': datetime.now().isoformat()}
+    operations.append(('set', get_user_data_path(username, 'reminders'), {
+        'data': marker,
+        'updated_at': marker['migrated_at']
+    }))
+    storage.batch_write(operations)
+    user_data_cache.set((username, 'reminders'), marker)
+    reminder_list_cache.invalidate(username)
+    reminder_logger.info("Migrated %s legacy reminders for %s", len(legacy['reminders']), username)
+    return len(legacy['reminders'])
+
+# Bumped whenever stored reminders need rewriting: 1 built the duplicate
+# index, 2 added due_at and canonical due_date strings
+REMINDER_FORMAT_VERSION = 2
+
+def upgrade_user_reminders(username, reminders_list):
+    """Rewrite reminders saved by older versions of the app (once per user per format version).
+
+    Due dates are normalized (normalize_reminder_due_date), later duplicates
+    of a reminder are deleted, and every survivor claims its duplicate key.
+    Returns the surviving reminders.
+    """
+    def current_version(marker):
+        return marker.get('version', 1 if marker.get('built_at') else 0)
+
+    if current_version(get_user_data(username, 'reminder_index')) >= REMINDER_FORMAT_VERSION:
+        return reminders_list
+    # A cached marker may predate another worker's upgrade
+    if current_version(get_user_data(username, 'reminder_index', fresh=True)) >= REMINDER_FORMAT_VERSION:
+        return reminders_list
+
+    operations = []
+    unique_reminders = []
+    owners = {}
+    for reminder in reminders_list:
+        original = dict(reminder)
+        normalize_reminder_due_date(reminder)
+        key_hash = reminder_key_hash(reminder)
+        if key_hash in owners:
+            operations.append(('delete', get_user_reminder_path(username, reminder['id']), None))
+            operations.extend(reminder_schedule_operations(username, reminder['id']))
+            if original.get('dedup_key') != key_hash:
+                operations.extend(release_reminder_key_operations(username, original))
+            continue
+        owners[key_hash] = reminder['id']
+        reminder['dedup_key'] = key_hash
+        unique_reminders.append(reminder)
+        operations.extend(release_reminder_key_operations(username, original, reminder))
+        operations.append(('set', get_reminder_key_path(username, key_hash), {'reminder_id': reminder['id'], 'claimed_at': time.time()}))
+        if reminder != original:
+            operations.append(('set', get_user_reminder_path(username, reminder['id']), reminder))
+            if reminder.get('due_at') != original.get('due_at'):
+                operations.extend(reminder_schedule_operations(username, reminder['id'], reminder))
+
+    # Old key documents are released before the new ones are claimed, in case a hash repeats
+    storage.batch_write(sorted(operations, key=lambda op: op[0] != 'delete'))
+    save_user_data(username, 'reminder_index', {
+        'version': REMINDER_FORMAT_VERSION,
+        'built_at': datetime.now().isoformat(),
+        'reminders': len(unique_reminders)
+    })
+    removed = len(reminders_list) - len(unique_reminders)
+    reminder_logger.info("Upgraded %s reminders for %s (removed %s duplicates)", len(unique_reminders), username, removed)
+    return unique_reminders
 
-    # Special case: "project submission" should always be project, not assignment
-    if 'project submission' in text:
-        project_score += 10  # Very strong indicator
+def load_user_reminders(username, fresh=False):
+    """Get all of a user's reminders as a list.
+
+    The cached list may miss another worker's recent writes, so anything that
+    writes reminders back from the list passes fresh=True to read storage.
+    """
+    cached = None if fresh else reminder_list_cache.get(username)
+    if cached is not None:
+        return cached
+    migrate_legacy_reminders(username)
+    reminders_list = [data for _, data in storage.stream(get_user_reminders_path(username))]
+    sort_reminders(reminders_list)
+    reminders_list = upgrade_user_reminders(username, reminders_list)
+    reminder_list_cache.set(username, reminders_list)
+    return reminders_list
+
+def _patch_cached_reminders(username, reminder_id, reminder=None):
+    """Apply a single-reminder write to the cached list (reminder=None deletes)"""
+    cached = reminder_list_cache.peek(username)
+    if cached is None:
+        return
+    cached = [r for r in cached if r.get('id') != reminder_id]
+    if reminder is not None:
+        cached.append(reminder)
+        sort_reminders(cached)
+    reminder_list_cache.replace(username, cached)
+
+def get_user_reminder(username, reminder_id):
+    """Get a single reminder, or None if it does not exist"""
+    migrate_legacy_reminders(username)
+    return storage.get(get_user_reminder_path(username, reminder_id))
+
+def save_user_reminder(username, reminder, previous=None):
+    """Create or overwrite a single reminder document and its notification schedule.
+
+    Claim the reminder's duplicate key first (claim_reminder_key); previous
+    is the stored version being replaced, whose key is released if it changed.
+    """
+    try:
+        normalize_reminder_due_date(reminder)
+        storage.batch_write(
+            [('set', get_user_reminder_path(username, reminder['id']), reminder)]
+            + reminder_schedule_operations(username, reminder['id'], reminder)
+            + release_reminder_key_operations(username, previous, reminder)
+        )
+        _patch_cached_reminders(username, reminder['id'], reminder)
+        return True
+    except Exception as e:
+        reminder_list_cache.invalidate(username)
+        reminder_logger.error("Error saving reminder %s for %s: %s", reminder.get('id'), username, e)
+        return False
 
-    # Time-based hints
-    if any(phrase in text for phrase in ['at', 'hall', 'room', 'venue', 'location']):
-        exam_score += 2  # Exams usually have specific venues
+def delete_user_reminder(username, reminder_id):
+    """Delete a single reminder document, its notification schedule and its duplicate-index entry"""
+    try:
+        previous = storage.get(get_user_reminder_path(username, reminder_id))
+        storage.batch_write(
+            [('delete', get_user_reminder_path(username, reminder_id), None)]
+            + reminder_schedule_operations(username, reminder_id)
+            + release_reminder_key_operations(username, previous)
+        )
+        _patch_cached_reminders(username, reminder_id)
+        return True
+    except Exception as e:
+        reminder_list_cache.invalidate(username)
+        reminder_logger.error("Error deleting reminder %s for %s: %s", reminder_id, username, e)
+        return False
 
-    if any(phrase in text for phrase in ['before', 'by', 'deadline', 'submit by']):
-        assignment_score += 2  # Assignments have submission deadlines
+def sync_user_reminders(username, original_reminders, updated_reminders):
+    """Write only the reminders that changed between two versions of the list"""
+    try:
+        original_by_id = {r.get('id'): r for r in original_reminders}
+        updated_ids = set()
+        operations = []
+        for reminder in updated_reminders:
+            updated_ids.add(reminder['id'])
+            previous = original_by_id.get(reminder['id'])
+            if previous != reminder:
+                normalize_reminder_due_date(reminder)
+                if reminder_key_hash(reminder) != (previous or {}).get('dedup_key'):
+                    # A reminder edited into a copy of another stays, just unindexed
+                    if not claim_reminder_key(username, reminder):
+                        reminder.pop('dedup_key', None)
+                operations.append(('set', get_user_reminder_path(username, reminder['id']), reminder))
+                operations.extend(reminder_schedule_operations(username, reminder['id'], reminder))
+                operations.extend(release_reminder_key_operations(username, previous, reminder))
+        for reminder_id, previous in original_by_id.items():
+            if reminder_id not in updated_ids:
+                operations.append(('delete', get_user_reminder_path(username, reminder_id), None))
+                operations.extend(reminder_schedule_operations(username, reminder_id))
+                operations.extend(release_reminder_key_operations(username, previous))
+        if operations:
+            storage.batch_write(operations)
+            reminder_list_cache.set(username, sort_reminders(list(updated_reminders)))
+        return True
+    except Exception as e:
+        reminder_list_cache.invalidate(username)
+        reminder_logger.error("Error syncing reminders for %s: %s", username, e)
+        return False
 
-    # Subject-specific patterns
-    if any(phrase in text for phrase in ['lab report', 'practical', 'experiment']):
-        lab_score += 3  # Changed from assignment_score to lab_score
+# Calculation history is stored one document per record under
+# users/students/profiles/{username}/calculations/{id}.  Ids start with the
+# record's creation time, so ordering by id is ordering by time and stays
+# stable when a record is edited.  Appending is a single write; trimming each
+# type back to CALCULATION_HISTORY_LIMIT records happens on a background
+# thread a few seconds later, so a burst of calculations costs one trim.
+CALCULATION_TYPES = ('cgpa', 'attendance')
+CALCULATION_HISTORY_LIMIT = int(os.getenv('CALCULATION_HISTORY_LIMIT', '50'))
+CALCULATION_TRIM_DELAY_SECONDS = float(os.getenv('CALCULATION_TRIM_DELAY_SECONDS', '5'))
+HISTORY_PAGE_DEFAULT_LIMIT = 10
+HISTORY_PAGE_MAX_LIMIT = 50
+
+history_trim_pending = set()
+history_trim_lock = threading.Lock()
+history_trim_wakeup = threading.Event()
+
+def get_user_calculations_path(username):
+    """Get storage path for the user's calculation history collection"""
+    return f"{PROFILES_COLLECTION}/{username}/calculations"
+
+def calculation_record_id(created_at):
+    """Make a time-ordered id for a calculation record created at the given datetime"""
+    return f"{created_at.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+def migrate_legacy_calculations(username):
+    """Move the legacy calculations document into per-record documents"""
+    legacy = get_user_data(username, 'calculations')
+    if legacy and 'migrated_to' not in legacy:
+        # A cached legacy copy may predate another worker's migration
+        legacy = get_user_data(username, 'calculations', fresh=True)
+    if not legacy or 'migrated_to' in legacy:
+        return 0
 
-    if any(phrase in text for phrase in ['defense', 'viva', 'presentation']):
-        project_score += 3
+    # Ids are derived from each record's type, position and timestamp, so two
+    # requests migrating at once (or a retry after a partial failure) write
+    # the same documents instead of duplicating the history
+    operations = []
+    for calc_type, records in legacy.items():
+        for index, record in enumerate(records if isinstance(records, list) else []):
+            if not isinstance(record, dict):
+                continue
+            try:
+                created_at = datetime.fromisoformat(record['timestamp'])
+            except (KeyError, TypeError, ValueError):
+                created_at = datetime(1970, 1, 1)
+            digest = hashlib.sha1(f"{calc_type}:{index}:{record.get('timestamp')}".encode('utf-8')).hexdigest()[:8]
+            record_id = f"{created_at.strftime('%Y%m%dT%H%M%S%f')}-{digest}"
+            operations.append(('set', f"{get_user_calculations_path(username)}/{record_id}", {
+                'id': record_id,
+                'type': calc_type,
+                'result': record.get('result'),
+                'timestamp': record.get('timestamp') or created_at.isoformat()
+            }))
+
+    marker = {'migrated_to': get_user_calculations_path(username), 'migrated_at': datetime.now().isoformat()}
+    operations.append(('set', get_user_data_path(username, 'calculations'), {
+        'data': marker,
+        'updated_at': marker['migrated_at']
+    }))
+    storage.batch_write(operations)
+    user_data_cache.set((username, 'calculations'), marker)
+    logger.info("Migrated %s legacy calculation records for %s", len(operations) - 1, username)
+    return len(operations) - 1
 
-    # Lab-specific context adjustments
-    if any(phrase in text for phrase in ['lab session', 'lab work', 'lab manual', 'lab procedure']):
-        lab_score += 5
+def add_user_calculation(username, calc_type, calculation_data):
+    """Add calculation record to user's data"""
+    return add_user_calculations(username, calc_type, [calculation_data])
 
-    if any(phrase in text for phrase in ['chemistry lab', 'physics lab', 'biology lab', 'computer lab']):
-        lab_score += 4
+def add_user_calculations(username, calc_type, results):
+    """Append calculation records to the user's history in one write"""
+    try:
+        migrate_legacy_calculations(username)
+        now = datetime.now()
+        timestamp = now.isoformat()
+        operations = []
+        for result in results:
+            record_id = calculation_record_id(now)
+            operations.append(('set', f"{get_user_calculations_path(username)}/{record_id}", {
+                'id': record_id,
+                'type': calc_type,
+                'result': result,
+                'timestamp': timestamp
+            }))
+        storage.batch_write(operations)
+        schedule_history_trim(username, calc_type)
+        update_user_trends(username, calc_type, results, timestamp)
+        return True
+    except Exception as e:
+        logger.error("Error adding %s calculation for %s: %s", calc_type, username, e)
+        return False
 
-    # Return type with highest score, with minimum threshold
-    max_score = max(exam_score, assignment_score, project_score, lab_score)
+# Trend lines over calculation history (CGPA per scale, attendance per
+# subject) are kept as running aggregates in calculation_trends/summary and
+# folded forward on every append, so /api/history/trends is a single read.
+# Each series keeps its last TREND_SERIES_LIMIT points with a moving average
+# over TREND_MOVING_AVERAGE_WINDOW.  Deleting or editing a record marks the
+# summary stale and the next read rebuilds it from the retained records.
+TREND_SERIES_LIMIT = int(os.getenv('TREND_SERIES_LIMIT', '30'))
+TREND_MOVING_AVERAGE_WINDOW = int(os.getenv('TREND_MOVING_AVERAGE_WINDOW', '3'))
+
+def get_user_trends_path(username):
+    """Get storage path for the user's calculation trend summary"""
+    return f"{PROFILES_COLLECTION}/{username}/calculation_trends/summary"
+
+def empty_trends():
+    """Trend summary for a user with no history"""
+    return {'cgpa': {}, 'attendance': {}, 'records': 0, 'updated_at': None}
+
+def append_trend_point(aggregate, value, timestamp):
+    """Fold one value into a series aggregate (count, latest, delta, moving average, bounded series)"""
+    series = aggregate['series']
+    window = [point['value'] for point in series[-(TREND_MOVING_AVERAGE_WINDOW - 1):]] if TREND_MOVING_AVERAGE_WINDOW > 1 else []
+    window.append(value)
+    series.append({
+        'timestamp': timestamp,
+        'value': round(value, 2),
+        'moving_average': round(sum(window) / len(window), 2)
+    })
+    del series[:-TREND_SERIES_LIMIT]
+    aggregate['delta'] = round(value - aggregate['latest'], 2) if aggregate['latest'] is not None else None
+    aggregate['latest'] = round(value, 2)
+    aggregate['count'] += 1
+
+def apply_calculation_to_trends(trends, calc_type, result, timestamp):
+    """Fold one calculation result into the trend summary in place"""
+    if not isinstance(result, dict):
+        return trends
+    if calc_type == 'cgpa':
+        try:
+            value = float(result['cgpa'])
+            scale = int(result.get('scale', 10))
+        except (KeyError, TypeError, ValueError):
+            return trends
+        aggregate = trends['cgpa'].setdefault(str(scale), {
+            'count': 0, 'latest': None, 'delta': None, 'best': None, 'series': []
+        })
+        append_trend_point(aggregate, value, timestamp)
+        lower_is_better = scale in GPA_SCALES and GPA_SCALES[scale]['best'] < GPA_SCALES[scale]['worst']
+        if aggregate['best'] is None or (value < aggregate['best'] if lower_is_better else value > aggregate['best']):
+            aggregate['best'] = round(value, 2)
+        # SGPA progression of the latest calculation, semester by semester
+        sgpas = [semester.get('sgpa') for semester in result.get('semesters', []) if isinstance(semester, dict)]
+        aggregate['sgpa_progression'] = sgpas
+        aggregate['sgpa_deltas'] = [round(later - earlier, 2) for earlier, later in zip(sgpas, sgpas[1:])]
+    elif calc_type == 'attendance':
+        try:
+            value = float(result['current_percent'])
+        except (KeyError, TypeError, ValueError):
+            return trends
+        name = str(result.get('subject_name') or 'Subject').strip() or 'Subject'
+        aggregate = trends['attendance'].setdefault(name.casefold(), {
+            'subject_name': name, 'count': 0, 'latest': None, 'delta': None, 'lowest': None, 'series': []
+        })
+        append_trend_point(aggregate, value, timestamp)
+        aggregate['lowest'] = round(value if aggregate['lowest'] is None else min(aggregate['lowest'], value), 2)
+        aggregate['status'] = result.get('status')
+        aggregate['min_required'] = result.get('min_required')
+    trends['records'] += 1
+    trends['updated_at'] = timestamp
+    return trends
+
+def update_user_trends(username, calc_type, results, timestamp):
+    """Fold newly appended calculations into the user's trend summary"""
+    def fold(current):
+        if current is None or current.get('stale'):
+            # Leave it for the next read to rebuild from history, but count
+            # the change so a rebuild already in progress knows it missed it
+            return {**(current or {}), 'stale': True, 'changes': (current or {}).get('changes', 0) + 1}
+        for result in results:
+            apply_calculation_to_trends(current, calc_type, result, timestamp)
+        return current
 
-    if max_score == 0:
-        return 'assignment'  # Default fallback
+    try:
+        storage.transact(get_user_trends_path(username), fold)
+    except Exception as e:
+        logger.error("Error updating calculation trends for %s: %s", username, e)
+        mark_user_trends_stale(username)
 
-    if exam_score == max_score:
-        return 'exam'
-    elif assignment_score == max_score:
-        return 'assignment'
-    elif project_score == max_score:
-        return 'project'
-    else:
-        return 'lab'
-
-def extract_title_from_message(text, reminder_type):
-    """Extract a meaningful title from the message text"""
-    import re
-
-    text = text.strip()
-    lines = text.split('\n')
-
-    # Remove common email/message prefixes
-    first_line = lines[0] if lines else text
-    first_line = re.sub(r'^(re:|fwd:|subject:|from:|to:)', '', first_line, flags=re.IGNORECASE).strip()
-
-    print(f"🔍 DEBUG: extract_title_from_message called with text: '{text}', type: '{reminder_type}'")
-
-    # Look for subject-specific patterns (ordered by priority)
-    subject_patterns = [
-        # Lab-specific patterns (highest priority for lab reminders)
-        r'having\s+([A-Z][A-Z\s]*?)\s+lab',  # "having ELECTRONICS lab" - captures just the subject
-        r'([A-Z][A-Z\s]*?)\s+lab(?:\s+on|\s+at|\s+session|\s*$)',  # "ELECTRONICS LAB" - captures just the subject
-        r'([A-Z][A-Z\s]*?)\s+laboratory',  # "ELECTRONICS laboratory"
-        r'([A-Z][A-Z\s]*?)\s+practical',  # "ELECTRONICS practical"
-
-        # Pattern for "FOR [SUBJECT]" - most common in academic messages
-        r'for\s+([\w\s]+?)(?:\s+on|\s+at|\s*$)',
-        r'in\s+([\w\s]+?)(?:\s+on|\s+at|\s*$)',
-        # Pattern for "your [SUBJECT] assignment/exam/project" - extract just the subject
-        r'your\s+([\w\s]+?)\s+(assignment|homework|task|exam|test|quiz|project|presentation)',
-        # Pattern for "submit your [SUBJECT] assignment" - extract just the subject
-        r'submit\s+your\s+([\w\s]+?)\s+(assignment|homework|task|exam|test|quiz|project)',
-        # Pattern for "[SUBJECT] assignment/exam/project"
-        r'([\w\s]+?)\s+(assignment|homework|task|exam|test|quiz|project|presentation)',
-        # Pattern for "[SUBJECT] is due"
-        r'([\w\s]+?)\s+is\s+due',
-        # Pattern for "[SUBJECT] submission"
-        r'([\w\s]+?)\s+submission',
-        # Pattern for general "submit [SUBJECT]" (fallback)
-        r'submit\s+([\w\s]+?)(?:\s+on|\s+at|\s*$)',
-    ]
+def mark_user_trends_stale(username):
+    """Make the next trends read rebuild the summary from history"""
+    def invalidate(current):
+        return {**(current or {}), 'stale': True, 'changes': (current or {}).get('changes', 0) + 1}
 
-    for i, pattern in enumerate(subject_patterns):
-        print(f"🔍 DEBUG: Trying pattern {i+1}: '{pattern}' on text: '{text}'")
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            title = match.group(1).strip()
-            print(f"✅ DEBUG: Pattern '{pattern}' matched: '{title}' from text: '{text}'")
-            # Clean up the title
-            title = re.sub(r'\b(the|a|an)\b', '', title, flags=re.IGNORECASE).strip()
-            if len(title) > 2 and len(title) < 50:
-                # For lab reminders, add "LAB" suffix if not already present
-                if reminder_type == 'lab' and 'lab' not in title.lower():
-                    final_title = f"{title.upper()} LAB"
-                    print(f"🧪 DEBUG: Lab title created: '{final_title}'")
-                    return final_title
-                print(f"📝 DEBUG: Title extracted: '{title.upper()}'")
-                return title.upper()  # Return in uppercase for consistency
-        else:
-            print(f"❌ DEBUG: Pattern {i+1} did not match")
+    try:
+        storage.transact(get_user_trends_path(username), invalidate)
+    except Exception as e:
+        logger.error("Error invalidating calculation trends for %s: %s", username, e)
+
+def rebuild_user_trends(username, attempts=3):
+    """Recompute the trend summary from the stored history records.
+
+    Every append, edit or delete made while the summary is stale bumps its
+    'changes' counter.  The rebuilt summary is only stored if the counter
+    is unchanged since before the history was read, so a change that lands
+    mid-rebuild is never overwritten; the rebuild retries instead, and if
+    history keeps changing the summary stays stale for the next read.
+    """
+    path = get_user_trends_path(username)
+    trends = empty_trends()
+    for _ in range(attempts):
+        current = storage.get(path)
+        if current is not None and not current.get('stale'):
+            return current
+        changes = (current or {}).get('changes', 0)
+
+        trends = empty_trends()
+        for _, record in storage.stream(get_user_calculations_path(username), order_by='id'):
+            apply_calculation_to_trends(trends, record.get('type'), record.get('result'), record.get('timestamp'))
+
+        def store(latest):
+            if latest is not None and not latest.get('stale'):
+                # Another rebuild finished first
+                return None
+            if (latest or {}).get('changes', 0) != changes:
+                return None
+            return trends
+
+        if storage.transact(path, store) is not None:
+            return trends
+    logger.debug("Calculation history for %s kept changing during the trends rebuild", username)
+    return trends
+
+# Filtering on type while ordering/ranging on id needs the composite indexes
+# in firestore.indexes.json (type + id, both directions)
+def list_user_calculations(username, calc_type, limit, before=None):
+    """Get up to `limit` records of one type, newest first, older than the `before` id if given"""
+    filters = [('type', '==', calc_type)]
+    if before:
+        filters.append(('id', '<', before))
+    return [data for _, data in storage.stream(get_user_calculations_path(username), filters,
+                                               limit=limit, order_by='id', descending=True)]
+
+def find_user_calculations(username, calc_type, record_id=None, timestamp=None):
+    """Find a user's records of one type by id or by their timestamp string"""
+    if record_id:
+        record = storage.get(f"{get_user_calculations_path(username)}/{record_id}")
+        return [record] if record and record.get('type') == calc_type else []
+    return [data for _, data in storage.stream(get_user_calculations_path(username),
+                                               [('type', '==', calc_type), ('timestamp', '==', timestamp)])]
+
+def schedule_history_trim(username, calc_type):
+    """Ask the background trimmer to cut this history back to CALCULATION_HISTORY_LIMIT"""
+    with history_trim_lock:
+        history_trim_pending.add((username, calc_type))
+    history_trim_wakeup.set()
+
+def trim_user_calculations(username, calc_type):
+    """Delete all but the newest CALCULATION_HISTORY_LIMIT records of one type"""
+    kept = list_user_calculations(username, calc_type, CALCULATION_HISTORY_LIMIT)
+    if len(kept) < CALCULATION_HISTORY_LIMIT:
+        return 0
+    expired = storage.stream(get_user_calculations_path(username),
+                             [('type', '==', calc_type), ('id', '<', kept[-1]['id'])])
+    if expired:
+        storage.batch_write([('delete', f"{get_user_calculations_path(username)}/{doc_id}", None)
+                             for doc_id, _ in expired])
+    return len(expired)
+
+def background_history_trimmer():
+    """Background thread that applies history retention after appends"""
+    while True:
+        history_trim_wakeup.wait()
+        # Let a burst of appends collect before trimming
+        time.sleep(CALCULATION_TRIM_DELAY_SECONDS)
+        history_trim_wakeup.clear()
+        with history_trim_lock:
+            pending = list(history_trim_pending)
+            history_trim_pending.clear()
+        for username, calc_type in pending:
+            try:
+                trimmed = trim_user_calculations(username, calc_type)
+                if trimmed:
+                    logger.debug("Trimmed %s old %s records for %s", trimmed, calc_type, username)
+            except Exception as e:
+                logger.error("Error trimming %s history for %s: %s", calc_type, username, e)
 
-    # Fallback: use first meaningful sentence
-    sentences = re.split(r'[.!?]', first_line)
-    for sentence in sentences:
-        sentence = sentence.strip()
-        if len(sentence) > 10 and len(sentence) < 100:
-            # Remove common words at the beginning
-            sentence = re.sub(r'^(hi|hello|dear|students|reminder|notice|important)', '', sentence, flags=re.IGNORECASE).strip()
-            if sentence:
-                return sentence[:50] + ('...' if len(sentence) > 50 else '')
+# Keyword weights for classifying pasted messages live in
+# reminder_keywords.json (or REMINDER_KEYWORDS_FILE), so they can be tuned
+# without touching code
+reminder_classifier = ReminderClassifier.from_file(os.getenv('REMINDER_KEYWORDS_FILE', DEFAULT_KEYWORDS_FILE))
 
-    # Final fallback
-    if len(first_line) > 10:
-        return first_line[:50] + ('...' if len(first_line) > 50 else '')
+# Subject names, abbreviations and course codes per college, from
+# subject_catalogues/ (or SUBJECT_CATALOGUE_DIR); edited files are picked up
+# within SUBJECT_CATALOGUE_CHECK_SECONDS
+subject_catalogues = SubjectCatalogueStore(
+    os.getenv('SUBJECT_CATALOGUE_DIR', DEFAULT_SUBJECTS_DIR),
+    check_interval=int(os.getenv('SUBJECT_CATALOGUE_CHECK_SECONDS', '30'))
+)
 
-    return f"{reminder_type.title()} Reminder"
+def classify_reminder_type(text):
+    """Classify a message as exam, assignment, project or lab by weighted keywords"""
+    return reminder_classifier.classify(text)
+
+# SMTP sessions are shared across emails; created on first send so the
+# SMTP_* settings are read the same way send_email_reminder always read them
+smtp_pool = None
+smtp_pool_lock = threading.Lock()
+
+def get_smtp_pool():
+    """Get the shared SMTP connection pool, creating it on first use"""
+    global smtp_pool
+    with smtp_pool_lock:
+        if smtp_pool is None:
+            smtp_pool = SMTPConnectionPool(
+                os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+                int(os.getenv('SMTP_PORT', '587')),
+                username=os.getenv('SENDER_EMAIL'),
+                password=os.getenv('SENDER_PASSWORD'),
+                size=int(os.getenv('SMTP_POOL_SIZE', '2')),
+                use_tls=os.getenv('SMTP_USE_TLS', 'true').lower() != 'false'
+            )
+        return smtp_pool
 
 def send_email_reminder(user_email, reminder_data):
     """Send email reminder to user"""
@@ -569,19 +861,15 @@ def send_email_reminder(user_email, reminder_data):
         sender_email = os.getenv('SENDER_EMAIL')
         sender_password = os.getenv('SENDER_PASSWORD')
 
-        print(f"🔧 DEBUG: Email config - Server: {smtp_server}, Port: {smtp_port}")
-        print(f"📧 DEBUG: Sender email: {sender_email}")
-        print(f"🔑 DEBUG: Password configured: {'Yes' if sender_password else 'No'}")
-        print(f"📨 DEBUG: Recipient: {user_email}")
-        print(f"🔍 DEBUG: Password length: {len(sender_password) if sender_password else 0}")
-        print(f"🔍 DEBUG: Password starts with: {sender_password[:4] if sender_password else 'None'}...")
+        email_logger.debug("📨 Sending to %s via %s:%s as %s (password configured: %s)",
+                           user_email, smtp_server, smtp_port, sender_email, bool(sender_password))
 
         if not sender_email or not sender_password:
-            print("❌ Email credentials not configured in .env file")
+            email_logger.error("❌ Email credentials not configured in .env file")
             return False
 
         if sender_email == 'your-system-email@gmail.com':
-            print("❌ Email credentials are still placeholder values")
+            email_logger.error("❌ Email credentials are still placeholder values")
             return False
 
         # Create message
@@ -611,206 +899,416 @@ def send_email_reminder(user_email, reminder_data):
 
         msg.attach(MIMEText(body, 'plain'))
 
-        # Send email
-        print(f"DEBUG: Attempting to connect to {smtp_server}:{smtp_port}")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        print("DEBUG: Connected to SMTP server")
-
-        server.starttls()
-        print("DEBUG: Started TLS")
-
-        server.login(sender_email, sender_password)
-        print("DEBUG: Logged in successfully")
-
-        text = msg.as_string()
-        server.sendmail(sender_email, user_email, text)
-        print("DEBUG: Email sent successfully")
-
-        server.quit()
-        print(f"✅ Email reminder sent to {user_email} for: {reminder_data['title']}")
+        # Send email over a pooled session (connects and logs in only when needed)
+        get_smtp_pool().send(sender_email, user_email, msg.as_string())
+        email_logger.info("✅ Email reminder sent to %s for: %s", user_email, reminder_data['title'])
         return True
 
     except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ SMTP Authentication Error: {e}")
-        print("❌ This usually means:")
-        print("   - Wrong email/password")
-        print("   - App password expired")
-        print("   - 2FA not enabled on Gmail")
+        email_logger.error("❌ SMTP Authentication Error: %s (wrong email/password, expired app password, "
+                           "or 2FA not enabled on Gmail)", e)
         return False
     except smtplib.SMTPConnectError as e:
-        print(f"❌ SMTP Connection Error: {e}")
-        print("❌ This usually means:")
-        print("   - Network/firewall blocking SMTP")
-        print("   - Wrong SMTP server/port")
+        email_logger.error("❌ SMTP Connection Error: %s (network/firewall blocking SMTP, or wrong "
+                           "SMTP server/port)", e)
         return False
     except smtplib.SMTPException as e:
-        print(f"❌ SMTP Error: {e}")
-        print(f"❌ SMTP Error type: {type(e).__name__}")
+        email_logger.error("❌ SMTP Error (%s): %s", type(e).__name__, e)
         return False
     except Exception as e:
-        print(f"❌ General Error sending email reminder: {e}")
-        print(f"❌ Error type: {type(e).__name__}")
-        import traceback
-        print(f"❌ Full traceback: {traceback.format_exc()}")
+        email_logger.exception("❌ General Error sending email reminder: %s", e)
         return False
 
-def check_and_send_email_reminders():
-    """Check for reminders that need email notifications and send them"""
-    try:
-        print("🔔 Starting automatic email reminder check...")
-        notifications_sent = 0
-
-        # Get all users from Firebase
-        users_ref = db.collection('users').document('students').collection('profiles')
-        users = users_ref.get()
+# Emails go out from background workers, so neither HTTP requests nor the
+# scheduler wait on SMTP. Failed sends are retried with exponential backoff.
+email_outbox = EmailOutbox(
+    send_email_reminder,
+    workers=int(os.getenv('EMAIL_OUTBOX_WORKERS', '2')),
+    max_queue=int(os.getenv('EMAIL_OUTBOX_MAX_QUEUE', '1000')),
+    max_retries=int(os.getenv('EMAIL_MAX_RETRIES', '4')),
+    retry_base=int(os.getenv('EMAIL_RETRY_BASE_SECONDS', '30')),
+    rate_per_minute=int(os.getenv('EMAIL_RATE_PER_MINUTE', '20'))
+)
+
+# Email notifications are driven by a schedule index instead of scanning every
+# user's reminders. Saving a reminder writes one notification_schedule entry
+# per notification type with the epoch time it should fire at; the scheduler
+# thread sleeps until the earliest entry is due.
+NOTIFICATION_SCHEDULE_COLLECTION = 'notification_schedule'
+NOTIFICATION_TYPES = ('24_hour', '1_hour', 'overdue')
+# Upper bound on how long the scheduler sleeps, so entries written by other
+# processes are picked up promptly
+SCHEDULER_MAX_SLEEP_SECONDS = int(os.getenv('SCHEDULER_MAX_SLEEP_SECONDS', '60'))
+# Once a notification is queued its entry is pushed this far into the future.
+# The outbox deletes the entry after a successful send; if the email is
+# abandoned (or the process dies) the entry simply fires again.
+OUTBOX_VISIBILITY_SECONDS = int(os.getenv('OUTBOX_VISIBILITY_SECONDS', str(15 * 60)))
+# Overdue notifications are only sent this long after the due time, and the
+# sent-notification ledger forgets a reminder at the same point
+OVERDUE_NOTIFY_WINDOW_SECONDS = 7 * 24 * 3600
+
+# India has no DST, so a fixed offset is exact
+IST = timezone(timedelta(hours=5, minutes=30))
+
+notification_scheduler_wakeup = threading.Event()
+notification_scheduler_state = {'next_wake_at': 0.0}
+
+def parse_reminder_due_date(due_date_str):
+    """Parse a stored due_date into an aware datetime (naive values are IST)"""
+    cleaned_date_str = repair_due_date(due_date_str)
+    if cleaned_date_str.endswith('Z'):
+        cleaned_date_str = cleaned_date_str[:-1] + '+00:00'
+    due_date = datetime.fromisoformat(cleaned_date_str)
+    if due_date.tzinfo is None:
+        due_date = due_date.replace(tzinfo=IST)
+    return due_date
+
+def notification_window(notification_type, due_at):
+    """Get (fire_at, expires_at) epoch seconds for a notification type"""
+    if notification_type == '24_hour':
+        return due_at - 24 * 3600, due_at - 23 * 3600
+    if notification_type == '1_hour':
+        return due_at - 3600, due_at - 1800
+    return due_at, due_at + OVERDUE_NOTIFY_WINDOW_SECONDS
+
+def get_schedule_entry_path(username, reminder_id, notification_type):
+    """Get storage path for one notification schedule entry"""
+    return f"{NOTIFICATION_SCHEDULE_COLLECTION}/{username}_{reminder_id}_{notification_type}"
+
+def get_sent_notifications_path(username):
+    """Get storage path for the user's sent-notification ledger"""
+    return f"{PROFILES_COLLECTION}/{username}/sent_notifications"
+
+def reminder_schedule_operations(username, reminder_id, reminder=None, now=None):
+    """Get batch operations that re-index a reminder's notifications (reminder=None unschedules it)"""
+    now = time.time() if now is None else now
+    operations = []
+    due_at = None
+    if reminder is None or reminder.get('completed', False):
+        # Nothing more can be sent for it, so its ledger entry can go too
+        operations.append(('delete', get_sent_notification_path(username, reminder_id), None))
+    elif reminder.get('due_date'):
+        due_at = reminder_due_at(reminder)
+        if due_at is None:
+            scheduler_logger.warning("⚠️ Not scheduling reminder %s: bad due_date %r", reminder_id, reminder.get('due_date'))
+
+    for notification_type in NOTIFICATION_TYPES:
+        path = get_schedule_entry_path(username, reminder_id, notification_type)
+        if due_at is None:
+            operations.append(('delete', path, None))
+            continue
+        fire_at, expires_at = notification_window(notification_type, due_at)
+        if expires_at is not None and expires_at <= now:
+            operations.append(('delete', path, None))
+            continue
+        operations.append(('set', path, {
+            'fire_at': fire_at,
+            'expires_at': expires_at,
+            'due_at': due_at,
+            'username': username,
+            'reminder_id': reminder_id,
+            'notification_type': notification_type
+        }))
+        if fire_at < notification_scheduler_state['next_wake_at']:
+            notification_scheduler_wakeup.set()
+    return operations
+
+def reschedule_user_reminders(username):
+    """Rebuild schedule entries for all of a user's reminders"""
+    operations = []
+    for reminder in load_user_reminders(username, fresh=True):
+        operations.extend(reminder_schedule_operations(username, reminder['id'], reminder))
+    if operations:
+        storage.batch_write(operations)
+    return len(operations)
+
+# Only one process per deployment runs the scheduler loop. With
+# SCHEDULER_LOCK_FILE set, workers on one host compete for a file lock;
+# otherwise they compete for a lease document that the leader renews every
+# round and anyone may take over once it expires.
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', '90'))
+if os.getenv('SCHEDULER_LOCK_FILE'):
+    scheduler_lock = FileLock(os.getenv('SCHEDULER_LOCK_FILE'))
+else:
+    scheduler_lock = LeaseLock(storage, 'scheduler_leases/email_scheduler', ttl=SCHEDULER_LEASE_SECONDS)
+
+def claim_schedule_entry(entry_path, now):
+    """Atomically take a due entry; returns a claim token, or None if another process got it first"""
+    claim_token = uuid.uuid4().hex
+
+    def claim(current):
+        if current is None or current.get('fire_at', 0) > now:
+            return None
+        return {**current, 'fire_at': now + OUTBOX_VISIBILITY_SECONDS, 'claim_token': claim_token}
+
+    return claim_token if storage.transact(entry_path, claim) is not None else None
+
+def confirm_schedule_claim(entry_path, claim_token):
+    """Right before sending, check our claim still stands and extend it"""
+    def renew(current):
+        if current is None or current.get('claim_token') != claim_token:
+            return None
+        return {**current, 'fire_at': time.time() + OUTBOX_VISIBILITY_SECONDS}
+
+    return storage.transact(entry_path, renew) is not None
+
+def get_sent_notification_path(username, reminder_id):
+    """Get storage path for one reminder's sent-notification ledger entry"""
+    return f"{get_sent_notifications_path(username)}/{reminder_id}"
+
+def sent_notification_entry(due_at, types):
+    """Build a ledger entry; it expires once nothing more can be sent for that due time"""
+    return {
+        'due_at': due_at,
+        'types': sorted(types),
+        'expires_at': due_at + OVERDUE_NOTIFY_WINDOW_SECONDS,
+        'updated_at': datetime.now().isoformat()
+    }
 
-        for user_doc in users:
-            username = user_doc.id
-            user_data = user_doc.to_dict()
-            user_email = user_data.get('email')
+def migrate_legacy_sent_notifications(username):
+    """Move the legacy flat list of "{reminder_id}_{type}" keys into per-reminder ledger entries"""
+    legacy = get_user_data(username, 'sent_notifications')
+    if 'notifications' in legacy:
+        # A cached legacy copy may predate another worker's migration
+        legacy = get_user_data(username, 'sent_notifications', fresh=True)
+    if 'notifications' not in legacy:
+        return 0
 
-            if not user_email:
-                continue
+    sent_types = {}
+    for key in legacy['notifications']:
+        for notification_type in NOTIFICATION_TYPES:
+            if key.endswith(f"_{notification_type}"):
+                sent_types.setdefault(key[:-len(notification_type) - 1], set()).add(notification_type)
+                break
 
-            print(f"📧 Checking reminders for user: {username} ({user_email})")
+    operations = []
+    now = time.time()
+    for reminder in load_user_reminders(username, fresh=True):
+        # Keys for deleted, completed or undated reminders can never matter again
+        if reminder['id'] not in sent_types or reminder.get('completed', False):
+            continue
+        due_at = reminder_due_at(reminder)
+        if due_at is None:
+            continue
+        if due_at + OVERDUE_NOTIFY_WINDOW_SECONDS > now:
+            operations.append(('set', get_sent_notification_path(username, reminder['id']),
+                               sent_notification_entry(due_at, sent_types[reminder['id']])))
+
+    # Leave a marker behind so the legacy document isn't migrated twice
+    marker = {'migrated_to': get_sent_notifications_path(username), 'migrated_at': datetime.now().isoformat()}
+    operations.append(('set', get_user_data_path(username, 'sent_notifications'), {
+        'data': marker,
+        'updated_at': marker['migrated_at']
+    }))
+    storage.batch_write(operations)
+    user_data_cache.set((username, 'sent_notifications'), marker)
+    scheduler_logger.info("Migrated %s sent-notification ledger entries for %s", len(operations) - 1, username)
+    return len(operations) - 1
+
+def load_sent_notifications(username, now=None):
+    """Get the user's ledger as {reminder_id: {'due_at', 'types'}}, dropping expired entries"""
+    now = time.time() if now is None else now
+    migrate_legacy_sent_notifications(username)
+    ledger = {}
+    expired = []
+    for reminder_id, entry in storage.stream(get_sent_notifications_path(username)):
+        if entry.get('expires_at', 0) <= now:
+            expired.append(('delete', get_sent_notification_path(username, reminder_id), None))
+        else:
+            ledger[reminder_id] = {'due_at': entry.get('due_at'), 'types': set(entry.get('types', []))}
+    if expired:
+        storage.batch_write(expired)
+    return ledger
+
+def notification_already_sent(ledger, reminder_id, notification_type, due_at):
+    """Check the ledger; moving a reminder's due time makes all its notifications due again"""
+    entry = ledger.get(reminder_id)
+    return entry is not None and entry['due_at'] == due_at and notification_type in entry['types']
+
+def mark_notification_sent(username, reminder_id, notification_type, due_at, entry_path):
+    """Record a delivered notification in the user's ledger and drop its schedule entry"""
+    def add_type(current):
+        types = set(current.get('types', [])) if current and current.get('due_at') == due_at else set()
+        if notification_type in types:
+            return None
+        return sent_notification_entry(due_at, types | {notification_type})
+
+    # A transaction, so concurrent sends for one reminder can't drop each other's types
+    storage.transact(get_sent_notification_path(username, reminder_id), add_type)
+    storage.delete(entry_path)
+    scheduler_logger.info("✅ Notification sent successfully")
+
+def load_notification_context(username, now):
+    """Get what every due entry of one user needs: email address, settings and ledger"""
+    user_data = find_user_by_username(username) or {}
+    return {
+        'email': user_data.get('email'),
+        'email_settings': get_user_data(username, 'email_settings').get('settings', {}),
+        'sent': load_sent_notifications(username, now)
+    }
 
-            # Get user's email settings
-            email_settings_data = get_user_data(username, 'email_settings')
-            email_settings = email_settings_data.get('settings', {}) if email_settings_data else {}
+def queue_scheduled_notification(entry_id, entry, now, context):
+    """Queue one due notification for sending; returns True if it was queued"""
+    username = entry['username']
+    notification_type = entry['notification_type']
+    entry_path = f"{NOTIFICATION_SCHEDULE_COLLECTION}/{entry_id}"
 
-            # Skip if email notifications are disabled
-            if not email_settings.get('enabled', False):
-                print(f"⏭️ Email notifications disabled for {username}")
-                continue
+    if entry.get('expires_at') is not None and now > entry['expires_at']:
+        scheduler_logger.debug("⏭️ %s notification window passed for %s", notification_type, entry['reminder_id'])
+        storage.delete(entry_path)
+        return False
 
-            # Get user's reminders
-            reminders_data = get_user_data(username, 'reminders')
-            if not reminders_data or 'reminders' not in reminders_data:
-                continue
+    user_email = context['email']
+    email_settings = context['email_settings']
+    setting_key = {'24_hour': 'notify_24h', '1_hour': 'notify_1h', 'overdue': 'notify_overdue'}[notification_type]
+    if not user_email or not email_settings.get('enabled', False) or not email_settings.get(setting_key, True):
+        storage.delete(entry_path)
+        return False
 
-            reminders = reminders_data['reminders']
-            # Use Indian timezone for current time
-            import pytz
-            indian_tz = pytz.timezone('Asia/Kolkata')
-            now = datetime.now(indian_tz).replace(tzinfo=None)
+    if notification_already_sent(context['sent'], entry['reminder_id'], notification_type, entry['due_at']):
+        scheduler_logger.debug("⏭️ Notification already sent for %s (%s)", entry['reminder_id'], notification_type)
+        storage.delete(entry_path)
+        return False
 
-            for reminder in reminders:
-                if reminder.get('completed', False):
-                    continue
+    # Saving settings or reminders re-indexes, so anything stale can just be dropped
+    reminder = storage.get(get_user_reminder_path(username, entry['reminder_id']))
+    if reminder is None or reminder.get('completed', False):
+        storage.delete(entry_path)
+        return False
 
-                due_date_str = reminder.get('due_date')
-                if not due_date_str:
-                    continue
+    notification_key = f"{reminder['id']}_{notification_type}"
+    due_date = datetime.fromtimestamp(entry['due_at'], IST)
+    enhanced_reminder = {
+        **reminder,
+        'formatted_due_date': due_date.strftime('%A, %B %d, %Y at %I:%M %p'),
+        'notification_type': notification_type
+    }
+    # Claim the entry before queueing; a second scheduler (or a manual check)
+    # racing us for the same entry gets nothing
+    claim_token = claim_schedule_entry(entry_path, now)
+    if claim_token is None:
+        return False
+    queued = email_outbox.enqueue(
+        user_email,
+        enhanced_reminder,
+        dedup_key=notification_key,
+        before_send=lambda: confirm_schedule_claim(entry_path, claim_token),
+        on_sent=lambda: mark_notification_sent(username, reminder['id'], notification_type, entry['due_at'], entry_path),
+        on_failed=lambda: scheduler_logger.error("❌ Giving up on %s notification for %s for now", notification_type, reminder['title'])
+    )
+    if queued:
+        scheduler_logger.info("📨 Queued %s notification for: %s", notification_type, reminder['title'])
+    return queued
 
-                try:
-                    # Clean up corrupted dates with double timezone suffixes
-                    import re
-                    cleaned_date_str = due_date_str
-
-                    # Fix dates with timezone + Z like +00:00Z
-                    if '+00:00Z' in cleaned_date_str:
-                        cleaned_date_str = cleaned_date_str.replace('+00:00Z', 'Z')
-
-                    # Fix dates with double timezone suffixes like +00:00+00:00
-                    double_tz_pattern = r'(\+\d{2}:\d{2})\+\d{2}:\d{2}$'
-                    if re.search(double_tz_pattern, cleaned_date_str):
-                        # Remove the duplicate timezone suffix
-                        cleaned_date_str = re.sub(double_tz_pattern, r'\1', cleaned_date_str)
-
-                    # Parse due date and handle timezone properly
-                    if cleaned_date_str.endswith('Z'):
-                        # UTC time - convert to local timezone
-                        due_date = datetime.fromisoformat(cleaned_date_str.replace('Z', '+00:00'))
-                        # Convert to local timezone
-                        import pytz
-                        local_tz = pytz.timezone('Asia/Kolkata')  # Indian timezone
-                        due_date = due_date.astimezone(local_tz).replace(tzinfo=None)
-                    elif '+' in cleaned_date_str or cleaned_date_str.endswith('00:00'):
-                        # Has timezone info
-                        due_date = datetime.fromisoformat(cleaned_date_str)
-                        if due_date.tzinfo is not None:
-                            # Convert to Indian timezone
-                            import pytz
-                            local_tz = pytz.timezone('Asia/Kolkata')
-                            due_date = due_date.astimezone(local_tz).replace(tzinfo=None)
-                    else:
-                        # Assume Indian timezone if no timezone info
-                        due_date = datetime.fromisoformat(cleaned_date_str)
-
-                    time_diff = due_date - now
-                    hours_until_due = time_diff.total_seconds() / 3600
-
-                    print(f"⏰ DEBUG: Reminder '{reminder['title']}' - Due: {due_date}, Now: {now}, Hours until due: {hours_until_due:.2f}")
-
-                    # Check if we should send notification
-                    should_notify = False
-                    notification_type = ""
-
-                    if hours_until_due < 0 and email_settings.get('notify_overdue', True):
-                        # Overdue
-                        should_notify = True
-                        notification_type = "overdue"
-                    elif 0.5 <= hours_until_due <= 1.5 and email_settings.get('notify_1h', True):
-                        # Due in 1 hour (with 30-minute window)
-                        should_notify = True
-                        notification_type = "1_hour"
-                    elif 23 <= hours_until_due <= 25 and email_settings.get('notify_24h', True):
-                        # Due in 24 hours (with 1-hour window)
-                        should_notify = True
-                        notification_type = "24_hour"
-
-                    if should_notify:
-                        # Check if we already sent this notification
-                        notification_key = f"{reminder['id']}_{notification_type}"
-                        sent_notifications = get_user_data(username, 'sent_notifications')
-                        sent_list = sent_notifications.get('notifications', []) if sent_notifications else []
-
-                        if notification_key not in sent_list:
-                            print(f"📨 Sending {notification_type} notification for: {reminder['title']}")
-
-                            # Enhance reminder data for email
-                            enhanced_reminder = {
-                                **reminder,
-                                'formatted_due_date': due_date.strftime('%A, %B %d, %Y at %I:%M %p'),
-                                'notification_type': notification_type
-                            }
-
-                            # Send email
-                            if send_email_reminder(user_email, enhanced_reminder):
-                                # Mark notification as sent
-                                sent_list.append(notification_key)
-                                save_user_data(username, 'sent_notifications', {'notifications': sent_list})
-                                notifications_sent += 1
-                                print(f"✅ Notification sent successfully")
-                            else:
-                                print(f"❌ Failed to send notification")
-                        else:
-                            print(f"⏭️ Notification already sent for {reminder['title']} ({notification_type})")
+def check_and_send_email_reminders():
+    """Queue every notification whose scheduled time has arrived"""
+    try:
+        notifications_sent = 0
+        now = time.time()
+        scheduler_logger.debug("🔔 Checking for due email notifications...")
 
-                except Exception as e:
-                    print(f"❌ Error processing reminder {reminder.get('title', 'Unknown')}: {e}")
-                    print(f"❌ Problematic due_date: {due_date_str}")
-                    continue
+        due_entries = storage.stream(NOTIFICATION_SCHEDULE_COLLECTION, [('fire_at', '<=', now)], order_by='fire_at')
+        # Profile, settings and ledger are loaded once per user per scan
+        contexts = {}
+        for entry_id, entry in due_entries:
+            try:
+                username = entry['username']
+                if username not in contexts:
+                    contexts[username] = load_notification_context(username, now)
+                if queue_scheduled_notification(entry_id, entry, now, contexts[username]):
+                    notifications_sent += 1
+            except Exception as e:
+                scheduler_logger.error("❌ Error processing notification %s: %s", entry_id, e)
 
-        print(f"🔔 Email reminder check complete. Sent {notifications_sent} notifications.")
+        scheduler_logger.debug("🔔 Email reminder check complete. Queued %s notifications.", notifications_sent)
         return notifications_sent
 
     except Exception as e:
-        print(f"❌ Error checking email reminders: {e}")
-        import traceback
-        print(f"❌ Full traceback: {traceback.format_exc()}")
+        scheduler_logger.exception("❌ Error checking email reminders: %s", e)
+        return 0
+
+def backfill_notification_schedule():
+    """Index reminders saved before the schedule existed (runs once per database)"""
+    marker_path = f"{NOTIFICATION_SCHEDULE_COLLECTION}_meta/backfill"
+    if storage.get(marker_path) is not None:
         return 0
+    scheduler_logger.info("🗂️ Backfilling notification schedule from existing reminders...")
+    indexed = 0
+    for username, user_data in storage.stream(PROFILES_COLLECTION):
+        try:
+            reschedule_user_reminders(username)
+            indexed += 1
+        except Exception as e:
+            scheduler_logger.error("❌ Error backfilling schedule for %s: %s", username, e)
+    storage.set(marker_path, {'completed_at': datetime.now().isoformat(), 'users': indexed})
+    scheduler_logger.info("🗂️ Notification schedule backfilled for %s users", indexed)
+    return indexed
+
+def migrate_reminder_formats():
+    """Upgrade every user's stored reminders to REMINDER_FORMAT_VERSION (runs once per database per version)"""
+    marker_path = f"reminders_meta/format_v{REMINDER_FORMAT_VERSION}"
+    if storage.get(marker_path) is not None:
+        return 0
+    reminder_logger.info("🗂️ Upgrading stored reminders to format version %s...", REMINDER_FORMAT_VERSION)
+    upgraded = 0
+    for username, _ in storage.stream(PROFILES_COLLECTION):
+        try:
+            # Loading a user's reminders upgrades them, one batch write per user
+            reminder_list_cache.invalidate(username)
+            load_user_reminders(username)
+            upgraded += 1
+        except Exception as e:
+            reminder_logger.error("❌ Error upgrading reminders for %s: %s", username, e)
+    storage.set(marker_path, {'completed_at': datetime.now().isoformat(), 'users': upgraded})
+    reminder_logger.info("🗂️ Reminders upgraded for %s users", upgraded)
+    return upgraded
+
+def seconds_until_next_notification(now):
+    """Get how long the scheduler may sleep before the next entry is due"""
+    upcoming = storage.stream(NOTIFICATION_SCHEDULE_COLLECTION, [('fire_at', '>', now)], limit=1, order_by='fire_at')
+    if not upcoming:
+        return SCHEDULER_MAX_SLEEP_SECONDS
+    return max(0.0, min(upcoming[0][1]['fire_at'] - now, SCHEDULER_MAX_SLEEP_SECONDS))
 
 def background_email_checker():
-    """Background thread to check for email reminders every 30 minutes"""
+    """Background thread that sends notifications as their scheduled time arrives"""
+    is_leader = False
+    # Renew the lease well before it can expire
+    heartbeat_seconds = SCHEDULER_LEASE_SECONDS / 3
+
     while True:
         try:
-            print("🔄 Running background email reminder check...")
+            if not scheduler_lock.acquire():
+                if is_leader:
+                    scheduler_logger.info("🔒 Lost the scheduler lock; another process runs the scheduler now")
+                is_leader = False
+                time.sleep(heartbeat_seconds)
+                continue
+
+            if not is_leader:
+                is_leader = True
+                scheduler_logger.info("🔒 This process (%s) now runs the reminder scheduler", scheduler_lock.holder)
+                try:
+                    backfill_notification_schedule()
+                except Exception as e:
+                    scheduler_logger.error("❌ Error backfilling notification schedule: %s", e)
+                try:
+                    migrate_reminder_formats()
+                except Exception as e:
+                    scheduler_logger.error("❌ Error upgrading stored reminders: %s", e)
+
             check_and_send_email_reminders()
-            # Wait 30 minutes before next check
-            time.sleep(30 * 60)  # 30 minutes
+            # Any reminder saved while we look for the next entry should wake us
+            notification_scheduler_state['next_wake_at'] = float('inf')
+            now = time.time()
+            sleep_for = min(seconds_until_next_notification(now), heartbeat_seconds)
+            notification_scheduler_state['next_wake_at'] = now + sleep_for
+            # Saving a reminder that fires sooner than this sets the event
+            notification_scheduler_wakeup.wait(sleep_for)
+            notification_scheduler_wakeup.clear()
         except Exception as e:
-            print(f"❌ Error in background email checker: {e}")
+            scheduler_logger.error("❌ Error in background email checker: %s", e)
+            notification_scheduler_state['next_wake_at'] = time.time() + 60
             time.sleep(60)  # Wait 1 minute before retrying
 
 def generate_indian_holidays(year):
@@ -871,51 +1369,28 @@ def generate_indian_holidays(year):
 
     return holidays
 
-# Start background email checker thread
+# Start the email outbox workers and background email checker thread
+email_outbox.start()
 email_checker_thread = threading.Thread(target=background_email_checker, daemon=True)
 email_checker_thread.start()
-print("🚀 Background email reminder checker started!")
-
-def extract_subject_from_message(text):
-    """Extract subject/course name from message"""
-    import re
-
-    # Common subject patterns - using word boundaries to avoid partial matches
-    subject_patterns = [
-        r'\b(data structures?|ds)\b',
-        r'\b(machine learning|ml)\b',
-        r'\b(artificial intelligence|ai)\b',
-        r'\b(database management|dbms)\b',
-        r'\b(operating systems?|os)\b',
-        r'\b(computer networks?|cn)\b',
-        r'\b(software engineering)\b',  # Removed 'se' to avoid false matches
-        r'\b(web development|web dev)\b',
-        r'\b(mobile computing|mobile)\b',
-        r'\b(cyber security|security)\b',
-        r'\b(mathematics|math|maths)\b',
-        r'\b(physics|phy)\b',
-        r'\b(chemistry|chem)\b',
-        r'\b(english|eng)\b',
-        r'\b(management|mgmt)\b',
-        r'\b(electronics?|electronic)\b',  # Added electronics
-        r'\b(data science)\b',  # Added data science
-        r'\b(circuit)\b',  # Added circuit
-    ]
-
-    text_lower = text.lower()
-    for pattern in subject_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            return match.group(1).title()
-
-    return None
+scheduler_logger.info("🚀 Background email reminder checker started!")
+history_trimmer_thread = threading.Thread(target=background_history_trimmer, daemon=True)
+history_trimmer_thread.start()
+
+@app.after_request
+def report_storage_reads(response):
+    """Expose how many document reads this request made and how many the memo saved"""
+    memo = g.get('read_memo') or ReadMemo()
+    response.headers['X-Storage-Reads'] = str(memo.reads)
+    response.headers['X-Storage-Reads-Saved'] = str(memo.reads_saved)
+    return response
 
 # Login required decorator
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not session.get('logged_in') or not session.get('username'):
-            print(f"Access denied. Session: {dict(session)}")
+            auth_logger.info("Access denied to %s: not logged in", request.path)
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -923,14 +1398,14 @@ def login_required(f):
 @app.route('/')
 @login_required
 def index():
-    print(f"Index accessed by user: {session.get('username', 'Anonymous')}")
+    auth_logger.debug("Index accessed by user: %s", session.get('username', 'Anonymous'))
     return render_template('index.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     # Prevent redirect loops
     if session.get('logged_in') and session.get('username'):
-        print(f"User {session.get('username')} already logged in, redirecting to index")
+        auth_logger.info("User %s already logged in, redirecting to index", session.get('username'))
         return redirect(url_for('index'))
         
     if request.method == 'POST':
@@ -944,9 +1419,6 @@ def login():
         try:
             user_data = find_user_by_username(username)
 
-            # Debug: Print all user data
-            print(f"DEBUG: Full user data for {username}: {user_data}")
-
             if user_data and check_password_hash(user_data.get('password_hash', ''), password):
                 # Clear session first
                 session.clear()
@@ -956,27 +1428,28 @@ def login():
                 session['student_name'] = str(user_data.get('student_name', username))
                 session['role'] = str(user_data.get('role', 'student'))
                 session['email'] = str(user_data.get('email', ''))
+                session['college'] = str(user_data.get('college', ''))
 
                 # Handle created_at field - use the exact Firebase value
                 created_at = user_data.get('created_at', '2025-07-11T06:34:21.105076')
-                print(f"DEBUG: User {username} created_at from Firebase: {created_at}")
+                auth_logger.debug("User %s created_at from Firebase: %s", username, created_at)
 
                 session['created_at'] = str(created_at)
                 session['logged_in'] = True
 
                 # Debug: Print the created_at value
-                print(f"DEBUG: User {username} created_at: {user_data.get('created_at', 'NOT FOUND')}")
-                print(f"DEBUG: Session created_at: {session.get('created_at', 'NOT SET')}")
+                auth_logger.debug("User %s created_at: %s", username, user_data.get('created_at', 'NOT FOUND'))
+                auth_logger.debug("Session created_at: %s", session.get('created_at', 'NOT SET'))
                                 
-                print(f"User {username} logged in successfully")
+                auth_logger.info("User %s logged in successfully", username)
                 flash('Login successful!', 'success')
                 return redirect(url_for('index'))
             else:
-                print(f"Authentication failed for user: {username}")
+                auth_logger.warning("Authentication failed for user: %s", username)
                 flash('Invalid username or password!', 'error')
                             
         except Exception as e:
-            print(f"Login error: {e}")
+            auth_logger.error("Login error: %s", e)
             flash('An error occurred during login. Please try again.', 'error')
                 
     return render_template('login.html')
@@ -1055,7 +1528,7 @@ def register():
             return render_template('login.html')
                 
     except Exception as e:
-        print(f"Registration error: {e}")
+        auth_logger.error("Registration error: %s", e)
         flash('An error occurred during registration. Please try again.', 'error')
         return render_template('login.html')
 
@@ -1072,7 +1545,7 @@ def logout():
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
 
-    print(f"User {username} logged out successfully")
+    auth_logger.info("User %s logged out successfully", username)
     flash('You have been logged out successfully.', 'success')
     return response
 
@@ -1080,7 +1553,7 @@ def logout():
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
     """Test endpoint to verify server is working"""
-    print("DEBUG: Test endpoint called!")
+    logger.debug("Test endpoint called!")
     return jsonify({'status': 'working', 'message': 'Server is responding'})
 
 @app.route('/api/reminders/cleanup-duplicates', methods=['POST'])
@@ -1093,17 +1566,15 @@ def cleanup_duplicate_reminders():
             return jsonify({'error': 'Please log in to clean up reminders'}), 401
 
         # Get existing reminders
-        reminders_data = get_user_data(username, 'reminders')
-        if 'reminders' in reminders_data:
-            original_reminders = reminders_data['reminders']
-        else:
+        original_reminders = load_user_reminders(username, fresh=True)
+        if not original_reminders:
             return jsonify({'message': 'No reminders found'}), 200
 
-        # Remove duplicates
-        cleaned_reminders = remove_duplicate_reminders(original_reminders)
+        # Remove duplicates (works on copies so the diff below sees the date fixes)
+        cleaned_reminders = remove_duplicate_reminders([dict(r) for r in original_reminders])
 
-        # Save cleaned data back to Firebase
-        if save_user_data(username, 'reminders', {'reminders': cleaned_reminders}):
+        # Delete the duplicates and save any repaired dates
+        if sync_user_reminders(username, original_reminders, cleaned_reminders):
             duplicates_removed = len(original_reminders) - len(cleaned_reminders)
             return jsonify({
                 'success': True,
@@ -1116,133 +1587,198 @@ def cleanup_duplicate_reminders():
             return jsonify({'error': 'Error saving cleaned reminders'}), 500
 
     except Exception as e:
-        print(f"Error cleaning up duplicates: {e}")
+        reminder_logger.error("Error cleaning up duplicates: %s", e)
         return jsonify({'error': 'Error cleaning up duplicates'}), 500
 
+# Reminder statuses, from most to least pressing; due_* buckets are by IST calendar day
+REMINDER_STATUSES = ('overdue', 'due_today', 'due_tomorrow', 'due_soon', 'due_this_week', 'upcoming', 'no_date')
+REMINDER_PRIORITIES = ('critical', 'urgent', 'high', 'medium', 'low')
+REMINDER_SORTS = ('created_at', 'due_at', 'title', 'priority')
+REMINDER_PAGE_MAX_LIMIT = int(os.getenv('REMINDER_PAGE_MAX_LIMIT', '200'))
+
+def reminder_status_fields(reminder, now):
+    """Get status, countdown, priority and display dates for a reminder at `now` (aware datetime)"""
+    due_at = reminder.get('due_at')
+    if due_at is None:
+        return {'status': 'no_date', 'countdown': 'No due date', 'priority': 'low',
+                'formatted_due_date': None, 'due_date_short': None}
+
+    due_date = datetime.fromtimestamp(due_at, IST)
+    days_left = (due_date.date() - now.astimezone(IST).date()).days
+    hours_left = (due_at - now.timestamp()) / 3600
+
+    if days_left < 0:
+        status, priority = 'overdue', 'critical'
+        countdown = '1 day overdue' if days_left == -1 else f'{-days_left} days overdue'
+    elif days_left == 0:
+        # All items due today go to "Due Today" regardless of specific time
+        status = 'due_today'
+        if hours_left < 0:
+            countdown, priority = 'Due today (time passed)', 'urgent'
+        elif hours_left < 2:
+            countdown, priority = f'Due in {int(hours_left * 60)} minutes!', 'urgent'
+        elif hours_left < 6:
+            countdown, priority = f'Due in {int(hours_left)} hours', 'high'
+        else:
+            countdown, priority = 'Due today!', 'high'
+    elif days_left == 1:
+        status, countdown, priority = 'due_tomorrow', 'Due tomorrow', 'medium'
+    elif days_left <= 3:
+        status, countdown, priority = 'due_soon', f'{days_left} days left', 'medium'
+    elif days_left <= 7:
+        status, countdown, priority = 'due_this_week', f'{days_left} days left', 'low'
+    else:
+        status, priority = 'upcoming', 'low'
+        weeks_left, months_left = days_left // 7, days_left // 30
+        if days_left <= 30:
+            countdown = f'{days_left} days left'
+        elif weeks_left < 4:
+            countdown = '1 week left' if weeks_left == 1 else f'{weeks_left} weeks left'
+        else:
+            countdown = '1 month left' if months_left == 1 else f'{months_left} months left'
+
+    return {
+        'status': status,
+        'countdown': countdown,
+        'priority': priority,
+        'formatted_due_date': due_date.strftime('%B %d, %Y at %I:%M %p'),
+        'due_date_short': due_date.strftime('%m/%d/%Y')
+    }
+
+def reminder_sort_key(reminder, sort, descending=False):
+    """Total order for a sort field; ties fall back to the reminder id and undated reminders go last"""
+    due_at = reminder.get('due_at')
+    due_key = [(due_at is None) != descending, due_at or 0]
+    if sort == 'due_at':
+        return due_key + [reminder['id']]
+    if sort == 'title':
+        return [(reminder.get('title') or '').lower(), reminder['id']]
+    if sort == 'priority':
+        return [REMINDER_PRIORITIES.index(reminder['priority'])] + due_key + [reminder['id']]
+    return [reminder.get('created_at') or '', reminder['id']]
+
+def encode_reminder_cursor(sort, key):
+    return base64.urlsafe_b64encode(json.dumps([sort, key]).encode('utf-8')).decode('ascii')
+
+def decode_reminder_cursor(cursor, sort):
+    """Get the sort key a cursor points past; ValueError if it is malformed or for another sort"""
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort or not isinstance(key, list):
+        raise ValueError('Cursor does not match this sort order')
+    return key
+
+def parse_query_list(value, allowed, name):
+    """Split a comma-separated query parameter, rejecting unknown values"""
+    values = {item.strip().lower() for item in value.split(',') if item.strip()}
+    unknown = values - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(sorted(unknown))}")
+    return values
+
+def parse_query_time(value, name):
+    """Read an epoch or ISO date/time query parameter as UTC epoch seconds (naive values are IST)"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parse_reminder_due_date(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+def query_reminders(reminders_list, args, now):
+    """Filter, sort and page reminders by the GET /api/reminders query parameters.
+
+    Returns (page, next_cursor, total matching).  Raises ValueError for bad
+    parameters.
+    """
+    statuses = parse_query_list(args['status'], REMINDER_STATUSES, 'status') if args.get('status') else None
+    types = {t.strip().lower() for t in args['type'].split(',') if t.strip()} if args.get('type') else None
+    completed = None
+    if args.get('completed'):
+        if args['completed'].lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f"Invalid completed: {args['completed']!r}")
+        completed = args['completed'].lower() in ('true', '1')
+    due_after = parse_query_time(args['due_after'], 'due_after') if args.get('due_after') else None
+    due_before = parse_query_time(args['due_before'], 'due_before') if args.get('due_before') else None
+
+    sort = args.get('sort', 'created_at')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in REMINDER_SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    limit = None
+    if args.get('limit'):
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            raise ValueError(f"Invalid limit: {args['limit']!r}")
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        limit = min(limit, REMINDER_PAGE_MAX_LIMIT)
+    cursor_key = decode_reminder_cursor(args['cursor'], args.get('sort', 'created_at')) if args.get('cursor') else None
+
+    # One pass: filter on the stored fields first, then derive status for what's left
+    matched = []
+    for reminder in reminders_list:
+        if types is not None and (reminder.get('type') or '').lower() not in types:
+            continue
+        if completed is not None and bool(reminder.get('completed', False)) != completed:
+            continue
+        due_at = reminder.get('due_at')
+        if due_after is not None and (due_at is None or due_at < due_after):
+            continue
+        if due_before is not None and (due_at is None or due_at >= due_before):
+            continue
+        result = {**reminder, **reminder_status_fields(reminder, now)}
+        if statuses is not None and result['status'] not in statuses:
+            continue
+        matched.append((reminder_sort_key(result, sort, descending), result))
+
+    matched.sort(key=lambda item: item[0], reverse=descending)
+    if cursor_key is not None:
+        try:
+            matched_after = [item for item in matched if (item[0] < cursor_key if descending else item[0] > cursor_key)]
+        except TypeError:
+            raise ValueError('Invalid cursor')
+    else:
+        matched_after = matched
+    page = matched_after if limit is None else matched_after[:limit]
+    next_cursor = None
+    if limit is not None and len(matched_after) > limit:
+        next_cursor = encode_reminder_cursor(args.get('sort', 'created_at'), page[-1][0])
+    return [result for _, result in page], next_cursor, len(matched)
+
 @app.route('/api/reminders', methods=['GET'])
 @login_required
 def get_reminders():
-    """Get user's reminders from Firebase"""
+    """Get user's reminders, optionally filtered, sorted and paged.
+
+    Query parameters: status and type (comma-separated), completed
+    (true/false), due_after / due_before (ISO date/time or epoch seconds;
+    after is inclusive, before exclusive), sort (created_at, due_at, title or
+    priority; prefix "-" for descending), limit and cursor (the next_cursor
+    of the previous page).  Every reminder carries status, countdown and
+    priority computed at request time.
+    """
     try:
         username = session.get('username')
         if not username:
             return jsonify({'error': 'Please log in to view reminders'}), 401
-        
-        print(f"DEBUG: Fetching reminders for username: {username}")
 
-        # Let's check what's actually in Firebase
+        # Duplicates are rejected and due dates normalized when reminders are written
+        reminders_list = load_user_reminders(username)
         try:
-            data_ref = get_user_data_ref(username).document('reminders')
-            doc = data_ref.get()
-            print(f"DEBUG: Document exists: {doc.exists}")
-            if doc.exists:
-                raw_data = doc.to_dict()
-                print(f"DEBUG: Raw document data: {raw_data}")
-            else:
-                print("DEBUG: No reminders document found")
-        except Exception as debug_e:
-            print(f"DEBUG: Error checking Firebase: {debug_e}")
-
-        reminders_data = get_user_data(username, 'reminders')
-        print(f"DEBUG: Reminders data from get_user_data: {reminders_data}")
-
-        # Fix: The data structure is data.reminders, not just reminders
-        if 'reminders' in reminders_data:
-            reminders_list = reminders_data['reminders']
-        else:
-            reminders_list = []
-        print(f"DEBUG: Reminders list before deduplication: {len(reminders_list)} items")
-
-        # Remove duplicates
-        reminders_list = remove_duplicate_reminders(reminders_list)
-        print(f"DEBUG: Reminders list after deduplication: {len(reminders_list)} items")
-
-        # TEMPORARY: Skip date processing to test basic functionality
-        print(f"DEBUG: About to return {len(reminders_list)} reminders")
-        return jsonify({'reminders': reminders_list})
+            page, next_cursor, total = query_reminders(reminders_list, request.args, datetime.now(IST))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'reminders': page, 'next_cursor': next_cursor, 'total': total})
 
-        # Add enhanced countdown and status to each reminder (DISABLED FOR NOW)
-        today = datetime.now()
-        for reminder in reminders_list:
-            if reminder.get('due_date'):
-                due_date = datetime.fromisoformat(reminder['due_date'])
-                time_diff = due_date - today
-                days_left = (due_date.date() - today.date()).days
-                hours_left = time_diff.total_seconds() / 3600
-
-                # Enhanced status and countdown calculation
-                if days_left < 0:
-                    reminder['status'] = 'overdue'
-                    abs_days = abs(days_left)
-                    if abs_days == 1:
-                        reminder['countdown'] = '1 day overdue'
-                    else:
-                        reminder['countdown'] = f'{abs_days} days overdue'
-                    reminder['priority'] = 'critical'
-                elif days_left == 0:
-                    # All items due today go to "Due Today" regardless of specific time
-                    reminder['status'] = 'due_today'
-                    if hours_left < 0:
-                        # Past the specific time but still "due today"
-                        reminder['countdown'] = 'Due today (time passed)'
-                        reminder['priority'] = 'urgent'
-                    elif hours_left < 2:
-                        reminder['countdown'] = f'Due in {int(hours_left * 60)} minutes!'
-                        reminder['priority'] = 'urgent'
-                    elif hours_left < 6:
-                        reminder['countdown'] = f'Due in {int(hours_left)} hours'
-                        reminder['priority'] = 'high'
-                    else:
-                        reminder['countdown'] = 'Due today!'
-                        reminder['priority'] = 'high'
-                elif days_left == 1:
-                    reminder['status'] = 'due_tomorrow'
-                    reminder['countdown'] = 'Due tomorrow'
-                    reminder['priority'] = 'medium'
-                elif days_left <= 3:
-                    reminder['status'] = 'due_soon'
-                    reminder['countdown'] = f'{days_left} days left'
-                    reminder['priority'] = 'medium'
-                elif days_left <= 7:
-                    reminder['status'] = 'due_this_week'
-                    reminder['countdown'] = f'{days_left} days left'
-                    reminder['priority'] = 'low'
-                else:
-                    reminder['status'] = 'upcoming'
-                    if days_left <= 30:
-                        reminder['countdown'] = f'{days_left} days left'
-                    else:
-                        weeks_left = days_left // 7
-                        if weeks_left == 1:
-                            reminder['countdown'] = '1 week left'
-                        elif weeks_left < 4:
-                            reminder['countdown'] = f'{weeks_left} weeks left'
-                        else:
-                            months_left = days_left // 30
-                            if months_left == 1:
-                                reminder['countdown'] = '1 month left'
-                            else:
-                                reminder['countdown'] = f'{months_left} months left'
-                    reminder['priority'] = 'low'
-
-                # Add formatted due date
-                reminder['formatted_due_date'] = due_date.strftime('%B %d, %Y at %I:%M %p')
-                reminder['due_date_short'] = due_date.strftime('%m/%d/%Y')
-
-            else:
-                reminder['status'] = 'no_date'
-                reminder['countdown'] = 'No due date'
-                reminder['priority'] = 'low'
-                reminder['formatted_due_date'] = None
-                reminder['due_date_short'] = None
-        
-        # Sort by due date
-        reminders_list.sort(key=lambda x: x.get('due_date', '9999-12-31'))
-        
-        return jsonify({'reminders': reminders_list})
-            
     except Exception as e:
-        print(f"Error retrieving reminders: {e}")
+        reminder_logger.error("Error retrieving reminders: %s", e)
         return jsonify({'error': 'Error retrieving reminders'}), 500
 
 @app.route('/api/reminders', methods=['POST'])
@@ -1257,13 +1793,11 @@ def save_reminder():
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        if due_date_field_error(data):
+            return jsonify({'error': due_date_field_error(data)}), 400
         
-        # Get existing reminders
-        reminders_data = get_user_data(username, 'reminders')
-        if 'reminders' in reminders_data:
-            reminders_list = reminders_data['reminders']
-        else:
-            reminders_list = []
+        # Builds the duplicate index first if this user's reminders predate it
+        load_user_reminders(username)
 
         # Create new reminder
         new_reminder = {
@@ -1275,24 +1809,23 @@ def save_reminder():
             'created_at': datetime.now().isoformat(),
             'completed': False
         }
+        normalize_reminder_due_date(new_reminder)
 
         # Check for duplicates
-        if is_duplicate_reminder(new_reminder, reminders_list):
+        if not claim_reminder_key(username, new_reminder):
             return jsonify({
                 'error': 'Duplicate reminder detected',
                 'message': f'A reminder with the same title "{new_reminder["title"]}", type "{new_reminder["type"]}", and due date already exists.'
             }), 400
 
-        reminders_list.append(new_reminder)
-        
-        # Save back to Firebase
-        if save_user_data(username, 'reminders', {'reminders': reminders_list}):
+        # Save as its own document
+        if save_user_reminder(username, new_reminder):
             return jsonify({'success': True, 'reminder': new_reminder})
         else:
             return jsonify({'error': 'Error saving reminder'}), 500
         
     except Exception as e:
-        print(f"Error saving reminder: {e}")
+        reminder_logger.error("Error saving reminder: %s", e)
         return jsonify({'error': 'Error saving reminder'}), 500
 
 @app.route('/api/reminders/fix-times', methods=['POST'])
@@ -1304,76 +1837,31 @@ def fix_reminder_times():
             return jsonify({'error': 'Not authenticated'}), 401
 
         # Get current reminders
-        user_data = get_user_data(username, 'reminders')
-        if not user_data:
+        original_reminders = load_user_reminders(username, fresh=True)
+        if not original_reminders:
             return jsonify({'error': 'No reminders found'}), 404
 
-        reminders_list = user_data.get('reminders', [])
+        reminders_list = [dict(r) for r in original_reminders]
         updated_count = 0
 
         for reminder in reminders_list:
             description = reminder.get('description', '')
-            current_due_date = reminder.get('due_date')
-
-            print(f"DEBUG: Processing reminder '{reminder.get('title', 'Unknown')}' with description: {description[:100]}...")
-            print(f"DEBUG: Current due_date: {current_due_date}")
-
-            if description and current_due_date:
-                # Parse time from description
-                parsed_date = parse_date_from_text(description)
-                print(f"DEBUG: Parsed date from description: {parsed_date}")
-
-                if parsed_date:
-                    # Handle different date formats that might already exist
-                    try:
-                        # Clean up the date string to handle various formats
-                        date_str = current_due_date
-
-                        # Remove trailing Z first
-                        if date_str.endswith('Z'):
-                            date_str = date_str[:-1]
-
-                        # Clean up corrupted dates with double timezone suffixes
-                        import re
-
-                        # Fix dates with timezone + Z like +00:00Z
-                        if '+00:00Z' in date_str:
-                            date_str = date_str.replace('+00:00Z', 'Z')
-
-                        # Fix dates with double timezone suffixes like +00:00+00:00
-                        double_tz_pattern = r'(\+\d{2}:\d{2})\+\d{2}:\d{2}$'
-                        if re.search(double_tz_pattern, date_str):
-                            # Remove the duplicate timezone suffix
-                            date_str = re.sub(double_tz_pattern, r'\1', date_str)
-
-                        # Check if it already has timezone info at the end
-                        # Look for patterns like +00:00, -05:00, etc. at the end
-                        timezone_pattern = r'[+-]\d{2}:\d{2}$'
-
-                        if not re.search(timezone_pattern, date_str):
-                            # Only add timezone if it doesn't already have one
-                            date_str += '+00:00'
-
-                        old_due_date = datetime.fromisoformat(date_str)
-                    except ValueError:
-                        # If parsing fails, skip this reminder
-                        continue
-
-                    # Keep the same date but update the time
-                    new_due_date = old_due_date.replace(
-                        hour=parsed_date.hour,
-                        minute=parsed_date.minute,
-                        second=0,
-                        microsecond=0
-                    )
-
-                    reminder['due_date'] = new_due_date.isoformat() + 'Z'
-                    reminder['updated_at'] = datetime.now().isoformat()
-                    updated_count += 1
+            due_at = reminder_due_at(reminder)
+            if not description or due_at is None:
+                continue
+
+            # Keep the same (IST) day but take the time from the description
+            parsed_date = parse_date_from_text(description)
+            current_due = datetime.fromtimestamp(due_at, IST)
+            new_due = current_due.replace(hour=parsed_date.hour, minute=parsed_date.minute, second=0, microsecond=0)
+            if new_due != current_due:
+                reminder['due_date'] = new_due.isoformat()
+                reminder['updated_at'] = datetime.now().isoformat()
+                updated_count += 1
 
         # Save updated reminders
         if updated_count > 0:
-            if save_user_data(username, 'reminders', {'reminders': reminders_list}):
+            if sync_user_reminders(username, original_reminders, reminders_list):
                 return jsonify({
                     'success': True,
                     'message': f'Updated {updated_count} reminders with correct times',
@@ -1385,9 +1873,36 @@ def fix_reminder_times():
             return jsonify({'message': 'No reminders needed time updates'})
 
     except Exception as e:
-        print(f"Error fixing reminder times: {e}")
+        reminder_logger.error("Error fixing reminder times: %s", e)
         return jsonify({'error': 'Error fixing reminder times'}), 500
 
+def parse_reminder_message(message_text, college=None):
+    """Run the classify, date, title and subject pipeline on one message"""
+    reminder_type = classify_reminder_type(message_text)
+    due_date = parse_date_from_text(message_text)
+    title = extract_title_from_message(message_text, reminder_type)
+    reminder_logger.debug("🔍 Final title extracted: '%s' for type: '%s' from message: '%s'", title, reminder_type, message_text)
+    subject = extract_subject_from_message(message_text, subject_catalogues.get(college))
+
+    # Create enhanced description
+    description = message_text
+    if subject:
+        description = f"Subject: {subject}\n\n{message_text}"
+
+    return {
+        'title': title,
+        'description': description,
+        'type': reminder_type,
+        'subject': subject,
+        'due_date': due_date.isoformat() if due_date else None,
+        'parsed_date': due_date.strftime('%Y-%m-%d') if due_date else None,
+        'parsed_time': due_date.strftime('%H:%M') if due_date else None,
+        'confidence': {
+            'type_confidence': 'high' if any(keyword in message_text.lower() for keyword in [reminder_type, 'exam', 'assignment', 'project']) else 'medium',
+            'date_confidence': 'high' if due_date else 'low'
+        }
+    }
+
 @app.route('/api/reminders/parse', methods=['POST'])
 def parse_message():
     """Parse message text to extract reminder information"""
@@ -1400,53 +1915,102 @@ def parse_message():
         if not message_text:
             return jsonify({'error': 'No message text provided'}), 400
 
-        # Simplified parsing for debugging
-        try:
-            reminder_type = classify_reminder_type(message_text)
-        except Exception as e:
-            return jsonify({'error': f'Error in classify_reminder_type: {str(e)}'}), 500
-
-        try:
-            due_date = parse_date_from_text(message_text)
-        except Exception as e:
-            return jsonify({'error': f'Error in parse_date_from_text: {str(e)}'}), 500
+        return jsonify(parse_reminder_message(message_text, session.get('college')))
 
-        try:
-            title = extract_title_from_message(message_text, reminder_type)
-            print(f"🔍 DEBUG: Final title extracted: '{title}' for type: '{reminder_type}' from message: '{message_text}'")
-        except Exception as e:
-            print(f"❌ ERROR in extract_title_from_message: {str(e)}")
-            return jsonify({'error': f'Error in extract_title_from_message: {str(e)}'}), 500
+    except Exception as e:
+        reminder_logger.error("Error parsing message: %s", e)
+        return jsonify({'error': 'Error parsing message'}), 500
 
-        try:
-            subject = extract_subject_from_message(message_text)
-        except Exception as e:
-            return jsonify({'error': f'Error in extract_subject_from_message: {str(e)}'}), 500
+# Upper bound on messages parsed from one batch request
+PARSE_BATCH_MAX_MESSAGES = int(os.getenv('PARSE_BATCH_MAX_MESSAGES', '2000'))
+# Werkzeug buffers a multipart upload completely before the handler runs,
+# so "file" uploads are capped; a text/plain body is read line by line
+PARSE_BATCH_MAX_UPLOAD_BYTES = int(os.getenv('PARSE_BATCH_MAX_UPLOAD_BYTES', str(5 * 1024 * 1024)))
 
-        # Create enhanced description
-        description = message_text
-        if subject:
-            description = f"Subject: {subject}\n\n{message_text}"
+@app.route('/api/reminders/parse-batch', methods=['POST'])
+@login_required
+def parse_messages_batch():
+    """Parse many messages at once and stream one NDJSON line per message.
+
+    Accepts JSON {"messages": [...]} or {"text": "<export>"}, a text/plain
+    body holding the export (read and parsed line by line as it arrives,
+    with ?dedupe=1), or a multipart upload in "file" of at most
+    PARSE_BATCH_MAX_UPLOAD_BYTES.  With dedupe set, messages matching an
+    existing reminder (or an earlier message in the batch) are flagged as
+    duplicates.
+    """
+    try:
+        username = session.get('username')
+        catalogue_college = session.get('college')
+        if request.mimetype == 'text/plain':
+            # Decode the body line by line so parsing starts before it is all read
+            messages = split_chat_export(line.decode('utf-8', errors='replace') for line in request.stream)
+            dedupe = request.args.get('dedupe', '').lower() in ('1', 'true', 'yes', 'on')
+        elif request.mimetype == 'multipart/form-data':
+            # Checked before touching request.files, which reads the whole body
+            if request.content_length is None or request.content_length > PARSE_BATCH_MAX_UPLOAD_BYTES:
+                return jsonify({'error': f'Uploads are limited to {PARSE_BATCH_MAX_UPLOAD_BYTES} bytes; '
+                                         'send larger exports as a text/plain body'}), 413
+            if 'file' not in request.files:
+                return jsonify({'error': 'Provide messages, text or an uploaded file'}), 400
+            upload = request.files['file']
+            messages = split_chat_export(line.decode('utf-8', errors='replace') for line in upload.stream)
+            dedupe = request.form.get('dedupe', '').lower() in ('1', 'true', 'yes', 'on')
+        else:
+            data = request.get_json(silent=True) or {}
+            if isinstance(data.get('messages'), list):
+                messages = ({'sent_at': None, 'sender': None, 'text': message} for message in data['messages'])
+            elif isinstance(data.get('text'), str) and data['text'].strip():
+                messages = split_chat_export(data['text'].splitlines())
+            else:
+                return jsonify({'error': 'Provide messages, text or an uploaded file'}), 400
+            dedupe = bool(data.get('dedupe', False))
 
-        result = {
-            'title': title,
-            'description': description,
-            'type': reminder_type,
-            'subject': subject,
-            'due_date': due_date.isoformat() if due_date else None,
-            'parsed_date': due_date.strftime('%Y-%m-%d') if due_date else None,
-            'parsed_time': due_date.strftime('%H:%M') if due_date else None,
-            'confidence': {
-                'type_confidence': 'high' if any(keyword in message_text.lower() for keyword in [reminder_type, 'exam', 'assignment', 'project']) else 'medium',
-                'date_confidence': 'high' if due_date else 'low'
-            }
-        }
-        
-        return jsonify(result)
-        
+        seen = {reminder_duplicate_key(reminder) for reminder in load_user_reminders(username)} if dedupe else set()
     except Exception as e:
-        print(f"Error parsing message: {e}")
-        return jsonify({'error': 'Error parsing message'}), 500
+        reminder_logger.error("Error starting batch parse: %s", e)
+        return jsonify({'error': 'Error parsing messages'}), 500
+
+    def generate():
+        counts = {'parsed': 0, 'duplicates': 0, 'errors': 0}
+        truncated = False
+        for index, message in enumerate(messages):
+            if index >= PARSE_BATCH_MAX_MESSAGES:
+                truncated = True
+                break
+            line = {'index': index, 'sent_at': message['sent_at'], 'sender': message['sender']}
+            try:
+                if not isinstance(message['text'], str) or not message['text'].strip():
+                    raise ValueError('No message text provided')
+                line['reminder'] = parse_reminder_message(message['text'], catalogue_college)
+                counts['parsed'] += 1
+                if dedupe:
+                    key = reminder_duplicate_key(line['reminder'])
+                    line['duplicate'] = key in seen
+                    if line['duplicate']:
+                        counts['duplicates'] += 1
+                    seen.add(key)
+            except Exception as e:
+                counts['errors'] += 1
+                line['error'] = str(e)
+            yield json.dumps(line) + '\n'
+        yield json.dumps({'done': True, 'truncated': truncated, **counts}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def apply_reminder_update(reminder, data):
+    """Get a copy of reminder with the editable fields present in data applied"""
+    updated = dict(reminder)
+    updated.update({
+        'title': data.get('title', reminder.get('title')),
+        'description': data.get('description', reminder.get('description')),
+        'type': data.get('type', reminder.get('type')),
+        'due_date': data.get('due_date', reminder.get('due_date')),
+        'due_time': data.get('due_time', reminder.get('due_time')),
+        'completed': data.get('completed', reminder.get('completed', False)),
+        'updated_at': datetime.now().isoformat()
+    })
+    return normalize_reminder_due_date(updated)
 
 @app.route('/api/reminders/<reminder_id>', methods=['PUT'])
 @login_required
@@ -1460,37 +2024,34 @@ def update_reminder(reminder_id):
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-        
-        # Get existing reminders
-        reminders_data = get_user_data(username, 'reminders')
-        if 'reminders' in reminders_data:
-            reminders_list = reminders_data['reminders']
-        else:
-            reminders_list = []
+        if due_date_field_error(data):
+            return jsonify({'error': due_date_field_error(data)}), 400
         
         # Find and update reminder
-        for reminder in reminders_list:
-            if reminder['id'] == reminder_id:
-                reminder.update({
-                    'title': data.get('title', reminder['title']),
-                    'description': data.get('description', reminder['description']),
-                    'type': data.get('type', reminder['type']),
-                    'due_date': data.get('due_date', reminder['due_date']),
-                    'due_time': data.get('due_time', reminder.get('due_time')),
-                    'completed': data.get('completed', reminder['completed']),
-                    'updated_at': datetime.now().isoformat()
-                })
-                
-                # Save back to Firebase
-                if save_user_data(username, 'reminders', {'reminders': reminders_list}):
-                    return jsonify({'success': True, 'reminder': reminder})
-                else:
-                    return jsonify({'error': 'Error updating reminder'}), 500
-        
-        return jsonify({'error': 'Reminder not found'}), 404
+        load_user_reminders(username)
+        reminder = get_user_reminder(username, reminder_id)
+        if reminder is None:
+            return jsonify({'error': 'Reminder not found'}), 404
+
+        previous = reminder
+        reminder = apply_reminder_update(previous, data)
+
+        # Only a change of title, type or due time can collide with another reminder
+        if reminder_key_hash(reminder) != reminder_key_hash(previous):
+            if not claim_reminder_key(username, reminder):
+                return jsonify({
+                    'error': 'Duplicate reminder detected',
+                    'message': f'A reminder with the same title "{reminder["title"]}", type "{reminder["type"]}", and due date already exists.'
+                }), 400
+
+        # Rewrite just this reminder's document
+        if save_user_reminder(username, reminder, previous):
+            return jsonify({'success': True, 'reminder': reminder})
+        else:
+            return jsonify({'error': 'Error updating reminder'}), 500
         
     except Exception as e:
-        print(f"Error updating reminder: {e}")
+        reminder_logger.error("Error updating reminder: %s", e)
         return jsonify({'error': 'Error updating reminder'}), 500
 
 @app.route('/api/reminders/<reminder_id>', methods=['DELETE'])
@@ -1502,46 +2063,256 @@ def delete_reminder(reminder_id):
         if not username:
             return jsonify({'error': 'Please log in to delete reminders'}), 401
         
-        # Get existing reminders
-        reminders_data = get_user_data(username, 'reminders')
-        if 'reminders' in reminders_data:
-            reminders_list = reminders_data['reminders']
-        else:
-            reminders_list = []
-        
-        # Find and remove reminder
-        reminders_list = [r for r in reminders_list if r['id'] != reminder_id]
-        
-        # Save back to Firebase
-        if save_user_data(username, 'reminders', {'reminders': reminders_list}):
+        # Remove just this reminder's document
+        migrate_legacy_reminders(username)
+        if delete_user_reminder(username, reminder_id):
             return jsonify({'success': True})
         else:
             return jsonify({'error': 'Error deleting reminder'}), 500
         
     except Exception as e:
-        print(f"Error deleting reminder: {e}")
+        reminder_logger.error("Error deleting reminder: %s", e)
         return jsonify({'error': 'Error deleting reminder'}), 500
 
+# Operations accepted by one bulk request. Each changed reminder costs up to
+# six writes (document, three schedule entries, ledger, index key), so this
+# keeps a request inside a single Firestore batch of 500 writes.
+REMINDER_BULK_MAX_OPERATIONS = int(os.getenv('REMINDER_BULK_MAX_OPERATIONS', '50'))
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+# How long a key stays claimed by a request still running; if the process
+# dies mid-request, retries may take the key over after this
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', '60'))
+
+def get_idempotency_path(username, key):
+    """Get storage path for the stored outcome of one idempotent request"""
+    return f"{PROFILES_COLLECTION}/{username}/idempotency/{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+def begin_idempotent_request(username, key, request_hash):
+    """Claim an idempotency key.
+
+    Returns (None, None) if this request should run, or (response, status)
+    to send instead: the stored outcome of an earlier identical request, or
+    an error if the key is in use by another request.
+    """
+    now = time.time()
+    outcome = {}
+
+    def claim(current):
+        if current and current.get('expires_at', 0) > now:
+            outcome['current'] = current
+            return None
+        return {'request_hash': request_hash, 'state': 'in_progress', 'created_at': now,
+                'expires_at': now + IDEMPOTENCY_LEASE_SECONDS}
+
+    if storage.transact(get_idempotency_path(username, key), claim) is not None:
+        return None, None
+    current = outcome['current']
+    if current.get('request_hash') != request_hash:
+        return {'error': 'Idempotency key was already used for a different request'}, 422
+    if current.get('state') != 'done':
+        return {'error': 'A request with this idempotency key is still in progress'}, 409
+    return current['response'], current['status']
+
+def finish_idempotent_request(username, key, request_hash, response, status):
+    """Store a request's outcome under its idempotency key (or free the key if it failed)"""
+    path = get_idempotency_path(username, key)
+    if status >= 500:
+        storage.delete(path)
+        return
+    now = time.time()
+    storage.set(path, {'request_hash': request_hash, 'state': 'done', 'response': response, 'status': status,
+                       'created_at': now, 'expires_at': now + IDEMPOTENCY_TTL_SECONDS})
+
+def plan_bulk_reminder_operations(reminders_list, operations):
+    """Apply complete/update/delete operations to a copy of the list.
+
+    Returns (updated list, per-operation results, ok).  Operations run in
+    order, so later ones see earlier ones' changes; if any fails, ok is
+    False and nothing should be written.
+    """
+    by_id = {reminder['id']: dict(reminder) for reminder in reminders_list}
+    results = []
+    for index, operation in enumerate(operations):
+        result = {'index': index}
+        results.append(result)
+        if not isinstance(operation, dict):
+            result.update({'status': 'error', 'error': 'Operation must be an object'})
+            continue
+        op = operation.get('op')
+        reminder_id = operation.get('id')
+        result.update({'op': op, 'id': reminder_id})
+        if op not in ('complete', 'update', 'delete'):
+            result.update({'status': 'error', 'error': f'Unknown op: {op!r}'})
+            continue
+        if not isinstance(reminder_id, str):
+            result.update({'status': 'error', 'error': 'Reminder id must be a string'})
+            continue
+        if reminder_id not in by_id:
+            result.update({'status': 'error', 'error': 'Reminder not found'})
+            continue
+        if op == 'delete':
+            del by_id[reminder_id]
+            result['status'] = 'ok'
+            continue
+        fields = operation.get('fields') or {}
+        if op == 'complete':
+            fields = {'completed': operation.get('completed', True)}
+            if not isinstance(fields['completed'], bool):
+                result.update({'status': 'error', 'error': 'completed must be true or false'})
+                continue
+        elif not isinstance(fields, dict) or not fields:
+            result.update({'status': 'error', 'error': 'update needs a non-empty fields object'})
+            continue
+        elif due_date_field_error(fields):
+            result.update({'status': 'error', 'error': due_date_field_error(fields)})
+            continue
+        by_id[reminder_id] = apply_reminder_update(by_id[reminder_id], fields)
+        result.update({'status': 'ok', 'reminder': by_id[reminder_id]})
+
+    # An update may not turn a reminder into a copy of another one
+    original_keys = {reminder['id']: reminder_duplicate_key(reminder) for reminder in reminders_list}
+    owners = {}
+    for reminder in by_id.values():
+        owners.setdefault(reminder_duplicate_key(reminder), []).append(reminder['id'])
+    clashing = {rid for ids in owners.values() if len(ids) > 1 for rid in ids}
+    for result in results:
+        if (result.get('status') == 'ok' and result.get('op') == 'update' and result['id'] in clashing
+                and reminder_duplicate_key(by_id[result['id']]) != original_keys[result['id']]):
+            result.update({'status': 'error', 'error': 'Duplicate reminder detected'})
+            result.pop('reminder', None)
+
+    ok = all(result['status'] == 'ok' for result in results)
+    return [r for r in (by_id.get(reminder['id']) for reminder in reminders_list) if r is not None], results, ok
+
+def apply_bulk_reminder_operations(username, operations):
+    """Plan and write bulk operations in one storage transaction.
+
+    The touched reminders and the duplicate-index entries they claim are read
+    inside the transaction, so a concurrent write elsewhere makes it retry
+    instead of being overwritten.  Returns (results, ok).
+    """
+    reminder_ids = sorted({op.get('id') for op in operations if isinstance(op, dict) and isinstance(op.get('id'), str)})
+
+    def plan(read):
+        originals = [r for r in (read(get_user_reminder_path(username, rid)) for rid in reminder_ids) if r is not None]
+        updated, results, ok = plan_bulk_reminder_operations(sort_reminders(originals), operations)
+        if not ok:
+            return [], (results, False)
+
+        original_by_id = {r['id']: r for r in originals}
+        updated_by_id = {r['id']: r for r in updated}
+        changed = [r for r in updated if r != original_by_id[r['id']]]
+        for reminder in changed:
+            normalize_reminder_due_date(reminder)
+        # Keys this batch gives up: deleted reminders and ones whose key changes
+        released = {r.get('dedup_key') for r in originals
+                    if r['id'] not in updated_by_id
+                    or (updated_by_id[r['id']] in changed and reminder_key_hash(updated_by_id[r['id']]) != r.get('dedup_key'))}
+
+        operations_out = []
+        claimed = set()
+        for reminder in changed:
+            previous = original_by_id[reminder['id']]
+            key_hash = reminder_key_hash(reminder)
+            if key_hash != previous.get('dedup_key'):
+                current = read(get_reminder_key_path(username, key_hash))
+                owner = current.get('reminder_id') if current else None
+                # An owner that no longer exists never released the key; take it over
+                if (owner not in (None, reminder['id']) and key_hash not in released
+                        and read(get_user_reminder_path(username, owner)) is not None):
+                    for result in results:
+                        if result.get('id') == reminder['id'] and result['status'] == 'ok':
+                            result.update({'status': 'error', 'error': 'Duplicate reminder detected'})
+                            result.pop('reminder', None)
+                    return [], (results, False)
+                operations_out.append(('set', get_reminder_key_path(username, key_hash),
+                                       {'reminder_id': reminder['id'], 'claimed_at': time.time()}))
+                claimed.add(key_hash)
+            reminder['dedup_key'] = key_hash
+            operations_out.append(('set', get_user_reminder_path(username, reminder['id']), reminder))
+            operations_out.extend(reminder_schedule_operations(username, reminder['id'], reminder))
+        for reminder_id, previous in original_by_id.items():
+            if reminder_id not in updated_by_id:
+                operations_out.append(('delete', get_user_reminder_path(username, reminder_id), None))
+                operations_out.extend(reminder_schedule_operations(username, reminder_id))
+        # Release given-up keys unless another reminder in this batch just claimed them
+        for key_hash in released - claimed - {None}:
+            operations_out.append(('delete', get_reminder_key_path(username, key_hash), None))
+        return operations_out, (results, True)
+
+    try:
+        return storage.run_transaction(plan)
+    finally:
+        reminder_list_cache.invalidate(username)
+
+@app.route('/api/reminders/bulk', methods=['POST'])
+@login_required
+def bulk_update_reminders():
+    """Apply many complete, update and delete operations to reminders in one atomic write.
+
+    Body: {"operations": [{"op": "complete" | "update" | "delete", "id": ...,
+    "fields": {...} (update), "completed": bool (complete, default true)}]}.
+    Either every operation is applied or none is; the response has one
+    result per operation.  An Idempotency-Key header (or "idempotency_key"
+    field) makes retries safe: repeating the request returns the first
+    response without applying anything again.
+    """
+    username = session.get('username')
+    if not username:
+        return jsonify({'error': 'Please log in to update reminders'}), 401
+
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Provide a non-empty operations list'}), 400
+    if len(operations) > REMINDER_BULK_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {REMINDER_BULK_MAX_OPERATIONS} operations per request'}), 400
+
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    request_hash = hashlib.sha1(json.dumps(operations, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    if idempotency_key:
+        replay, replay_status = begin_idempotent_request(username, str(idempotency_key), request_hash)
+        if replay is not None:
+            response = jsonify(replay)
+            response.headers['Idempotent-Replay'] = 'true'
+            return response, replay_status
+
+    try:
+        # Builds the duplicate index first if this user's reminders predate it
+        load_user_reminders(username)
+        results, ok = apply_bulk_reminder_operations(username, operations)
+        if not ok:
+            body, status = {'success': False, 'applied': False, 'results': results}, 400
+        else:
+            body, status = {'success': True, 'applied': True, 'results': results}, 200
+    except Exception as e:
+        reminder_logger.error("Error applying bulk reminder operations: %s", e)
+        body, status = {'error': 'Error updating reminders'}, 500
+
+    if idempotency_key:
+        finish_idempotent_request(username, str(idempotency_key), request_hash, body, status)
+    return jsonify(body), status
+
 @app.route('/api/reminders/email-settings', methods=['GET', 'POST'])
 @login_required
 def email_settings():
     """Get or update email notification settings"""
-    print(f"🔥 EMAIL SETTINGS ENDPOINT CALLED - Method: {request.method}")
+    email_logger.debug("🔥 EMAIL SETTINGS ENDPOINT CALLED - Method: %s", request.method)
     try:
         username = session.get('username')
-        print(f"🔥 Username from session: {username}")
+        email_logger.debug("🔥 Username from session: %s", username)
         if not username:
-            print("🔥 No username in session")
+            email_logger.debug("🔥 No username in session")
             return jsonify({'error': 'User not found in session'}), 401
 
+        # Notifications always go to the registration email, whatever the frontend sends
+        user_profile = find_user_by_username(username)
+        user_email = user_profile.get('email', '') if user_profile else ''
+
         if request.method == 'GET':
             # Get current email settings
             user_data = get_user_data(username, 'email_settings')
 
-            # Get user's registration email
-            user_profile = find_user_by_username(username)
-            user_email = user_profile.get('email', '') if user_profile else ''
-
             settings = user_data.get('settings', {
                 'enabled': False,
                 'notify_24h': True,
@@ -1560,10 +2331,6 @@ def email_settings():
             if not data:
                 return jsonify({'error': 'No data provided'}), 400
 
-            # Get user's registration email (always use this, ignore any email from frontend)
-            user_profile = find_user_by_username(username)
-            user_email = user_profile.get('email', '') if user_profile else ''
-
             settings = {
                 'enabled': data.get('enabled', False),
                 'notify_24h': data.get('notify_24h', True),
@@ -1574,24 +2341,26 @@ def email_settings():
             }
 
             if save_user_data(username, 'email_settings', {'settings': settings}):
+                # Notifications dropped while disabled become eligible again
+                reschedule_user_reminders(username)
                 return jsonify({'success': True, 'settings': settings})
             else:
                 return jsonify({'error': 'Error saving email settings'}), 500
 
     except Exception as e:
-        print(f"Error handling email settings: {e}")
+        email_logger.error("Error handling email settings: %s", e)
         return jsonify({'error': 'Error handling email settings'}), 500
 
 @app.route('/api/reminders/send-test-email', methods=['POST'])
 @login_required
 def send_test_email():
     """Send a test email reminder"""
-    print("🔥 TEST EMAIL ENDPOINT CALLED!")
+    email_logger.debug("🔥 TEST EMAIL ENDPOINT CALLED!")
     try:
         username = session.get('username')
-        print(f"🔥 Username from session: {username}")
+        email_logger.debug("🔥 Username from session: %s", username)
         if not username:
-            print("🔥 No username in session")
+            email_logger.debug("🔥 No username in session")
             return jsonify({'error': 'User not found in session'}), 401
 
         # Get user's registration email
@@ -1610,14 +2379,14 @@ def send_test_email():
             'countdown': 'Due in 1 day'
         }
 
-        # Send test email to user's registration email
-        if send_email_reminder(user_email, test_reminder):
-            return jsonify({'success': True, 'message': f'Test email sent successfully to {user_email}!'})
+        # Queue test email to user's registration email
+        if email_outbox.enqueue(user_email, test_reminder, dedup_key='test_email'):
+            return jsonify({'success': True, 'message': f'Test email queued for {user_email}! It should arrive shortly.'})
         else:
-            return jsonify({'error': 'Failed to send test email. Check email configuration.'}), 500
+            return jsonify({'error': 'A test email is already queued or the outbox is full. Please try again shortly.'}), 429
 
     except Exception as e:
-        print(f"Error sending test email: {e}")
+        email_logger.error("Error sending test email: %s", e)
         return jsonify({'error': 'Error sending test email'}), 500
 
 @app.route('/api/reminders/check-email-notifications', methods=['POST'])
@@ -1625,15 +2394,15 @@ def send_test_email():
 def manual_email_check():
     """Manually trigger email notification check"""
     try:
-        print("🔔 Manual email notification check triggered!")
+        email_logger.info("🔔 Manual email notification check triggered!")
         notifications_sent = check_and_send_email_reminders()
         return jsonify({
             'success': True,
-            'message': f'Email check completed. Sent {notifications_sent} notifications.',
+            'message': f'Email check completed. Queued {notifications_sent} notifications.',
             'notifications_sent': notifications_sent
         })
     except Exception as e:
-        print(f"Error in manual email check: {e}")
+        email_logger.error("Error in manual email check: %s", e)
         return jsonify({'error': 'Error checking email notifications'}), 500
 
 @app.route('/api/reminders/fix-major-time', methods=['POST', 'GET'])
@@ -1646,45 +2415,38 @@ def fix_major_reminder_time():
             return jsonify({'error': 'User not logged in'}), 401
 
         # Get user's reminders
-        reminders_data = get_user_data(username, 'reminders')
-        if not reminders_data or 'reminders' not in reminders_data:
+        original_reminders = load_user_reminders(username, fresh=True)
+        if not original_reminders:
             return jsonify({'error': 'No reminders found'}), 404
 
-        reminders = reminders_data['reminders']
+        reminders = [dict(r) for r in original_reminders]
 
         # Find and fix the MAJOR reminder
         fixed = False
         for reminder in reminders:
             if reminder.get('title') == 'MAJOR':
-                # Parse the current due date
-                current_due_str = reminder.get('due_date', '')
-                if current_due_str:
-                    try:
-                        # Parse current date
-                        current_due = datetime.fromisoformat(current_due_str.replace('Z', ''))
-                        # Change time to 11:00 AM
-                        new_due = current_due.replace(hour=11, minute=0, second=0, microsecond=0)
-                        # Update the reminder
-                        reminder['due_date'] = new_due.isoformat()
-                        fixed = True
-                        print(f"🔧 Fixed MAJOR reminder time: {current_due} -> {new_due}")
-                        break
-                    except Exception as e:
-                        print(f"Error parsing date: {e}")
-                        return jsonify({'error': f'Error parsing date: {e}'}), 500
+                due_at = reminder_due_at(reminder)
+                if due_at is None:
+                    return jsonify({'error': f"Error parsing date: {reminder.get('due_date')!r}"}), 500
+                # Change time to 11:00 AM IST on the same day
+                current_due = datetime.fromtimestamp(due_at, IST)
+                new_due = current_due.replace(hour=11, minute=0, second=0, microsecond=0)
+                reminder['due_date'] = new_due.isoformat()
+                fixed = True
+                reminder_logger.info("🔧 Fixed MAJOR reminder time: %s -> %s", current_due, new_due)
+                break
 
         if fixed:
             # Save updated reminders
-            save_user_data(username, 'reminders', {'reminders': reminders})
+            sync_user_reminders(username, original_reminders, reminders)
 
             # Clear the sent notifications for MAJOR so it can send again at correct time
-            sent_notifications_data = get_user_data(username, 'sent_notifications')
-            if sent_notifications_data and 'notifications' in sent_notifications_data:
-                sent_list = sent_notifications_data['notifications']
-                # Remove MAJOR notifications
-                sent_list = [notif for notif in sent_list if 'MAJOR' not in notif]
-                save_user_data(username, 'sent_notifications', {'notifications': sent_list})
-                print("🧹 Cleared MAJOR notification history")
+            migrate_legacy_sent_notifications(username)
+            storage.batch_write([
+                ('delete', get_sent_notification_path(username, reminder['id']), None)
+                for reminder in reminders if reminder.get('title') == 'MAJOR'
+            ])
+            reminder_logger.info("🧹 Cleared MAJOR notification history")
 
             return jsonify({
                 'success': True,
@@ -1694,7 +2456,7 @@ def fix_major_reminder_time():
             return jsonify({'error': 'MAJOR reminder not found'}), 404
 
     except Exception as e:
-        print(f"Error fixing MAJOR reminder: {e}")
+        reminder_logger.error("Error fixing MAJOR reminder: %s", e)
         return jsonify({'error': 'Error fixing reminder time'}), 500
 
 @app.route('/api/reminders/clear-notifications', methods=['POST', 'GET'])
@@ -1707,8 +2469,13 @@ def clear_all_notifications():
             return jsonify({'error': 'User not logged in'}), 401
 
         # Clear all sent notifications
-        save_user_data(username, 'sent_notifications', {'notifications': []})
-        print(f"🧹 Cleared all notification history for user: {username}")
+        migrate_legacy_sent_notifications(username)
+        storage.batch_write([
+            ('delete', get_sent_notification_path(username, reminder_id), None)
+            for reminder_id, _ in storage.stream(get_sent_notifications_path(username))
+        ])
+        reschedule_user_reminders(username)
+        reminder_logger.info("🧹 Cleared all notification history for user: %s", username)
 
         return jsonify({
             'success': True,
@@ -1716,7 +2483,7 @@ def clear_all_notifications():
         })
 
     except Exception as e:
-        print(f"Error clearing notifications: {e}")
+        reminder_logger.error("Error clearing notifications: %s", e)
         return jsonify({'error': 'Error clearing notification history'}), 500
 
 # Timetable API Routes
@@ -1733,7 +2500,7 @@ def get_timetable():
         return jsonify({'timetable': timetable_data})
 
     except Exception as e:
-        print(f"Error retrieving timetable: {e}")
+        logger.error("Error retrieving timetable: %s", e)
         return jsonify({'error': 'Error retrieving timetable'}), 500
 
 @app.route('/api/timetable', methods=['POST'])
@@ -1757,9 +2524,74 @@ def save_timetable():
             return jsonify({'error': 'Error saving timetable'}), 500
 
     except Exception as e:
-        print(f"Error saving timetable: {e}")
+        logger.error("Error saving timetable: %s", e)
         return jsonify({'error': 'Error saving timetable'}), 500
 
+# Exam timetables are normalized when saved: exams are sorted by start time
+# and exam_index['starts'] holds their start times (UTC epoch seconds) in the
+# same order, so /api/next-exam is a binary search.  Exams whose date or time
+# can't be parsed are kept after the indexed ones.  next_exam_cache keeps each
+# user's index in this process; the timetable's version is also written to a
+# small data/exam_timetable_version document, and every lookup checks the
+# cached version against it, so a save made by another worker shows up on
+# the next poll.
+next_exam_cache = TTLCache(
+    max_size=int(os.getenv('NEXT_EXAM_CACHE_SIZE', '2048')),
+    ttl=float(os.getenv('NEXT_EXAM_CACHE_TTL', '300'))
+)
+
+def exam_start_at(exam):
+    """Get an exam's start (IST date and time, 09:00 if no time) as UTC epoch seconds"""
+    exam_date = datetime.strptime(exam['date'], '%Y-%m-%d')
+    exam_time_str = exam.get('time') or '09:00'  # Default to 9 AM if no time
+    # Clean time string - remove (FN), (AN) suffixes
+    exam_time_str = exam_time_str.split('(')[0].strip()
+    exam_time = datetime.strptime(exam_time_str, '%H:%M').time()
+    return datetime.combine(exam_date.date(), exam_time, tzinfo=IST).timestamp()
+
+def index_exam_timetable(exam_timetable_data):
+    """Return the timetable with exams sorted by start time and an exam_index of their starts"""
+    timed = []
+    untimed = []
+    for exam in exam_timetable_data.get('exams') or []:
+        try:
+            start_at = exam_start_at(exam)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.debug("Exam without a usable date/time: %s", e)
+            untimed.append(exam)
+            continue
+        timed.append((start_at, exam))
+    timed.sort(key=lambda item: item[0])
+
+    exams = [exam for _, exam in timed] + untimed
+    version = hashlib.sha1(json.dumps(exams, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    return {
+        **exam_timetable_data,
+        'exams': exams,
+        'exam_index': {'starts': [start_at for start_at, _ in timed], 'version': version}
+    }
+
+def get_exam_index(username):
+    """Get (starts, exams, version) for the user's timetable, from the cache while its version is current"""
+    stored = storage.get(get_user_data_path(username, 'exam_timetable_version'))
+    stored_version = stored.get('version') if stored else None
+    index = next_exam_cache.get(username)
+    if index is None or index['stored_version'] != stored_version:
+        # Read past user_data_cache, which may hold another worker's old copy
+        doc = storage.get(get_user_data_path(username, 'exam_timetable'))
+        exam_timetable_data = (doc or {}).get('data') or {}
+        if 'exam_index' not in exam_timetable_data:
+            # Saved before timetables were indexed
+            exam_timetable_data = index_exam_timetable(exam_timetable_data)
+        index = {
+            'starts': exam_timetable_data['exam_index']['starts'],
+            'exams': exam_timetable_data.get('exams', []),
+            'version': exam_timetable_data['exam_index']['version'],
+            'stored_version': stored_version
+        }
+        next_exam_cache.set(username, index)
+    return index['starts'], index['exams'], index['version']
+
 # Exam Timetable API Routes
 @app.route('/api/exam-timetable', methods=['GET'])
 @login_required
@@ -1770,11 +2602,12 @@ def get_exam_timetable():
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        exam_timetable_data = get_user_data(username, 'exam_timetable')
+        exam_timetable_data = dict(get_user_data(username, 'exam_timetable'))
+        exam_timetable_data.pop('exam_index', None)
         return jsonify({'exam_timetable': exam_timetable_data})
 
     except Exception as e:
-        print(f"Error retrieving exam timetable: {e}")
+        logger.error("Error retrieving exam timetable: %s", e)
         return jsonify({'error': 'Error retrieving exam timetable'}), 500
 
 @app.route('/api/exam-timetable', methods=['POST'])
@@ -1790,84 +2623,75 @@ def save_exam_timetable():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        exam_timetable_data = data.get('exam_timetable', {})
+        exam_timetable_data = index_exam_timetable(data.get('exam_timetable') or {})
+        updated_at = datetime.now().isoformat()
 
-        if save_user_data(username, 'exam_timetable', exam_timetable_data):
-            return jsonify({'success': True, 'message': 'Exam timetable saved successfully'})
-        else:
+        # The timetable and its version document change together
+        try:
+            storage.batch_write([
+                ('set', get_user_data_path(username, 'exam_timetable'), {'data': exam_timetable_data, 'updated_at': updated_at}),
+                ('set', get_user_data_path(username, 'exam_timetable_version'), {
+                    'version': exam_timetable_data['exam_index']['version'],
+                    'updated_at': updated_at
+                })
+            ])
+        except Exception as e:
+            user_data_cache.invalidate((username, 'exam_timetable'))
+            logger.error("Error saving exam timetable for %s: %s", username, e)
             return jsonify({'error': 'Error saving exam timetable'}), 500
 
+        user_data_cache.set((username, 'exam_timetable'), exam_timetable_data)
+        next_exam_cache.invalidate(username)
+        return jsonify({'success': True, 'message': 'Exam timetable saved successfully'})
+
     except Exception as e:
-        print(f"Error saving exam timetable: {e}")
+        logger.error("Error saving exam timetable: %s", e)
         return jsonify({'error': 'Error saving exam timetable'}), 500
 
 @app.route('/api/next-exam', methods=['GET'])
 @login_required
 def get_next_exam():
-    """Get the next upcoming exam for countdown display"""
+    """Get the next upcoming exam for countdown display.
+
+    starts_at is the exam's start as UTC epoch seconds; days_left,
+    hours_left and minutes_left are as of the response, so clients should
+    count down from starts_at.  The ETag covers only the timetable version
+    and which exam is next, so a poll with If-None-Match gets a 304 until
+    that exam starts or the timetable is saved.
+    """
     try:
         username = session.get('username')
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        exam_timetable_data = get_user_data(username, 'exam_timetable')
-
-        if not exam_timetable_data or 'exams' not in exam_timetable_data:
-            return jsonify({'next_exam': None})
+        starts, exams, version = get_exam_index(username)
+        now = time.time()
+        position = bisect.bisect_right(starts, now)
 
-        from datetime import datetime, timezone, timedelta
+        upcoming = position < len(starts)
+        etag = f"{version}-{position}"
 
-        # Get current time in IST (India Standard Time) for consistency
-        ist_offset = timedelta(hours=5, minutes=30)
-        ist = timezone(ist_offset)
-        now = datetime.now(ist)
-        print(f"🕐 Current time (IST): {now}")
-
-        upcoming_exams = []
-
-        for exam in exam_timetable_data['exams']:
-            try:
-                # Parse exam date and time
-                exam_date = datetime.strptime(exam['date'], '%Y-%m-%d')
-                exam_time_str = exam.get('time', '09:00')  # Default to 9 AM if no time
-
-                # Clean time string - remove (FN), (AN) suffixes
-                if '(' in exam_time_str:
-                    exam_time_str = exam_time_str.split('(')[0].strip()
-
-                exam_time = datetime.strptime(exam_time_str, '%H:%M').time()
-
-                # Combine date and time and set to IST timezone
-                exam_datetime = datetime.combine(exam_date.date(), exam_time)
-                exam_datetime = exam_datetime.replace(tzinfo=ist)
-
-                # Only include future exams
-                if exam_datetime > now:
-                    time_diff = exam_datetime - now
-                    exam['datetime'] = exam_datetime.strftime('%Y-%m-%d %H:%M:%S')
-                    exam['days_left'] = time_diff.days
-                    exam['hours_left'] = time_diff.seconds // 3600
-                    exam['minutes_left'] = (time_diff.seconds % 3600) // 60
-                    upcoming_exams.append(exam)
-                    print(f"✅ Found upcoming exam: {exam['subject']} in {time_diff}")
-
-            except (ValueError, KeyError) as e:
-                print(f"❌ Error parsing exam: {e}")
-                continue
-
-        # Sort by datetime and get the next exam
-        if upcoming_exams:
-            upcoming_exams.sort(key=lambda x: x['datetime'])
-            next_exam = upcoming_exams[0]
-            return jsonify({'next_exam': next_exam})
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
         else:
-            return jsonify({'next_exam': None})
+            next_exam = None
+            if upcoming:
+                time_diff = timedelta(seconds=int(starts[position] - now))
+                next_exam = dict(exams[position])
+                next_exam['starts_at'] = starts[position]
+                next_exam['datetime'] = datetime.fromtimestamp(starts[position], IST).strftime('%Y-%m-%d %H:%M:%S')
+                next_exam['days_left'] = time_diff.days
+                next_exam['hours_left'] = time_diff.seconds // 3600
+                next_exam['minutes_left'] = (time_diff.seconds % 3600) // 60
+            response = jsonify({'next_exam': next_exam})
+
+        response.set_etag(etag)
+        # Always revalidate: a saved timetable must show up on the next poll
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
 
     except Exception as e:
-        print(f"❌ Error getting next exam: {e}")
-        print(f"❌ Error type: {type(e)}")
-        import traceback
-        print(f"❌ Full traceback: {traceback.format_exc()}")
+        logger.exception("❌ Error getting next exam: %s", e)
 
         # Return a safe response for hosting environments
         try:
@@ -1875,7 +2699,88 @@ def get_next_exam():
         except:
             return jsonify({'next_exam': None}), 200
 
-# CGPA API Routes
+# CGPA helpers
+# Grade scales the calculators understand: best and worst grade, and the step
+# used for the planner's default target/SGPA grid.  On the 5-point (German)
+# scale 1.0 is the best grade, so lower is better.
+GPA_SCALES = {
+    10: {'best': 10.0, 'worst': 0.0, 'step': 0.25},
+    5: {'best': 1.0, 'worst': 5.0, 'step': 0.1},
+    4: {'best': 4.0, 'worst': 0.0, 'step': 0.1},
+}
+# Upper bound on targets plus SGPA scenarios evaluated in one planner request
+CGPA_PLAN_MAX_POINTS = int(os.getenv('CGPA_PLAN_MAX_POINTS', '400'))
+
+def convert_gpa_scale(cgpa, scale):
+    """Convert a grade on `scale` to the other two scales and a percentage"""
+    if scale == 10:
+        # 10-point scale (Indian system)
+        return {
+            'gpa_4_scale': round(max(0, ((cgpa - 5) * 4) / 5), 2),  # Convert 10-point to 4-point
+            'gpa_5_scale': round(cgpa / 2, 2),  # Convert 10-point to 5-point
+            'percentage': round((cgpa - 0.75) * 10, 1)  # CGPA to percentage conversion
+        }
+    if scale == 5:
+        # 5-point scale (German system) - lower is better
+        return {
+            'gpa_4_scale': round((6 - cgpa) * 4 / 5, 2),  # Convert 5-point to 4-point
+            'gpa_10_scale': round((6 - cgpa) * 2, 2),  # Convert 5-point to 10-point
+            'percentage': round(max(0, (6 - cgpa) * 20), 1)  # Approximate percentage
+        }
+    if scale == 4:
+        # 4-point scale (US GPA)
+        return {
+            'gpa_10_scale': round((cgpa * 5) + 5, 2),  # Convert 4-point to 10-point
+            'gpa_5_scale': round((4 - cgpa) + 1, 2),  # Convert 4-point to 5-point (German)
+            'percentage': round((cgpa / 4) * 100, 1)  # GPA to percentage
+        }
+    return {}
+
+def summarize_semesters(semesters):
+    """Return (total_credits, total_grade_points, per-semester rows) for the valid semesters"""
+    total_credits = 0
+    total_grade_points = 0
+    semester_results = []
+
+    for i, semester in enumerate(semesters):
+        sgpa = float(semester.get('sgpa', 0))
+        credits = float(semester.get('credits', 0))
+
+        if sgpa > 0 and credits > 0:
+            grade_points = sgpa * credits
+            total_credits += credits
+            total_grade_points += grade_points
+
+            semester_results.append({
+                'semester': f"Semester {i + 1}",
+                'sgpa': sgpa,
+                'credits': credits,
+                'grade_points': grade_points
+            })
+
+    return total_credits, total_grade_points, semester_results
+
+def parse_grade_grid(value, scale):
+    """Read a list of grades or a {"start", "stop", "step"} range; None means the whole scale"""
+    limits = GPA_SCALES[scale]
+    low, high = sorted((limits['worst'], limits['best']))
+    if value is None:
+        value = {'start': low, 'stop': high, 'step': limits['step']}
+    if isinstance(value, dict):
+        start = float(value.get('start', low))
+        stop = float(value.get('stop', high))
+        step = float(value.get('step', limits['step']))
+        if step <= 0 or stop < start:
+            raise ValueError('Grade ranges need start <= stop and a positive step')
+        count = int(round((stop - start) / step, 9)) + 1
+        if count > CGPA_PLAN_MAX_POINTS:
+            raise ValueError(f'At most {CGPA_PLAN_MAX_POINTS} grid points per request')
+        # Multiply rather than accumulate so 0.1 steps don't drift
+        value = [start + k * step for k in range(count)]
+    if not isinstance(value, list):
+        raise ValueError('Grades must be a list or a {"start", "stop", "step"} range')
+    return [round(float(grade), 4) for grade in value]
+
 @app.route('/api/calculate_cgpa', methods=['POST'])
 @login_required
 def calculate_cgpa():
@@ -1891,47 +2796,12 @@ def calculate_cgpa():
         if not semesters:
             return jsonify({'error': 'No semester data provided'}), 400
 
-        total_credits = 0
-        total_grade_points = 0
-        semester_results = []
-
-        for i, semester in enumerate(semesters):
-            sgpa = float(semester.get('sgpa', 0))
-            credits = float(semester.get('credits', 0))
-
-            if sgpa > 0 and credits > 0:
-                grade_points = sgpa * credits
-                total_credits += credits
-                total_grade_points += grade_points
-
-                semester_results.append({
-                    'semester': f"Semester {i + 1}",
-                    'sgpa': sgpa,
-                    'credits': credits,
-                    'grade_points': grade_points
-                })
+        total_credits, total_grade_points, semester_results = summarize_semesters(semesters)
 
         if total_credits == 0:
             return jsonify({'error': 'No valid semester data found'}), 400
 
         cgpa = total_grade_points / total_credits
-
-        # Calculate conversions based on the selected scale
-        if scale == 10:
-            # 10-point scale (Indian system)
-            gpa_4_scale = max(0, ((cgpa - 5) * 4) / 5)  # Convert 10-point to 4-point
-            gpa_5_scale = cgpa / 2  # Convert 10-point to 5-point
-            percentage = (cgpa - 0.75) * 10  # CGPA to percentage conversion
-        elif scale == 5:
-            # 5-point scale (German system) - lower is better
-            gpa_4_scale = (6 - cgpa) * 4 / 5  # Convert 5-point to 4-point
-            gpa_10_scale = (6 - cgpa) * 2  # Convert 5-point to 10-point
-            percentage = max(0, (6 - cgpa) * 20)  # Approximate percentage
-        elif scale == 4:
-            # 4-point scale (US GPA)
-            gpa_10_scale = (cgpa * 5) + 5  # Convert 4-point to 10-point
-            gpa_5_scale = (4 - cgpa) + 1  # Convert 4-point to 5-point (German)
-            percentage = (cgpa / 4) * 100  # GPA to percentage
                 
         # Build result based on scale
         result = {
@@ -1944,24 +2814,7 @@ def calculate_cgpa():
         }
 
         # Add conversions based on scale
-        if scale == 10:
-            result.update({
-                'gpa_4_scale': round(gpa_4_scale, 2),
-                'gpa_5_scale': round(gpa_5_scale, 2),
-                'percentage': round(percentage, 1)
-            })
-        elif scale == 5:
-            result.update({
-                'gpa_4_scale': round(gpa_4_scale, 2),
-                'gpa_10_scale': round(gpa_10_scale, 2),
-                'percentage': round(percentage, 1)
-            })
-        elif scale == 4:
-            result.update({
-                'gpa_10_scale': round(gpa_10_scale, 2),
-                'gpa_5_scale': round(gpa_5_scale, 2),
-                'percentage': round(percentage, 1)
-            })
+        result.update(convert_gpa_scale(cgpa, scale))
                 
         # Save calculation to Firebase
         add_user_calculation(username, 'cgpa', result)
@@ -1969,9 +2822,167 @@ def calculate_cgpa():
         return jsonify(result)
             
     except Exception as e:
-        print(f"CGPA calculation error: {e}")
+        logger.error("CGPA calculation error: %s", e)
         return jsonify({'error': 'Error calculating CGPA'}), 500
 
+@app.route('/api/cgpa/plan', methods=['POST'])
+@login_required
+def plan_cgpa():
+    """What-if and target planner for CGPA.
+
+    Body: {"semesters": [{"sgpa", "credits"}, ...], "remaining_credits": 44
+    (or a list of per-semester credits), "scale": 10, "targets": [...] or
+    {"start", "stop", "step"}, "sgpas": [...] or a range}.  With C, G the
+    credits and grade points so far and R the remaining credits, every
+    target T needs an SGPA of (T * (C + R) - G) / R and every SGPA s ends at
+    a CGPA of (G + s * R) / (C + R), so the whole grid is evaluated in one
+    pass.  Nothing is saved to history.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            scale = int(data.get('scale', 10))
+        except (TypeError, ValueError):
+            scale = None
+        if scale not in GPA_SCALES:
+            return jsonify({'error': f'Scale must be one of {sorted(GPA_SCALES)}'}), 400
+
+        try:
+            credits_done, grade_points, _ = summarize_semesters(data.get('semesters') or [])
+            remaining = data.get('remaining_credits', 0)
+            remaining_credits = sum(float(c) for c in remaining) if isinstance(remaining, list) else float(remaining)
+            targets = parse_grade_grid(data.get('targets'), scale)
+            sgpas = parse_grade_grid(data.get('sgpas'), scale)
+        except (TypeError, ValueError, AttributeError) as e:
+            return jsonify({'error': str(e) or 'Invalid planner input'}), 400
+
+        if remaining_credits <= 0:
+            return jsonify({'error': 'Remaining credits must be greater than 0'}), 400
+        if len(targets) + len(sgpas) > CGPA_PLAN_MAX_POINTS:
+            return jsonify({'error': f'At most {CGPA_PLAN_MAX_POINTS} grid points per request'}), 400
+
+        limits = GPA_SCALES[scale]
+        low, high = sorted((limits['worst'], limits['best']))
+        lower_is_better = limits['best'] < limits['worst']
+        final_credits = credits_done + remaining_credits
+        current = grade_points / credits_done if credits_done else None
+
+        required_curve = []
+        for target, required in zip(targets, ((t * final_credits - grade_points) / remaining_credits for t in targets)):
+            # Anything at least as good as `required` also reaches the target;
+            # it is out of reach only when even the best grade falls short
+            if lower_is_better:
+                achievable, already_met = required >= low, required >= high
+            else:
+                achievable, already_met = required <= high, required <= low
+            required_curve.append({
+                'target': target,
+                'required_sgpa': round(required, 2),
+                'achievable': achievable,
+                'already_met': already_met
+            })
+
+        what_if = []
+        for sgpa, projected in zip(sgpas, ((grade_points + s * remaining_credits) / final_credits for s in sgpas)):
+            what_if.append({'sgpa': sgpa, 'cgpa': round(projected, 2), **convert_gpa_scale(projected, scale)})
+
+        result = {
+            'scale': scale,
+            'lower_is_better': lower_is_better,
+            'completed_credits': credits_done,
+            'remaining_credits': remaining_credits,
+            'current_cgpa': round(current, 2) if current is not None else None,
+            'required_curve': required_curve,
+            'what_if': what_if
+        }
+        if current is not None:
+            result['current_conversions'] = convert_gpa_scale(current, scale)
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error("CGPA planner error: %s", e)
+        return jsonify({'error': 'Error planning CGPA'}), 500
+
+def parse_class_count(value):
+    """Parse a class count, accepting 7, 7.0 or "7" but not 7.9 or true"""
+    if isinstance(value, bool):
+        raise ValueError('Attended and total classes must be whole numbers')
+    try:
+        count = Fraction(str(value).strip())
+    except (TypeError, ValueError, ZeroDivisionError):
+        raise ValueError('Attended, total and minimum required must be numbers')
+    if count.denominator != 1:
+        raise ValueError('Attended and total classes must be whole numbers')
+    return int(count)
+
+def attendance_plan(attended, total, min_required, subject_name='Subject'):
+    """Work out attendance status, classes needed and classes that can be skipped.
+
+    Both counts come from closed forms on exact fractions.  With p the
+    required share, attending x more classes in a row reaches it when
+    (attended + x) / (total + x) >= p, i.e. x >= (p * total - attended) / (1 - p);
+    skipping y classes keeps it while attended / (total + y) >= p, i.e.
+    y <= attended / p - total.  future_classes is None when the target can
+    no longer be reached (100% after an absence) and can_skip is None when
+    any number of classes can be skipped (0% required).  Raises ValueError
+    for inputs that make no sense.
+    """
+    attended = parse_class_count(attended)
+    total = parse_class_count(total)
+    try:
+        required = Fraction(str(min_required))
+    except (TypeError, ValueError):
+        raise ValueError('Attended, total and minimum required must be numbers')
+    min_required = float(min_required)
+
+    if total <= 0:
+        raise ValueError('Total classes must be greater than 0')
+    if attended < 0:
+        raise ValueError('Attended classes cannot be negative')
+    if attended > total:
+        raise ValueError('Attended classes cannot exceed total classes')
+    if not 0 <= required <= 100:
+        raise ValueError('Minimum required must be between 0 and 100')
+
+    share = required / 100
+    current_percent = attended / total * 100
+    future_classes = 0
+    can_skip = 0
+    if Fraction(attended, total) < share:
+        # share > 0 here; share == 1 means every missed class is permanent
+        future_classes = None if share == 1 else math.ceil((share * total - attended) / (1 - share))
+    else:
+        can_skip = None if share == 0 else math.floor(attended / share) - total
+
+    status = 'safe' if Fraction(attended, total) >= share else 'at_risk'
+    message = f"Your attendance is {'above' if status == 'safe' else 'below'} the required {min_required}%"
+
+    if status == 'safe':
+        if can_skip is None:
+            recommendation = f"You can skip any number of classes and still maintain {min_required}% attendance."
+        elif can_skip > 0:
+            recommendation = f"You can skip up to {can_skip} classes and still maintain {min_required}% attendance."
+        else:
+            recommendation = "Keep maintaining your good attendance!"
+    elif future_classes is None:
+        recommendation = f"{min_required}% attendance can no longer be reached after a missed class."
+    else:
+        recommendation = f"You need to attend the next {future_classes} classes consecutively to reach {min_required}% attendance."
+
+    return {
+        'current_percent': round(current_percent, 2),
+        'attended': attended,
+        'total': total,
+        'min_required': min_required,
+        'status': status,
+        'message': message,
+        'recommendation': recommendation,
+        'future_classes': future_classes,
+        'can_skip': can_skip,
+        'subject_name': subject_name,
+        'calculated_at': datetime.now().isoformat()
+    }
+
 @app.route('/api/calculate_attendance', methods=['POST'])
 @login_required
 def calculate_attendance():
@@ -1980,73 +2991,78 @@ def calculate_attendance():
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-                    
-        attended = int(data.get('attended', 0))
-        total = int(data.get('total', 0))
-        min_required = float(data.get('min_required', 75))
-        subject_name = data.get('subject_name', 'Subject')
-                
-        if total <= 0:
-            return jsonify({'error': 'Total classes must be greater than 0'}), 400
-                
-        if attended > total:
-            return jsonify({'error': 'Attended classes cannot exceed total classes'}), 400
-                
-        current_percent = (attended / total) * 100
-                
-        # Calculate future requirements
-        future_classes = 0
-        can_skip = 0
-                
-        if current_percent < min_required:
-            # Calculate classes needed
-            while True:
-                future_total = total + future_classes
-                future_attended = attended + future_classes
-                future_percent = (future_attended / future_total) * 100
-                                
-                if future_percent >= min_required:
-                    break
-                future_classes += 1
-        else:
-            # Calculate classes that can be skipped
-            temp_total = total
-            while True:
-                temp_total += 1
-                if (attended / temp_total) * 100 >= min_required:
-                    can_skip += 1
-                else:
-                    break
-                
-        status = 'safe' if current_percent >= min_required else 'at_risk'
-        message = f"Your attendance is {'above' if status == 'safe' else 'below'} the required {min_required}%"
-                
-        if status == 'safe':
-            recommendation = f"You can skip up to {can_skip} classes and still maintain {min_required}% attendance." if can_skip > 0 else "Keep maintaining your good attendance!"
-        else:
-            recommendation = f"You need to attend the next {future_classes} classes consecutively to reach {min_required}% attendance."
-                
-        result = {
-            'current_percent': round(current_percent, 2),
-            'attended': attended,
-            'total': total,
-            'min_required': min_required,
-            'status': status,
-            'message': message,
-            'recommendation': recommendation,
-            'future_classes': future_classes,
-            'can_skip': can_skip,
-            'subject_name': subject_name,
-            'calculated_at': datetime.now().isoformat()
-        }
-                
+
+        try:
+            result = attendance_plan(data.get('attended', 0), data.get('total', 0),
+                                     data.get('min_required', 75), data.get('subject_name', 'Subject'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Save calculation to Firebase
         add_user_calculation(username, 'attendance', result)
-                
+
         return jsonify(result)
-            
+
     except Exception as e:
-        print(f"Attendance calculation error: {e}")
+        logger.error("Attendance calculation error: %s", e)
+        return jsonify({'error': 'Error calculating attendance'}), 500
+
+# Upper bound on subjects in one batch attendance request
+ATTENDANCE_BATCH_MAX_SUBJECTS = int(os.getenv('ATTENDANCE_BATCH_MAX_SUBJECTS', '50'))
+
+@app.route('/api/calculate_attendance/batch', methods=['POST'])
+@login_required
+def calculate_attendance_batch():
+    """Plan attendance for every subject at once.
+
+    Body: {"subjects": [{"subject_name", "attended", "total", "min_required"}, ...],
+    "save": true}.  Returns one plan (or error) per subject plus the combined
+    attendance, and records every valid plan in history with a single write.
+    """
+    try:
+        username = session.get('username')
+        data = request.get_json(silent=True) or {}
+        subjects = data.get('subjects')
+        if not isinstance(subjects, list) or not subjects:
+            return jsonify({'error': 'Provide a non-empty subjects list'}), 400
+        if len(subjects) > ATTENDANCE_BATCH_MAX_SUBJECTS:
+            return jsonify({'error': f'At most {ATTENDANCE_BATCH_MAX_SUBJECTS} subjects per request'}), 400
+
+        results = []
+        plans = []
+        for index, subject in enumerate(subjects):
+            if not isinstance(subject, dict):
+                results.append({'index': index, 'error': 'Each subject must be an object'})
+                continue
+            try:
+                plan = attendance_plan(subject.get('attended', 0), subject.get('total', 0),
+                                       subject.get('min_required', data.get('min_required', 75)),
+                                       subject.get('subject_name', f'Subject {index + 1}'))
+            except ValueError as e:
+                results.append({'index': index, 'subject_name': subject.get('subject_name'), 'error': str(e)})
+                continue
+            plans.append(plan)
+            results.append({'index': index, **plan})
+
+        attended = sum(plan['attended'] for plan in plans)
+        total = sum(plan['total'] for plan in plans)
+        overall = {
+            'attended': attended,
+            'total': total,
+            'current_percent': round(attended / total * 100, 2) if total else None,
+            'at_risk': [plan['subject_name'] for plan in plans if plan['status'] == 'at_risk'],
+            # Subjects whose target can no longer be reached have no count to add
+            'unreachable': [plan['subject_name'] for plan in plans if plan['future_classes'] is None],
+            'classes_needed': sum(plan['future_classes'] for plan in plans if plan['future_classes'] is not None)
+        }
+
+        if plans and data.get('save', True):
+            add_user_calculations(username, 'attendance', plans)
+
+        return jsonify({'subjects': results, 'overall': overall, 'errors': len(results) - len(plans)})
+
+    except Exception as e:
+        logger.error("Batch attendance calculation error: %s", e)
         return jsonify({'error': 'Error calculating attendance'}), 500
 
 @app.route('/api/holidays')
@@ -2090,7 +3106,7 @@ def get_holidays():
         return jsonify(holidays_list)
             
     except Exception as e:
-        print(f"Holidays error: {e}")
+        logger.error("Holidays error: %s", e)
         return jsonify({'error': 'Error fetching holidays'}), 500
 
 @app.route('/api/calendar')
@@ -2172,7 +3188,7 @@ def get_calendar():
         return jsonify(calendar_items)
 
     except Exception as e:
-        print(f"Calendar error: {e}")
+        logger.error("Calendar error: %s", e)
         return jsonify({'error': 'Error fetching calendar'}), 500
 
 @app.route('/api/calendar/events', methods=['GET'])
@@ -2190,7 +3206,7 @@ def get_calendar_events():
         return jsonify(events_list)
 
     except Exception as e:
-        print(f"Error getting calendar events: {e}")
+        logger.error("Error getting calendar events: %s", e)
         return jsonify({'error': 'Error getting events'}), 500
 
 @app.route('/api/calendar/events', methods=['POST'])
@@ -2221,20 +3237,16 @@ def add_calendar_event():
             'created_at': datetime.now().isoformat()
         }
 
-        # Get existing events
-        events_data = get_user_data(username, 'calendar_events')
-        events_list = events_data.get('events', []) if events_data else []
-
-        # Add new event
-        events_list.append(event)
+        # Add the event to the stored list (not a cached copy another worker may have changed)
+        def add_event(events_data):
+            return {**events_data, 'events': events_data.get('events', []) + [event]}
 
-        # Save events
-        save_user_data(username, 'calendar_events', {'events': events_list})
+        update_user_data(username, 'calendar_events', add_event)
 
         return jsonify({'success': True, 'event': event})
 
     except Exception as e:
-        print(f"Error adding calendar event: {e}")
+        logger.error("Error adding calendar event: %s", e)
         return jsonify({'error': 'Error adding event'}), 500
 
 @app.route('/api/calendar/events/<event_id>', methods=['PUT'])
@@ -2253,39 +3265,39 @@ def update_calendar_event(event_id):
         if not data.get('title') or not data.get('date'):
             return jsonify({'error': 'Title and date are required'}), 400
 
-        # Get existing events
-        events_data = get_user_data(username, 'calendar_events')
-        if not events_data or 'events' not in events_data:
-            return jsonify({'error': 'No events found'}), 404
-
-        events_list = events_data['events']
-
-        # Find and update event
-        event_found = False
-        for event in events_list:
-            if event['id'] == event_id:
-                event.update({
-                    'title': data['title'],
-                    'date': data['date'],
-                    'time': data.get('time'),
-                    'type': data.get('type', 'personal'),
-                    'description': data.get('description', ''),
-                    'color': data.get('color', 'blue'),
-                    'updated_at': datetime.now().isoformat()
-                })
-                event_found = True
-                break
+        outcome = {}
+
+        def update_event(events_data):
+            outcome['has_events'] = 'events' in events_data
+            outcome['found'] = False
+            events_list = events_data.get('events', [])
+
+            # Find and update event
+            for event in events_list:
+                if event['id'] == event_id:
+                    event.update({
+                        'title': data['title'],
+                        'date': data['date'],
+                        'time': data.get('time'),
+                        'type': data.get('type', 'personal'),
+                        'description': data.get('description', ''),
+                        'color': data.get('color', 'blue'),
+                        'updated_at': datetime.now().isoformat()
+                    })
+                    outcome['found'] = True
+                    return events_data
+            return None
 
-        if not event_found:
+        update_user_data(username, 'calendar_events', update_event)
+        if not outcome['has_events']:
+            return jsonify({'error': 'No events found'}), 404
+        if not outcome['found']:
             return jsonify({'error': 'Event not found'}), 404
 
-        # Save updated events
-        save_user_data(username, 'calendar_events', {'events': events_list})
-
         return jsonify({'success': True, 'message': 'Event updated successfully'})
 
     except Exception as e:
-        print(f"Error updating calendar event: {e}")
+        logger.error("Error updating calendar event: %s", e)
         return jsonify({'error': 'Error updating event'}), 500
 
 @app.route('/api/calendar/events/<event_id>', methods=['DELETE'])
@@ -2296,90 +3308,130 @@ def delete_calendar_event(event_id):
         if not username:
             return jsonify({'error': 'User not logged in'}), 401
 
-        # Get existing events
-        events_data = get_user_data(username, 'calendar_events')
-        if not events_data or 'events' not in events_data:
-            return jsonify({'error': 'No events found'}), 404
-
-        events_list = events_data['events']
+        outcome = {}
 
-        # Find and remove event
-        events_list = [event for event in events_list if event['id'] != event_id]
+        def remove_event(events_data):
+            outcome['has_events'] = 'events' in events_data
+            if not outcome['has_events']:
+                return None
+            # Find and remove event
+            return {**events_data, 'events': [event for event in events_data['events'] if event['id'] != event_id]}
 
-        # Save updated events
-        save_user_data(username, 'calendar_events', {'events': events_list})
+        update_user_data(username, 'calendar_events', remove_event)
+        if not outcome['has_events']:
+            return jsonify({'error': 'No events found'}), 404
 
         return jsonify({'success': True, 'message': 'Event deleted successfully'})
 
     except Exception as e:
-        print(f"Error deleting calendar event: {e}")
+        logger.error("Error deleting calendar event: %s", e)
         return jsonify({'error': 'Error deleting event'}), 500
 
 @app.route('/api/history')
 @login_required
 def get_history():
+    """Get calculation history, newest page of each type in chronological order.
+
+    Query: type=cgpa|attendance (default both), limit=N per type (default 10,
+    max 50), and cgpa_cursor / attendance_cursor from a previous response to
+    page further back.  A null cursor means there is nothing older.
+    """
     try:
         username = session.get('username')
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
-        
-        calculations = get_user_data(username, 'calculations')
-        if not calculations:
-            calculations = {'cgpa': [], 'attendance': []}
-                
-        # Return last 10 records for each type
-        user_cgpa = calculations.get('cgpa', [])[-10:]
-        user_attendance = calculations.get('attendance', [])[-10:]
-                
-        return jsonify({
-            'cgpa': user_cgpa,
-            'attendance': user_attendance
-        })
-            
+
+        try:
+            types = parse_query_list(request.args.get('type', ''), CALCULATION_TYPES, 'history type')
+            limit = int(request.args.get('limit', HISTORY_PAGE_DEFAULT_LIMIT))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        types = [calc_type for calc_type in CALCULATION_TYPES if not types or calc_type in types]
+        limit = max(1, min(limit, HISTORY_PAGE_MAX_LIMIT))
+
+        migrate_legacy_calculations(username)
+        history = {}
+        cursors = {}
+        for calc_type in types:
+            # One extra record tells us whether an older page exists
+            records = list_user_calculations(username, calc_type, limit + 1,
+                                             before=request.args.get(f'{calc_type}_cursor'))
+            page = records[:limit]
+            cursors[calc_type] = page[-1]['id'] if len(records) > limit else None
+            history[calc_type] = [{'id': record['id'], 'result': record.get('result'),
+                                   'timestamp': record.get('timestamp')} for record in reversed(page)]
+
+        return jsonify({**history, 'next_cursors': cursors})
+
     except Exception as e:
-        print(f"History error: {e}")
+        logger.error("History error: %s", e)
         return jsonify({'error': 'Error fetching history', 'details': str(e)}), 500
 
-@app.route('/api/delete_cgpa_record', methods=['DELETE'])
+@app.route('/api/history/trends')
 @login_required
-def delete_cgpa_record():
-    """Delete a specific CGPA calculation record"""
+def get_history_trends():
+    """Get trend lines over calculation history.
+
+    cgpa is keyed by grade scale and attendance by subject; each has count,
+    latest, delta from the previous value and a series of
+    {timestamp, value, moving_average} points.  type=cgpa|attendance limits
+    the response to one kind.
+    """
     try:
         username = session.get('username')
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        data = request.get_json()
-        if not data or 'timestamp' not in data:
-            return jsonify({'error': 'Timestamp is required'}), 400
+        try:
+            types = parse_query_list(request.args.get('type', ''), CALCULATION_TYPES, 'history type')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        timestamp = data['timestamp']
+        trends = storage.get(get_user_trends_path(username))
+        if trends is None or trends.get('stale'):
+            migrate_legacy_calculations(username)
+            trends = rebuild_user_trends(username)
 
-        # Get existing calculations
-        calculations = get_user_data(username, 'calculations')
-        if not calculations:
-            return jsonify({'error': 'No calculations found'}), 404
+        response = {'records': trends.get('records', 0), 'updated_at': trends.get('updated_at')}
+        for calc_type in CALCULATION_TYPES:
+            if not types or calc_type in types:
+                response[calc_type] = trends.get(calc_type, {})
+        return jsonify(response)
 
-        # Filter out the record with matching timestamp
-        cgpa_records = calculations.get('cgpa', [])
-        updated_cgpa = [record for record in cgpa_records if record.get('timestamp') != timestamp]
+    except Exception as e:
+        logger.error("History trends error: %s", e)
+        return jsonify({'error': 'Error fetching history trends', 'details': str(e)}), 500
 
-        # Check if any record was actually removed
-        if len(updated_cgpa) == len(cgpa_records):
-            return jsonify({'error': 'Record not found'}), 404
+def delete_calculation_record(calc_type, label):
+    """Delete the calculation record named by id (or legacy timestamp) in the request body"""
+    try:
+        username = session.get('username')
+        if not username:
+            return jsonify({'error': 'User not found in session'}), 401
 
-        # Update calculations
-        calculations['cgpa'] = updated_cgpa
+        data = request.get_json()
+        if not data or not (data.get('id') or 'timestamp' in data):
+            return jsonify({'error': 'Timestamp is required'}), 400
 
-        # Save back to Firebase
-        if save_user_data(username, 'calculations', calculations):
-            return jsonify({'success': True, 'message': 'CGPA record deleted successfully'})
-        else:
-            return jsonify({'error': 'Error saving updated calculations'}), 500
+        migrate_legacy_calculations(username)
+        records = find_user_calculations(username, calc_type, data.get('id'), data.get('timestamp'))
+        if not records:
+            return jsonify({'error': 'Record not found'}), 404
+
+        storage.batch_write([('delete', f"{get_user_calculations_path(username)}/{record['id']}", None)
+                             for record in records])
+        mark_user_trends_stale(username)
+        return jsonify({'success': True, 'message': f'{label} record deleted successfully'})
 
     except Exception as e:
-        print(f"Delete CGPA record error: {e}")
-        return jsonify({'error': 'Error deleting CGPA record', 'details': str(e)}), 500
+        logger.error("Delete %s record error: %s", calc_type, e)
+        return jsonify({'error': f'Error deleting {label} record', 'details': str(e)}), 500
+
+@app.route('/api/delete_cgpa_record', methods=['DELETE'])
+@login_required
+def delete_cgpa_record():
+    """Delete a specific CGPA calculation record"""
+    return delete_calculation_record('cgpa', 'CGPA')
 
 @app.route('/api/update_cgpa_record', methods=['PUT'])
 @login_required
@@ -2394,81 +3446,112 @@ def update_cgpa_record():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
+        record_id = data.get('id')
         timestamp = data.get('timestamp')
         updated_result = data.get('result')
 
-        if not timestamp or not updated_result:
+        if not (record_id or timestamp) or not updated_result:
             return jsonify({'error': 'Timestamp and result data required'}), 400
 
-        # Get existing calculations
-        calculations = get_user_data(username, 'calculations')
-        if not calculations:
-            return jsonify({'error': 'No calculations found'}), 404
-
-        # Find and update the record with matching timestamp
-        cgpa_records = calculations.get('cgpa', [])
-        updated = False
-
-        for record in cgpa_records:
-            if record.get('timestamp') == timestamp:
-                record['result'] = updated_result
-                record['timestamp'] = datetime.now().isoformat()  # Update timestamp
-                updated = True
-                break
-
-        if not updated:
+        migrate_legacy_calculations(username)
+        records = find_user_calculations(username, 'cgpa', record_id, timestamp)
+        if not records:
             return jsonify({'error': 'Record not found'}), 404
 
-        # Save updated calculations
-        if save_user_data(username, 'calculations', calculations):
-            return jsonify({'success': True, 'message': 'CGPA record updated successfully'})
-        else:
-            return jsonify({'error': 'Failed to save updated calculations'}), 500
+        # The id keeps the record in its place in history; only the timestamp moves
+        storage.update(f"{get_user_calculations_path(username)}/{records[0]['id']}", {
+            'result': updated_result,
+            'timestamp': datetime.now().isoformat()
+        })
+        mark_user_trends_stale(username)
+        return jsonify({'success': True, 'message': 'CGPA record updated successfully'})
 
     except Exception as e:
-        print(f"Update CGPA record error: {e}")
+        logger.error("Update CGPA record error: %s", e)
         return jsonify({'error': 'Error updating CGPA record', 'details': str(e)}), 500
 
 @app.route('/api/delete_attendance_record', methods=['DELETE'])
 @login_required
 def delete_attendance_record():
     """Delete a specific attendance record"""
-    try:
-        username = session.get('username')
-        if not username:
-            return jsonify({'error': 'User not found in session'}), 401
-
-        data = request.get_json()
-        if not data or 'timestamp' not in data:
-            return jsonify({'error': 'Timestamp is required'}), 400
-
-        timestamp = data['timestamp']
-
-        # Get existing calculations
-        calculations = get_user_data(username, 'calculations')
-        if not calculations:
-            return jsonify({'error': 'No calculations found'}), 404
-
-        # Filter out the record with matching timestamp
-        attendance_records = calculations.get('attendance', [])
-        updated_attendance = [record for record in attendance_records if record.get('timestamp') != timestamp]
-
-        # Check if any record was actually removed
-        if len(updated_attendance) == len(attendance_records):
-            return jsonify({'error': 'Record not found'}), 404
-
-        # Update calculations
-        calculations['attendance'] = updated_attendance
+    return delete_calculation_record('attendance', 'Attendance')
+
+# Expenses are stored one document per expense under
+# users/students/profiles/{username}/expenses/{id}, tagged with the month
+# (YYYY-MM) they fall in. expense_rollups/{YYYY-MM} keeps per-category
+# {'total', 'count'} for that month and is adjusted by every write, so the
+# stats endpoints never re-aggregate the full history.
+
+def get_user_expenses_path(username):
+    """Get storage path for the user's expenses collection"""
+    return f"{PROFILES_COLLECTION}/{username}/expenses"
+
+def get_user_expense_rollups_path(username):
+    """Get storage path for the user's monthly expense rollups"""
+    return f"{PROFILES_COLLECTION}/{username}/expense_rollups"
+
+def expense_month(date_str):
+    """Get the YYYY-MM bucket for an expense date"""
+    return datetime.fromisoformat(date_str.replace('Z', '+00:00')).strftime('%Y-%m')
+
+def add_expense_rollup_delta(deltas, month, expense, sign):
+    """Accumulate an expense's contribution (sign=1 adds, -1 removes) into per-month deltas"""
+    category = deltas.setdefault(month, {'categories': {}})['categories'].setdefault(
+        expense['category'], {'total': 0, 'count': 0})
+    category['total'] += sign * expense['amount']
+    category['count'] += sign
+
+def rollup_category_totals(rollup):
+    """Get {category: total} from a rollup, skipping categories with no expenses left"""
+    return {
+        category: round(values.get('total', 0), 2)
+        for category, values in (rollup or {}).get('categories', {}).items()
+        if values.get('count', 0) > 0
+    }
 
-        # Save back to Firebase
-        if save_user_data(username, 'calculations', calculations):
-            return jsonify({'success': True, 'message': 'Attendance record deleted successfully'})
-        else:
-            return jsonify({'error': 'Error saving updated calculations'}), 500
+def migrate_legacy_expenses(username):
+    """Move the legacy expenses list into per-expense documents and monthly rollups"""
+    legacy = get_user_data(username, 'expenses')
+    if isinstance(legacy, list):
+        # A cached legacy copy may predate another worker's migration
+        legacy = get_user_data(username, 'expenses', fresh=True)
+    if not isinstance(legacy, list):
+        return 0
 
-    except Exception as e:
-        print(f"Delete attendance record error: {e}")
-        return jsonify({'error': 'Error deleting attendance record', 'details': str(e)}), 500
+    operations = []
+    rollups = {}
+    for expense in legacy:
+        if not isinstance(expense, dict) or not isinstance(expense.get('amount'), (int, float)) or not expense.get('category'):
+            logger.warning("Skipping malformed legacy expense for %s: %r", username, expense)
+            continue
+        expense_id = str(expense.get('id') or '')
+        if not expense_id or '/' in expense_id:
+            expense_id = str(uuid.uuid4())
+        expense = {**expense, 'id': expense_id}
+        try:
+            month = expense_month(expense['date'])
+        except (KeyError, TypeError, ValueError):
+            month = (expense.get('created_at') or datetime.now().isoformat())[:7]
+        operations.append(('set', f"{get_user_expenses_path(username)}/{expense_id}", {**expense, 'month': month}))
+        add_expense_rollup_delta(rollups, month, expense, 1)
+    for month, rollup in rollups.items():
+        operations.append(('set', f"{get_user_expense_rollups_path(username)}/{month}", rollup))
+
+    marker = {'migrated_to': get_user_expenses_path(username), 'migrated_at': datetime.now().isoformat()}
+    operations.append(('set', get_user_data_path(username, 'expenses'), {
+        'data': marker,
+        'updated_at': marker['migrated_at']
+    }))
+    storage.batch_write(operations)
+    user_data_cache.set((username, 'expenses'), marker)
+    logger.info("Migrated %s legacy expenses for %s", len(legacy), username)
+    return len(legacy)
+
+def write_expense_changes(username, operations, rollup_deltas):
+    """Apply expense document writes and their rollup increments in one batch"""
+    for month, deltas in rollup_deltas.items():
+        operations.append(('increment', f"{get_user_expense_rollups_path(username)}/{month}", deltas))
+    storage.batch_write(operations)
 
 # Expense Tracker Routes
 @app.route('/api/expenses', methods=['GET'])
@@ -2480,14 +3563,16 @@ def get_expenses():
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        expenses = get_user_data(username, 'expenses')
-        if not expenses:
-            expenses = []
+        migrate_legacy_expenses(username)
+        expenses = [data for _, data in storage.stream(get_user_expenses_path(username))]
+        expenses.sort(key=lambda e: (e.get('created_at') or '', e.get('id', '')))
+        for expense in expenses:
+            expense.pop('month', None)
 
         return jsonify({'expenses': expenses})
 
     except Exception as e:
-        print(f"Get expenses error: {e}")
+        logger.error("Get expenses error: %s", e)
         return jsonify({'error': 'Error fetching expenses', 'details': str(e)}), 500
 
 @app.route('/api/expenses', methods=['POST'])
@@ -2519,22 +3604,22 @@ def add_expense():
             'created_at': datetime.now().isoformat()
         }
 
-        # Get existing expenses
-        expenses = get_user_data(username, 'expenses')
-        if not expenses:
-            expenses = []
-
-        # Add new expense
-        expenses.append(expense)
-
-        # Save to Firebase
-        if save_user_data(username, 'expenses', expenses):
-            return jsonify({'success': True, 'expense': expense})
-        else:
-            return jsonify({'error': 'Failed to save expense'}), 500
+        try:
+            month = expense_month(expense['date'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid date'}), 400
+
+        # Save the expense and bump its month's rollup together
+        migrate_legacy_expenses(username)
+        rollup_deltas = {}
+        add_expense_rollup_delta(rollup_deltas, month, expense, 1)
+        write_expense_changes(username, [
+            ('set', f"{get_user_expenses_path(username)}/{expense['id']}", {**expense, 'month': month})
+        ], rollup_deltas)
+        return jsonify({'success': True, 'expense': expense})
 
     except Exception as e:
-        print(f"Add expense error: {e}")
+        logger.error("Add expense error: %s", e)
         return jsonify({'error': 'Error adding expense', 'details': str(e)}), 500
 
 @app.route('/api/expenses/<expense_id>', methods=['PUT'])
@@ -2550,34 +3635,33 @@ def update_expense(expense_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        # Get existing expenses
-        expenses = get_user_data(username, 'expenses')
-        if not expenses:
-            return jsonify({'error': 'No expenses found'}), 404
-
-        # Find and update expense
-        expense_found = False
-        for expense in expenses:
-            if expense['id'] == expense_id:
-                expense['amount'] = float(data.get('amount', expense['amount']))
-                expense['category'] = data.get('category', expense['category'])
-                expense['description'] = data.get('description', expense['description'])
-                expense['date'] = data.get('date', expense['date'])
-                expense['updated_at'] = datetime.now().isoformat()
-                expense_found = True
-                break
-
-        if not expense_found:
+        # Find the expense
+        migrate_legacy_expenses(username)
+        expense_path = f"{get_user_expenses_path(username)}/{expense_id}"
+        old_expense = storage.get(expense_path)
+        if old_expense is None:
             return jsonify({'error': 'Expense not found'}), 404
 
-        # Save to Firebase
-        if save_user_data(username, 'expenses', expenses):
-            return jsonify({'success': True})
-        else:
-            return jsonify({'error': 'Failed to update expense'}), 500
+        expense = dict(old_expense)
+        expense['amount'] = float(data.get('amount', expense['amount']))
+        expense['category'] = data.get('category', expense['category'])
+        expense['description'] = data.get('description', expense['description'])
+        expense['date'] = data.get('date', expense['date'])
+        expense['updated_at'] = datetime.now().isoformat()
+        try:
+            expense['month'] = expense_month(expense['date'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid date'}), 400
+
+        # Move the amount from the old month/category to the new one
+        rollup_deltas = {}
+        add_expense_rollup_delta(rollup_deltas, old_expense['month'], old_expense, -1)
+        add_expense_rollup_delta(rollup_deltas, expense['month'], expense, 1)
+        write_expense_changes(username, [('set', expense_path, expense)], rollup_deltas)
+        return jsonify({'success': True})
 
     except Exception as e:
-        print(f"Update expense error: {e}")
+        logger.error("Update expense error: %s", e)
         return jsonify({'error': 'Error updating expense', 'details': str(e)}), 500
 
 @app.route('/api/expenses/<expense_id>', methods=['DELETE'])
@@ -2589,26 +3673,20 @@ def delete_expense(expense_id):
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        # Get existing expenses
-        expenses = get_user_data(username, 'expenses')
-        if not expenses:
-            return jsonify({'error': 'No expenses found'}), 404
-
-        # Filter out the expense to delete
-        original_count = len(expenses)
-        expenses = [expense for expense in expenses if expense['id'] != expense_id]
-
-        if len(expenses) == original_count:
+        # Find the expense to delete
+        migrate_legacy_expenses(username)
+        expense_path = f"{get_user_expenses_path(username)}/{expense_id}"
+        expense = storage.get(expense_path)
+        if expense is None:
             return jsonify({'error': 'Expense not found'}), 404
 
-        # Save to Firebase
-        if save_user_data(username, 'expenses', expenses):
-            return jsonify({'success': True})
-        else:
-            return jsonify({'error': 'Failed to delete expense'}), 500
+        rollup_deltas = {}
+        add_expense_rollup_delta(rollup_deltas, expense['month'], expense, -1)
+        write_expense_changes(username, [('delete', expense_path, None)], rollup_deltas)
+        return jsonify({'success': True})
 
     except Exception as e:
-        print(f"Delete expense error: {e}")
+        logger.error("Delete expense error: %s", e)
         return jsonify({'error': 'Error deleting expense', 'details': str(e)}), 500
 
 @app.route('/api/budgets', methods=['GET'])
@@ -2627,7 +3705,7 @@ def get_budgets():
         return jsonify({'budgets': budgets})
 
     except Exception as e:
-        print(f"Get budgets error: {e}")
+        logger.error("Get budgets error: %s", e)
         return jsonify({'error': 'Error fetching budgets', 'details': str(e)}), 500
 
 @app.route('/api/budgets', methods=['POST'])
@@ -2650,24 +3728,22 @@ def set_budget():
         if not category or not amount:
             return jsonify({'error': 'Category and amount are required'}), 400
 
-        # Get existing budgets
-        budgets = get_user_data(username, 'budgets')
-        if not budgets:
-            budgets = {}
+        amount = float(amount)
 
-        # Set budget for category and month
-        if month not in budgets:
-            budgets[month] = {}
-        budgets[month][category] = float(amount)
+        # Set budget for category and month on the stored budgets
+        def set_category_budget(budgets):
+            budgets.setdefault(month, {})[category] = amount
+            return budgets
 
-        # Save to Firebase
-        if save_user_data(username, 'budgets', budgets):
-            return jsonify({'success': True})
-        else:
+        try:
+            update_user_data(username, 'budgets', set_category_budget)
+        except Exception as e:
+            logger.error("Error saving budgets for %s: %s", username, e)
             return jsonify({'error': 'Failed to save budget'}), 500
+        return jsonify({'success': True})
 
     except Exception as e:
-        print(f"Set budget error: {e}")
+        logger.error("Set budget error: %s", e)
         return jsonify({'error': 'Error setting budget', 'details': str(e)}), 500
 
 @app.route('/api/expense-stats')
@@ -2679,35 +3755,24 @@ def get_expense_stats():
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        expenses = get_user_data(username, 'expenses')
         budgets = get_user_data(username, 'budgets')
-
-        if not expenses:
-            expenses = []
         if not budgets:
             budgets = {}
 
         current_month = datetime.now().strftime('%Y-%m')
 
-        # Calculate monthly totals by category
+        # Monthly totals by category come straight from the rollups
+        migrate_legacy_expenses(username)
         monthly_totals = {}
         category_totals = {}
 
-        for expense in expenses:
-            expense_date = datetime.fromisoformat(expense['date'].replace('Z', '+00:00'))
-            expense_month = expense_date.strftime('%Y-%m')
-            category = expense['category']
-            amount = expense['amount']
-
-            if expense_month not in monthly_totals:
-                monthly_totals[expense_month] = {}
-            if category not in monthly_totals[expense_month]:
-                monthly_totals[expense_month][category] = 0
-            monthly_totals[expense_month][category] += amount
-
-            if category not in category_totals:
-                category_totals[category] = 0
-            category_totals[category] += amount
+        for month, rollup in storage.stream(get_user_expense_rollups_path(username)):
+            totals = rollup_category_totals(rollup)
+            if not totals:
+                continue
+            monthly_totals[month] = totals
+            for category, amount in totals.items():
+                category_totals[category] = round(category_totals.get(category, 0) + amount, 2)
 
         # Check budget alerts for current month
         alerts = []
@@ -2743,7 +3808,7 @@ def get_expense_stats():
         })
 
     except Exception as e:
-        print(f"Get expense stats error: {e}")
+        logger.error("Get expense stats error: %s", e)
         return jsonify({'error': 'Error fetching expense statistics', 'details': str(e)}), 500
 
 @app.route('/api/budget-breakdown')
@@ -2755,26 +3820,17 @@ def get_budget_breakdown():
         if not username:
             return jsonify({'error': 'User not found in session'}), 401
 
-        expenses = get_user_data(username, 'expenses')
         budgets = get_user_data(username, 'budgets')
-
-        if not expenses:
-            expenses = []
         if not budgets:
             budgets = {}
 
         current_month = datetime.now().strftime('%Y-%m')
         current_month_budgets = budgets.get(current_month, {})
 
-        # Calculate spending by category for current month
-        current_month_expenses = {}
-        for expense in expenses:
-            expense_date = datetime.strptime(expense['date'], '%Y-%m-%d')
-            expense_month = expense_date.strftime('%Y-%m')
-
-            if expense_month == current_month:
-                category = expense['category']
-                current_month_expenses[category] = current_month_expenses.get(category, 0) + expense['amount']
+        # Spending by category for the current month is a single rollup read
+        migrate_legacy_expenses(username)
+        current_month_expenses = rollup_category_totals(
+            storage.get(f"{get_user_expense_rollups_path(username)}/{current_month}"))
 
         # Build breakdown data
         breakdown = {}
@@ -2798,7 +3854,7 @@ def get_budget_breakdown():
         })
 
     except Exception as e:
-        print(f"Get budget breakdown error: {e}")
+        logger.error("Get budget breakdown error: %s", e)
         return jsonify({'error': 'Error fetching budget breakdown', 'details': str(e)}), 500
 
 # Friend Request API Routes
@@ -2806,120 +3862,95 @@ def get_budget_breakdown():
 @login_required
 def search_user():
     """Search for a user by username"""
-    print("🔍 DEBUG: ===== SEARCH USER ENDPOINT HIT =====")
+    social_logger.debug("🔍 ===== SEARCH USER ENDPOINT HIT =====")
     try:
         username = request.args.get('username', '').strip()
-        print(f"🔍 DEBUG: Searching for username: '{username}'")
+        social_logger.debug("🔍 Searching for username: '%s'", username)
 
         if not username:
             return jsonify({'success': False, 'message': 'Username is required'}), 400
 
         # Search in Firebase profiles collection
-        if db:
-            print(f"🔍 DEBUG: Firebase connected, searching for username: '{username}'")
+        social_logger.debug("🔍 Looking up profile for username: '%s'", username)
 
-            # Try the correct Firebase path: users/students/profiles/{username}
-            try:
-                # Correct syntax for nested collections in Firestore
-                profile_doc = db.collection('users').document('students').collection('profiles').document(username).get()
-                print(f"🔍 DEBUG: Checking users/students/profiles/{username} - exists: {profile_doc.exists}")
-
-                if profile_doc.exists:
-                    user_data = profile_doc.to_dict()
-                    print(f"🔍 DEBUG: Found user data in nested path: {user_data}")
-                    return jsonify({
-                        'success': True,
-                        'user': {
-                            'username': username,
-                            'student_name': user_data.get('student_name', ''),
-                            'email': user_data.get('email', ''),
-                            'course': user_data.get('course', ''),
-                            'college': user_data.get('college', ''),
-                            'phone': user_data.get('phone', ''),
-                            'student_id': user_data.get('student_id', ''),
-                            'from_year': user_data.get('from_year', ''),
-                            'to_year': user_data.get('to_year', '')
-                        }
-                    })
-            except Exception as e:
-                print(f"🔍 DEBUG: Error accessing nested path: {e}")
+        # Try the correct Firebase path: users/students/profiles/{username}
+        try:
+            # Correct syntax for nested collections in Firestore
+            user_data = storage.get(get_user_profile_path(username))
+            social_logger.debug("🔍 Checking users/students/profiles/%s - exists: %s", username, user_data is not None)
 
-            # Try the profiles collection directly as fallback
-            try:
-                profiles_ref = db.collection('profiles')
-                profile_doc = profiles_ref.document(username).get()
-                print(f"🔍 DEBUG: Checking profiles/{username} - exists: {profile_doc.exists}")
-
-                if profile_doc.exists:
-                    user_data = profile_doc.to_dict()
-                    print(f"🔍 DEBUG: Found user data in profiles: {user_data}")
-                    return jsonify({
-                        'success': True,
-                        'user': {
-                            'username': username,
-                            'student_name': user_data.get('student_name', ''),
-                            'email': user_data.get('email', ''),
-                            'course': user_data.get('course', ''),
-                            'college': user_data.get('college', ''),
-                            'phone': user_data.get('phone', ''),
-                            'student_id': user_data.get('student_id', ''),
-                            'from_year': user_data.get('from_year', ''),
-                            'to_year': user_data.get('to_year', '')
-                        }
-                    })
-            except Exception as e:
-                print(f"🔍 DEBUG: Error accessing profiles collection: {e}")
+            if user_data is not None:
+                social_logger.debug("🔍 Found %s in nested profiles", username)
+                return jsonify({
+                    'success': True,
+                    'user': {
+                        'username': username,
+                        'student_name': user_data.get('student_name', ''),
+                        'email': user_data.get('email', ''),
+                        'course': user_data.get('course', ''),
+                        'college': user_data.get('college', ''),
+                        'phone': user_data.get('phone', ''),
+                        'student_id': user_data.get('student_id', ''),
+                        'from_year': user_data.get('from_year', ''),
+                        'to_year': user_data.get('to_year', '')
+                    }
+                })
+        except Exception as e:
+            social_logger.debug("🔍 Error accessing nested path: %s", e)
 
-            # Also try the users collection as fallback
-            try:
-                print(f"🔍 DEBUG: Trying users collection with query")
-                users_ref = db.collection('users')
-                query = users_ref.where('username', '==', username).limit(1)
-                docs = query.stream()
-
-                for doc in docs:
-                    user_data = doc.to_dict()
-                    print(f"🔍 DEBUG: Found in users collection: {user_data}")
-                    return jsonify({
-                        'success': True,
-                        'user': {
-                            'username': user_data.get('username'),
-                            'student_name': user_data.get('student_name'),
-                            'email': user_data.get('email'),
-                            'course': user_data.get('course', ''),
-                            'college': user_data.get('college', ''),
-                            'phone': user_data.get('phone', ''),
-                            'student_id': user_data.get('student_id', ''),
-                            'from_year': user_data.get('from_year', ''),
-                            'to_year': user_data.get('to_year', '')
-                        }
-                    })
-            except Exception as e:
-                print(f"🔍 DEBUG: Error accessing users collection: {e}")
+        # Try the profiles collection directly as fallback
+        try:
+            user_data = storage.get(f"profiles/{username}")
+            social_logger.debug("🔍 Checking profiles/%s - exists: %s", username, user_data is not None)
 
-            print(f"🔍 DEBUG: User '{username}' not found in any collection")
-            return jsonify({'success': False, 'message': 'User not found'})
-        else:
-            # Fallback to local JSON file
-            try:
-                with open('users.json', 'r') as f:
-                    users = json.load(f)
-                    for user in users:
-                        if user.get('username') == username:
-                            return jsonify({
-                                'success': True,
-                                'user': {
-                                    'username': user.get('username'),
-                                    'student_name': user.get('student_name'),
-                                    'email': user.get('email')
-                                }
-                            })
-                    return jsonify({'success': False, 'message': 'User not found'})
-            except FileNotFoundError:
-                return jsonify({'success': False, 'message': 'User database not available'})
+            if user_data is not None:
+                social_logger.debug("🔍 Found %s in profiles", username)
+                return jsonify({
+                    'success': True,
+                    'user': {
+                        'username': username,
+                        'student_name': user_data.get('student_name', ''),
+                        'email': user_data.get('email', ''),
+                        'course': user_data.get('course', ''),
+                        'college': user_data.get('college', ''),
+                        'phone': user_data.get('phone', ''),
+                        'student_id': user_data.get('student_id', ''),
+                        'from_year': user_data.get('from_year', ''),
+                        'to_year': user_data.get('to_year', '')
+                    }
+                })
+        except Exception as e:
+            social_logger.debug("🔍 Error accessing profiles collection: %s", e)
+
+        # Also try the users collection as fallback
+        try:
+            social_logger.debug("🔍 Trying users collection with query")
+            docs = storage.stream('users', [('username', '==', username)], limit=1)
+
+            for _, user_data in docs:
+                social_logger.debug("🔍 Found %s in users collection", username)
+                return jsonify({
+                    'success': True,
+                    'user': {
+                        'username': user_data.get('username'),
+                        'student_name': user_data.get('student_name'),
+                        'email': user_data.get('email'),
+                        'course': user_data.get('course', ''),
+                        'college': user_data.get('college', ''),
+                        'phone': user_data.get('phone', ''),
+                        'student_id': user_data.get('student_id', ''),
+                        'from_year': user_data.get('from_year', ''),
+                        'to_year': user_data.get('to_year', '')
+                    }
+                })
+        except Exception as e:
+            social_logger.debug("🔍 Error accessing users collection: %s", e)
+
+        social_logger.debug("🔍 User '%s' not found in any collection", username)
+        return jsonify({'success': False, 'message': 'User not found'})
 
     except Exception as e:
-        print(f"Error searching user: {e}")
+        social_logger.error("Error searching user: %s", e)
         return jsonify({'error': 'Error searching user', 'details': str(e)}), 500
 
 @app.route('/api/friend-requests', methods=['GET'])
@@ -2931,98 +3962,81 @@ def get_friend_requests():
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get sent requests
-            sent_requests = []
-            sent_ref = db.collection('friend_requests').where('from_username', '==', username).where('status', '==', 'pending')
-            for doc in sent_ref.stream():
-                data = doc.to_dict()
-                data['id'] = doc.id
-                sent_requests.append(data)
-
-            # Get received requests
-            received_requests = []
-            received_ref = db.collection('friend_requests').where('to_username', '==', username).where('status', '==', 'pending')
-            for doc in received_ref.stream():
-                data = doc.to_dict()
-                data['id'] = doc.id
-                received_requests.append(data)
-
-            # Get friends (accepted requests)
-            friends = []
-            friends_ref1 = db.collection('friend_requests').where('from_username', '==', username).where('status', '==', 'accepted')
-            for doc in friends_ref1.stream():
-                data = doc.to_dict()
-                friends.append({
-                    'username': data['to_username'],
-                    'student_name': data.get('to_student_name', ''),
-                    'accepted_at': data.get('updated_at')
-                })
-
-            friends_ref2 = db.collection('friend_requests').where('to_username', '==', username).where('status', '==', 'accepted')
-            for doc in friends_ref2.stream():
-                data = doc.to_dict()
-                friends.append({
-                    'username': data['from_username'],
-                    'student_name': data.get('from_student_name', ''),
-                    'accepted_at': data.get('updated_at')
-                })
-
-            # Get team invitations sent by this user
-            sent_team_invitations = []
-            sent_team_invites_ref = db.collection('team_invitations').where('from_username', '==', username)
-            for doc in sent_team_invites_ref.stream():
-                data = doc.to_dict()
-                sent_team_invitations.append({
-                    'id': doc.id,
-                    'type': 'team_invitation',
-                    'team_name': data.get('team_name', ''),
-                    'to_username': data.get('to_username', ''),
-                    'to_name': data.get('to_name', ''),
-                    'status': data.get('status', 'pending'),
-                    'created_at': data.get('created_at'),
-                    'updated_at': data.get('updated_at')
-                })
+        # Get sent requests
+        sent_requests = []
+        sent_docs = storage.stream('friend_requests', [('from_username', '==', username), ('status', '==', 'pending')])
+        for doc_id, data in sent_docs:
+            data['id'] = doc_id
+            sent_requests.append(data)
+
+        # Get received requests
+        received_requests = []
+        received_docs = storage.stream('friend_requests', [('to_username', '==', username), ('status', '==', 'pending')])
+        for doc_id, data in received_docs:
+            data['id'] = doc_id
+            received_requests.append(data)
+
+        # Get friends (accepted requests)
+        friends = []
+        friends_docs1 = storage.stream('friend_requests', [('from_username', '==', username), ('status', '==', 'accepted')])
+        for doc_id, data in friends_docs1:
+            friends.append({
+                'username': data['to_username'],
+                'student_name': data.get('to_student_name', ''),
+                'accepted_at': data.get('updated_at')
+            })
 
-            # Get team invitations received by this user
-            received_team_invitations = []
-            received_team_invites_ref = db.collection('team_invitations').where('to_username', '==', username).where('status', '==', 'pending')
-            for doc in received_team_invites_ref.stream():
-                data = doc.to_dict()
-                received_team_invitations.append({
-                    'id': doc.id,
-                    'type': 'team_invitation',
-                    'team_name': data.get('team_name', ''),
-                    'from_username': data.get('from_username', ''),
-                    'from_name': data.get('from_name', ''),
-                    'status': data.get('status', 'pending'),
-                    'created_at': data.get('created_at'),
-                    'updated_at': data.get('updated_at')
-                })
+        friends_docs2 = storage.stream('friend_requests', [('to_username', '==', username), ('status', '==', 'accepted')])
+        for doc_id, data in friends_docs2:
+            friends.append({
+                'username': data['from_username'],
+                'student_name': data.get('from_student_name', ''),
+                'accepted_at': data.get('updated_at')
+            })
 
-            return jsonify({
-                'success': True,
-                'data': {
-                    'sent': sent_requests,
-                    'received': received_requests,
-                    'friends': friends,
-                    'sent_team_invitations': sent_team_invitations,
-                    'received_team_invitations': received_team_invitations
-                }
+        # Get team invitations sent by this user
+        sent_team_invitations = []
+        sent_team_invites_docs = storage.stream('team_invitations', [('from_username', '==', username)])
+        for doc_id, data in sent_team_invites_docs:
+            sent_team_invitations.append({
+                'id': doc_id,
+                'type': 'team_invitation',
+                'team_name': data.get('team_name', ''),
+                'to_username': data.get('to_username', ''),
+                'to_name': data.get('to_name', ''),
+                'status': data.get('status', 'pending'),
+                'created_at': data.get('created_at'),
+                'updated_at': data.get('updated_at')
             })
-        else:
-            # Fallback - return empty data
-            return jsonify({
-                'success': True,
-                'data': {
-                    'sent': [],
-                    'received': [],
-                    'friends': []
-                }
+
+        # Get team invitations received by this user
+        received_team_invitations = []
+        received_team_invites_docs = storage.stream('team_invitations', [('to_username', '==', username), ('status', '==', 'pending')])
+        for doc_id, data in received_team_invites_docs:
+            received_team_invitations.append({
+                'id': doc_id,
+                'type': 'team_invitation',
+                'team_name': data.get('team_name', ''),
+                'from_username': data.get('from_username', ''),
+                'from_name': data.get('from_name', ''),
+                'status': data.get('status', 'pending'),
+                'created_at': data.get('created_at'),
+                'updated_at': data.get('updated_at')
             })
 
+        return jsonify({
+            'success': True,
+            'data': {
+                'sent': sent_requests,
+                'received': received_requests,
+                'friends': friends,
+                'sent_team_invitations': sent_team_invitations,
+                'received_team_invitations': received_team_invitations
+            }
+        })
+
     except Exception as e:
-        print(f"Error getting friend requests: {e}")
+        social_logger.error("Error getting friend requests: %s", e)
         return jsonify({'error': 'Error getting friend requests', 'details': str(e)}), 500
 
 @app.route('/api/friend-request-test', methods=['GET'])
@@ -3033,17 +4047,17 @@ def test_friend_request():
 @app.route('/api/send-friend-request', methods=['POST'])
 def send_friend_request_new():
     """Send a friend request - NEW ROUTE"""
-    print("🚀 DEBUG: Friend request POST endpoint hit!")
+    social_logger.debug("🚀 Friend request POST endpoint hit!")
     try:
         username = session.get('username')
-        print(f"🚀 DEBUG: Session username: {username}")
+        social_logger.debug("🚀 Session username: %s", username)
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
         data = request.get_json()
         to_username = data.get('to_username', '').strip()
-        print(f"🚀 DEBUG: Received request data: {data}")
-        print(f"🚀 DEBUG: Target username: '{to_username}'")
+        social_logger.debug("🚀 Received request data: %s", data)
+        social_logger.debug("🚀 Target username: '%s'", to_username)
 
         if not to_username:
             return jsonify({'success': False, 'message': 'Target username is required'}), 400
@@ -3051,100 +4065,90 @@ def send_friend_request_new():
         if to_username == username:
             return jsonify({'success': False, 'message': 'Cannot send friend request to yourself'}), 400
 
-        if db:
-            # Check if request already exists
-            existing_ref = db.collection('friend_requests').where('from_username', '==', username).where('to_username', '==', to_username)
-            existing_docs = list(existing_ref.stream())
+        # Check if request already exists
+        existing_docs = storage.stream('friend_requests', [('from_username', '==', username), ('to_username', '==', to_username)])
 
-            if existing_docs:
-                return jsonify({'success': False, 'message': 'Friend request already sent'}), 400
+        if existing_docs:
+            return jsonify({'success': False, 'message': 'Friend request already sent'}), 400
 
-            # Check if they are already friends (reverse direction)
-            reverse_ref = db.collection('friend_requests').where('from_username', '==', to_username).where('to_username', '==', username).where('status', '==', 'accepted')
-            reverse_docs = list(reverse_ref.stream())
+        # Check if they are already friends (reverse direction)
+        reverse_docs = storage.stream('friend_requests', [('from_username', '==', to_username), ('to_username', '==', username), ('status', '==', 'accepted')])
 
-            if reverse_docs:
-                return jsonify({'success': False, 'message': 'You are already friends'}), 400
+        if reverse_docs:
+            return jsonify({'success': False, 'message': 'You are already friends'}), 400
 
-            # Get user details
-            current_user_data = {}
-            target_user_data = {}
+        # Get user details
+        current_user_data = {}
+        target_user_data = {}
 
-            # Get current user data from profiles collection
-            profiles_ref = db.collection('profiles')
-            current_profile = profiles_ref.document(username).get()
-            if current_profile.exists:
-                current_user_data = current_profile.to_dict()
-                current_user_data['username'] = username
+        # Get current user data from profiles collection
+        current_profile = storage.get(f"profiles/{username}")
+        if current_profile is not None:
+            current_user_data = current_profile
+            current_user_data['username'] = username
 
-            # Get target user data - use same logic as search function
-            # Try nested path first: users/students/profiles/{username}
-            nested_profile_ref = db.collection('users').document('students').collection('profiles').document(to_username)
-            nested_profile = nested_profile_ref.get()
-            print(f"🚀 DEBUG: Nested profile exists for '{to_username}': {nested_profile.exists}")
+        # Get target user data - use same logic as search function
+        # Try nested path first: users/students/profiles/{username}
+        nested_profile = storage.get(get_user_profile_path(to_username))
+        social_logger.debug("🚀 Nested profile exists for '%s': %s", to_username, nested_profile is not None)
 
-            if nested_profile.exists:
-                target_user_data = nested_profile.to_dict()
+        if nested_profile is not None:
+            target_user_data = nested_profile
+            target_user_data['username'] = to_username
+            social_logger.debug("🚀 Found %s in nested profiles", to_username)
+        else:
+            # Fallback to direct profiles collection
+            target_profile = storage.get(f"profiles/{to_username}")
+            social_logger.debug("🚀 Direct profile exists for '%s': %s", to_username, target_profile is not None)
+            if target_profile is not None:
+                target_user_data = target_profile
                 target_user_data['username'] = to_username
-                print(f"🚀 DEBUG: Found user in nested profiles: {target_user_data}")
+                social_logger.debug("🚀 Found %s in direct profiles", to_username)
             else:
-                # Fallback to direct profiles collection
-                target_profile = profiles_ref.document(to_username).get()
-                print(f"🚀 DEBUG: Direct profile exists for '{to_username}': {target_profile.exists}")
-                if target_profile.exists:
-                    target_user_data = target_profile.to_dict()
-                    target_user_data['username'] = to_username
-                    print(f"🚀 DEBUG: Found user in direct profiles: {target_user_data}")
-                else:
-                    # Final fallback to users collection
-                    users_ref = db.collection('users')
-                    target_user_doc = users_ref.where('username', '==', to_username).limit(1).stream()
-                    for doc in target_user_doc:
-                        target_user_data = doc.to_dict()
-                        print(f"🚀 DEBUG: Found user in users collection: {target_user_data}")
-                        break
-
-            print(f"🚀 DEBUG: Final target_user_data: {target_user_data}")
-            if not target_user_data:
-                return jsonify({'success': False, 'message': 'Target user not found'}), 404
-
-            # Create friend request
-            request_data = {
-                'from_username': username,
-                'to_username': to_username,
-                'from_student_name': current_user_data.get('student_name', ''),
-                'to_student_name': target_user_data.get('student_name', ''),
-                'status': 'pending',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
+                # Final fallback to users collection
+                target_user_docs = storage.stream('users', [('username', '==', to_username)], limit=1)
+                for _, target_user_data in target_user_docs:
+                    social_logger.debug("🚀 Found %s in users collection", to_username)
+                    break
 
-            db.collection('friend_requests').add(request_data)
-            print(f"🚀 DEBUG: Friend request saved to database")
+        if not target_user_data:
+            return jsonify({'success': False, 'message': 'Target user not found'}), 404
 
-            return jsonify({'success': True, 'message': 'Friend request sent successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        # Create friend request
+        request_data = {
+            'from_username': username,
+            'to_username': to_username,
+            'from_student_name': current_user_data.get('student_name', ''),
+            'to_student_name': target_user_data.get('student_name', ''),
+            'status': 'pending',
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+
+        storage.add('friend_requests', request_data)
+        social_logger.debug("🚀 Friend request saved to database")
+
+        return jsonify({'success': True, 'message': 'Friend request sent successfully'})
 
     except Exception as e:
-        print(f"Error sending friend request: {e}")
+        social_logger.error("Error sending friend request: %s", e)
         return jsonify({'error': 'Error sending friend request', 'details': str(e)}), 500
 
 @app.route('/api/friend-request', methods=['POST'])
 @login_required
 def send_friend_request():
     """Send a friend request"""
-    print("🚀 DEBUG: Friend request POST endpoint hit!")
+    social_logger.debug("🚀 Friend request POST endpoint hit!")
     try:
         username = session.get('username')
-        print(f"🚀 DEBUG: Session username: {username}")
+        social_logger.debug("🚀 Session username: %s", username)
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
         data = request.get_json()
         to_username = data.get('to_username', '').strip()
-        print(f"🚀 DEBUG: Received request data: {data}")
-        print(f"🚀 DEBUG: Target username: '{to_username}'")
+        social_logger.debug("🚀 Received request data: %s", data)
+        social_logger.debug("🚀 Target username: '%s'", to_username)
 
         if not to_username:
             return jsonify({'success': False, 'message': 'Target username is required'}), 400
@@ -3152,71 +4156,62 @@ def send_friend_request():
         if to_username == username:
             return jsonify({'success': False, 'message': 'Cannot send friend request to yourself'}), 400
 
-        if db:
-            # Check if request already exists
-            existing_ref = db.collection('friend_requests').where('from_username', '==', username).where('to_username', '==', to_username)
-            existing_docs = list(existing_ref.stream())
-
-            if existing_docs:
-                return jsonify({'success': False, 'message': 'Friend request already sent'}), 400
-
-            # Check if they are already friends (reverse direction)
-            reverse_ref = db.collection('friend_requests').where('from_username', '==', to_username).where('to_username', '==', username).where('status', '==', 'accepted')
-            reverse_docs = list(reverse_ref.stream())
-
-            if reverse_docs:
-                return jsonify({'success': False, 'message': 'You are already friends'}), 400
-
-            # Get user details
-            current_user_data = {}
-            target_user_data = {}
-
-            # Get current user data from profiles collection
-            profiles_ref = db.collection('profiles')
-            current_profile = profiles_ref.document(username).get()
-            if current_profile.exists:
-                current_user_data = current_profile.to_dict()
-                current_user_data['username'] = username
-
-            # Get target user data from profiles collection
-            target_profile = profiles_ref.document(to_username).get()
-            print(f"🚀 DEBUG: Profile exists for '{to_username}': {target_profile.exists}")
-            if target_profile.exists:
-                target_user_data = target_profile.to_dict()
-                target_user_data['username'] = to_username
-                print(f"🚀 DEBUG: Found user in profiles: {target_user_data}")
-            else:
-                # Fallback to users collection
-                users_ref = db.collection('users')
-                target_user_doc = users_ref.where('username', '==', to_username).limit(1).stream()
-                for doc in target_user_doc:
-                    target_user_data = doc.to_dict()
-                    print(f"🚀 DEBUG: Found user in users collection: {target_user_data}")
-                    break
+        # Check if request already exists
+        existing_docs = storage.stream('friend_requests', [('from_username', '==', username), ('to_username', '==', to_username)])
 
-            print(f"🚀 DEBUG: Final target_user_data: {target_user_data}")
-            if not target_user_data:
-                return jsonify({'success': False, 'message': 'Target user not found'}), 404
-
-            # Create friend request
-            request_data = {
-                'from_username': username,
-                'to_username': to_username,
-                'from_student_name': current_user_data.get('student_name', ''),
-                'to_student_name': target_user_data.get('student_name', ''),
-                'status': 'pending',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
+        if existing_docs:
+            return jsonify({'success': False, 'message': 'Friend request already sent'}), 400
+
+        # Check if they are already friends (reverse direction)
+        reverse_docs = storage.stream('friend_requests', [('from_username', '==', to_username), ('to_username', '==', username), ('status', '==', 'accepted')])
+
+        if reverse_docs:
+            return jsonify({'success': False, 'message': 'You are already friends'}), 400
+
+        # Get user details
+        current_user_data = {}
+        target_user_data = {}
 
-            db.collection('friend_requests').add(request_data)
+        # Get current user data from profiles collection
+        current_profile = storage.get(f"profiles/{username}")
+        if current_profile is not None:
+            current_user_data = current_profile
+            current_user_data['username'] = username
 
-            return jsonify({'success': True, 'message': 'Friend request sent successfully'})
+        # Get target user data from profiles collection
+        target_profile = storage.get(f"profiles/{to_username}")
+        social_logger.debug("🚀 Profile exists for '%s': %s", to_username, target_profile is not None)
+        if target_profile is not None:
+            target_user_data = target_profile
+            target_user_data['username'] = to_username
+            social_logger.debug("🚀 Found %s in profiles", to_username)
         else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+            # Fallback to users collection
+            target_user_docs = storage.stream('users', [('username', '==', to_username)], limit=1)
+            for _, target_user_data in target_user_docs:
+                social_logger.debug("🚀 Found %s in users collection", to_username)
+                break
+
+        if not target_user_data:
+            return jsonify({'success': False, 'message': 'Target user not found'}), 404
+
+        # Create friend request
+        request_data = {
+            'from_username': username,
+            'to_username': to_username,
+            'from_student_name': current_user_data.get('student_name', ''),
+            'to_student_name': target_user_data.get('student_name', ''),
+            'status': 'pending',
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+
+        storage.add('friend_requests', request_data)
+
+        return jsonify({'success': True, 'message': 'Friend request sent successfully'})
 
     except Exception as e:
-        print(f"Error sending friend request: {e}")
+        social_logger.error("Error sending friend request: %s", e)
         return jsonify({'error': 'Error sending friend request', 'details': str(e)}), 500
 
 @app.route('/api/friend-request/<request_id>/accept', methods=['POST'])
@@ -3228,32 +4223,27 @@ def accept_friend_request(request_id):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get the friend request
-            doc_ref = db.collection('friend_requests').document(request_id)
-            doc = doc_ref.get()
+        # Get the friend request
+        request_path = f"friend_requests/{request_id}"
+        request_data = storage.get(request_path)
 
-            if not doc.exists:
-                return jsonify({'success': False, 'message': 'Friend request not found'}), 404
+        if request_data is None:
+            return jsonify({'success': False, 'message': 'Friend request not found'}), 404
 
-            request_data = doc.to_dict()
-
-            # Verify the request is for this user
-            if request_data.get('to_username') != username:
-                return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        # Verify the request is for this user
+        if request_data.get('to_username') != username:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
-            # Update status to accepted
-            doc_ref.update({
-                'status': 'accepted',
-                'updated_at': datetime.now().isoformat()
-            })
+        # Update status to accepted
+        storage.update(request_path, {
+            'status': 'accepted',
+            'updated_at': datetime.now().isoformat()
+        })
 
-            return jsonify({'success': True, 'message': 'Friend request accepted'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': 'Friend request accepted'})
 
     except Exception as e:
-        print(f"Error accepting friend request: {e}")
+        social_logger.error("Error accepting friend request: %s", e)
         return jsonify({'error': 'Error accepting friend request', 'details': str(e)}), 500
 
 @app.route('/api/friend-request/<request_id>/decline', methods=['POST'])
@@ -3265,29 +4255,24 @@ def decline_friend_request(request_id):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get the friend request
-            doc_ref = db.collection('friend_requests').document(request_id)
-            doc = doc_ref.get()
+        # Get the friend request
+        request_path = f"friend_requests/{request_id}"
+        request_data = storage.get(request_path)
 
-            if not doc.exists:
-                return jsonify({'success': False, 'message': 'Friend request not found'}), 404
+        if request_data is None:
+            return jsonify({'success': False, 'message': 'Friend request not found'}), 404
 
-            request_data = doc.to_dict()
-
-            # Verify the request is for this user
-            if request_data.get('to_username') != username:
-                return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        # Verify the request is for this user
+        if request_data.get('to_username') != username:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
-            # Delete the request (declined requests are removed)
-            doc_ref.delete()
+        # Delete the request (declined requests are removed)
+        storage.delete(request_path)
 
-            return jsonify({'success': True, 'message': 'Friend request declined'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': 'Friend request declined'})
 
     except Exception as e:
-        print(f"Error declining friend request: {e}")
+        social_logger.error("Error declining friend request: %s", e)
         return jsonify({'error': 'Error declining friend request', 'details': str(e)}), 500
 
 @app.route('/api/friend-request/<request_id>/cancel', methods=['POST'])
@@ -3299,29 +4284,24 @@ def cancel_friend_request(request_id):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get the friend request
-            doc_ref = db.collection('friend_requests').document(request_id)
-            doc = doc_ref.get()
-
-            if not doc.exists:
-                return jsonify({'success': False, 'message': 'Friend request not found'}), 404
+        # Get the friend request
+        request_path = f"friend_requests/{request_id}"
+        request_data = storage.get(request_path)
 
-            request_data = doc.to_dict()
+        if request_data is None:
+            return jsonify({'success': False, 'message': 'Friend request not found'}), 404
 
-            # Verify the request is from this user
-            if request_data.get('from_username') != username:
-                return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        # Verify the request is from this user
+        if request_data.get('from_username') != username:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
-            # Delete the request
-            doc_ref.delete()
+        # Delete the request
+        storage.delete(request_path)
 
-            return jsonify({'success': True, 'message': 'Friend request cancelled'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': 'Friend request cancelled'})
 
     except Exception as e:
-        print(f"Error cancelling friend request: {e}")
+        social_logger.error("Error cancelling friend request: %s", e)
         return jsonify({'error': 'Error cancelling friend request', 'details': str(e)}), 500
 
 # ===== MESSAGING API ROUTES =====
@@ -3343,34 +4323,28 @@ def send_message():
         if not to_username or not content:
             return jsonify({'success': False, 'message': 'Recipient and message content are required'}), 400
 
-        if db:
-            # Check if users are friends
-            friends_ref1 = db.collection('friend_requests').where('from_username', '==', username).where('to_username', '==', to_username).where('status', '==', 'accepted')
-            friends_ref2 = db.collection('friend_requests').where('from_username', '==', to_username).where('to_username', '==', username).where('status', '==', 'accepted')
-
-            friends1 = list(friends_ref1.stream())
-            friends2 = list(friends_ref2.stream())
-
-            if not friends1 and not friends2:
-                return jsonify({'success': False, 'message': 'You can only send messages to friends'}), 403
-
-            # Create message
-            message_data = {
-                'from_username': username,
-                'to_username': to_username,
-                'subject': subject,
-                'content': content,
-                'created_at': datetime.now().isoformat(),
-                'read': False
-            }
+        # Check if users are friends
+        friends1 = storage.stream('friend_requests', [('from_username', '==', username), ('to_username', '==', to_username), ('status', '==', 'accepted')])
+        friends2 = storage.stream('friend_requests', [('from_username', '==', to_username), ('to_username', '==', username), ('status', '==', 'accepted')])
 
-            db.collection('messages').add(message_data)
-            return jsonify({'success': True, 'message': 'Message sent successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        if not friends1 and not friends2:
+            return jsonify({'success': False, 'message': 'You can only send messages to friends'}), 403
+
+        # Create message
+        message_data = {
+            'from_username': username,
+            'to_username': to_username,
+            'subject': subject,
+            'content': content,
+            'created_at': datetime.now().isoformat(),
+            'read': False
+        }
+
+        storage.add('messages', message_data)
+        return jsonify({'success': True, 'message': 'Message sent successfully'})
 
     except Exception as e:
-        print(f"Error sending message: {e}")
+        social_logger.error("Error sending message: %s", e)
         return jsonify({'error': 'Error sending message', 'details': str(e)}), 500
 
 @app.route('/api/conversations', methods=['GET'])
@@ -3382,71 +4356,66 @@ def get_conversations():
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get all messages where user is either sender or receiver
-            sent_messages_ref = db.collection('messages').where('from_username', '==', username)
-            received_messages_ref = db.collection('messages').where('to_username', '==', username)
-
-            all_messages = []
-
-            # Get sent messages
-            for doc in sent_messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['id'] = doc.id
-                all_messages.append(message_data)
-
-            # Get received messages
-            for doc in received_messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['id'] = doc.id
-                all_messages.append(message_data)
-
-            # Group messages by conversation partner
-            conversations = {}
-            for message in all_messages:
-                # Determine the conversation partner
-                if message['from_username'] == username:
-                    partner = message['to_username']
-                else:
-                    partner = message['from_username']
-
-                if partner not in conversations:
-                    conversations[partner] = {
-                        'partner_username': partner,
-                        'messages': [],
-                        'unread_count': 0,
-                        'last_message_time': '',
-                        'last_message_content': ''
-                    }
+        # Get all messages where user is either sender or receiver
+        sent_messages_docs = storage.stream('messages', [('from_username', '==', username)])
+        received_messages_docs = storage.stream('messages', [('to_username', '==', username)])
+
+        all_messages = []
 
-                conversations[partner]['messages'].append(message)
+        # Get sent messages
+        for doc_id, message_data in sent_messages_docs:
+            message_data['id'] = doc_id
+            all_messages.append(message_data)
 
-                # Count unread messages (messages sent to current user that are unread)
-                if message['to_username'] == username and not message.get('read', False):
-                    conversations[partner]['unread_count'] += 1
+        # Get received messages
+        for doc_id, message_data in received_messages_docs:
+            message_data['id'] = doc_id
+            all_messages.append(message_data)
 
-            # Process each conversation
-            conversation_list = []
-            for partner, conv_data in conversations.items():
-                # Sort messages by time (newest first)
-                conv_data['messages'].sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        # Group messages by conversation partner
+        conversations = {}
+        for message in all_messages:
+            # Determine the conversation partner
+            if message['from_username'] == username:
+                partner = message['to_username']
+            else:
+                partner = message['from_username']
+
+            if partner not in conversations:
+                conversations[partner] = {
+                    'partner_username': partner,
+                    'messages': [],
+                    'unread_count': 0,
+                    'last_message_time': '',
+                    'last_message_content': ''
+                }
 
-                if conv_data['messages']:
-                    latest_message = conv_data['messages'][0]
-                    conv_data['last_message_time'] = latest_message.get('created_at', '')
-                    conv_data['last_message_content'] = latest_message.get('content', '')[:50] + ('...' if len(latest_message.get('content', '')) > 50 else '')
+            conversations[partner]['messages'].append(message)
 
-                conversation_list.append(conv_data)
+            # Count unread messages (messages sent to current user that are unread)
+            if message['to_username'] == username and not message.get('read', False):
+                conversations[partner]['unread_count'] += 1
 
-            # Sort conversations by last message time (newest first)
-            conversation_list.sort(key=lambda x: x.get('last_message_time', ''), reverse=True)
+        # Process each conversation
+        conversation_list = []
+        for partner, conv_data in conversations.items():
+            # Sort messages by time (newest first)
+            conv_data['messages'].sort(key=lambda x: x.get('created_at', ''), reverse=True)
 
-            return jsonify({'success': True, 'data': conversation_list})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+            if conv_data['messages']:
+                latest_message = conv_data['messages'][0]
+                conv_data['last_message_time'] = latest_message.get('created_at', '')
+                conv_data['last_message_content'] = latest_message.get('content', '')[:50] + ('...' if len(latest_message.get('content', '')) > 50 else '')
+
+            conversation_list.append(conv_data)
+
+        # Sort conversations by last message time (newest first)
+        conversation_list.sort(key=lambda x: x.get('last_message_time', ''), reverse=True)
+
+        return jsonify({'success': True, 'data': conversation_list})
 
     except Exception as e:
-        print(f"Error retrieving conversations: {e}")
+        social_logger.error("Error retrieving conversations: %s", e)
         return jsonify({'error': 'Error retrieving conversations', 'details': str(e)}), 500
 
 @app.route('/api/messages/<partner_username>', methods=['GET'])
@@ -3458,34 +4427,29 @@ def get_conversation_messages(partner_username):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get messages between current user and partner
-            sent_messages_ref = db.collection('messages').where('from_username', '==', username).where('to_username', '==', partner_username)
-            received_messages_ref = db.collection('messages').where('from_username', '==', partner_username).where('to_username', '==', username)
+        # Get messages between current user and partner
+        sent_messages_docs = storage.stream('messages', [('from_username', '==', username), ('to_username', '==', partner_username)])
+        received_messages_docs = storage.stream('messages', [('from_username', '==', partner_username), ('to_username', '==', username)])
 
-            messages = []
+        messages = []
 
-            # Get sent messages
-            for doc in sent_messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['id'] = doc.id
-                messages.append(message_data)
+        # Get sent messages
+        for doc_id, message_data in sent_messages_docs:
+            message_data['id'] = doc_id
+            messages.append(message_data)
 
-            # Get received messages
-            for doc in received_messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['id'] = doc.id
-                messages.append(message_data)
+        # Get received messages
+        for doc_id, message_data in received_messages_docs:
+            message_data['id'] = doc_id
+            messages.append(message_data)
 
-            # Sort messages by created_at (oldest first for conversation view)
-            messages.sort(key=lambda x: x.get('created_at', ''))
+        # Sort messages by created_at (oldest first for conversation view)
+        messages.sort(key=lambda x: x.get('created_at', ''))
 
-            return jsonify({'success': True, 'data': messages})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'data': messages})
 
     except Exception as e:
-        print(f"Error retrieving conversation messages: {e}")
+        social_logger.error("Error retrieving conversation messages: %s", e)
         return jsonify({'error': 'Error retrieving conversation messages', 'details': str(e)}), 500
 
 @app.route('/api/messages/mark-read/<partner_username>', methods=['POST'])
@@ -3497,26 +4461,19 @@ def mark_messages_read(partner_username):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get unread messages from the partner
-            messages_ref = db.collection('messages').where('from_username', '==', partner_username).where('to_username', '==', username).where('read', '==', False)
-
-            batch = db.batch()
-            count = 0
+        # Get unread messages from the partner
+        messages_docs = storage.stream('messages', [('from_username', '==', partner_username), ('to_username', '==', username), ('read', '==', False)])
 
-            for doc in messages_ref.stream():
-                batch.update(doc.reference, {'read': True})
-                count += 1
+        updates = [('update', f"messages/{doc_id}", {'read': True}) for doc_id, _ in messages_docs]
+        count = len(updates)
 
-            if count > 0:
-                batch.commit()
+        if count > 0:
+            storage.batch_write(updates)
 
-            return jsonify({'success': True, 'message': f'Marked {count} messages as read'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': f'Marked {count} messages as read'})
 
     except Exception as e:
-        print(f"Error marking messages as read: {e}")
+        social_logger.error("Error marking messages as read: %s", e)
         return jsonify({'error': 'Error marking messages as read', 'details': str(e)}), 500
 
 # Health check route
@@ -3531,39 +4488,34 @@ def get_teams():
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            teams = []
+        teams = []
 
-            # Get teams where user is owner
-            owner_teams_ref = db.collection('teams').where('owner', '==', username)
-            for doc in owner_teams_ref.stream():
-                team_data = doc.to_dict()
-                team_data['id'] = doc.id
-                team_data['role'] = 'owner'
-                teams.append(team_data)
+        # Get teams where user is owner
+        owner_teams_docs = storage.stream('teams', [('owner', '==', username)])
+        for doc_id, team_data in owner_teams_docs:
+            team_data['id'] = doc_id
+            team_data['role'] = 'owner'
+            teams.append(team_data)
 
-            # Get teams where user is a member
-            member_teams_ref = db.collection('teams').where('members', 'array_contains', username)
-            for doc in member_teams_ref.stream():
-                team_data = doc.to_dict()
-                if team_data.get('owner') != username:  # Avoid duplicates
-                    team_data['id'] = doc.id
+        # Get teams where user is a member
+        member_teams_docs = storage.stream('teams', [('members', 'array_contains', username)])
+        for doc_id, team_data in member_teams_docs:
+            if team_data.get('owner') != username:  # Avoid duplicates
+                team_data['id'] = doc_id
 
-                    # Check actual role from member_details
-                    member_details = team_data.get('member_details', {})
-                    user_role = 'member'  # default
-                    if username in member_details:
-                        user_role = member_details[username].get('role', 'member')
+                # Check actual role from member_details
+                member_details = team_data.get('member_details', {})
+                user_role = 'member'  # default
+                if username in member_details:
+                    user_role = member_details[username].get('role', 'member')
 
-                    team_data['role'] = user_role
-                    teams.append(team_data)
+                team_data['role'] = user_role
+                teams.append(team_data)
 
-            return jsonify({'success': True, 'teams': teams})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'teams': teams})
 
     except Exception as e:
-        print(f"Error getting teams: {e}")
+        social_logger.error("Error getting teams: %s", e)
         return jsonify({'error': 'Error getting teams', 'details': str(e)}), 500
 
 @app.route('/api/teams', methods=['POST'])
@@ -3582,47 +4534,36 @@ def create_team():
         if not team_name:
             return jsonify({'success': False, 'message': 'Team name is required'}), 400
 
-        if db:
-            # Get current user data
-            current_user_data = {}
-            try:
-                user_ref = get_user_profile_ref(username)
-                user_doc = user_ref.get()
-                if user_doc.exists:
-                    current_user_data = user_doc.to_dict()
-            except Exception as e:
-                print(f"Error getting user data: {e}")
-
-            team_data = {
-                'name': team_name,
-                'description': description,
-                'owner': username,
-                'owner_name': current_user_data.get('student_name', username),
-                'members': [username],  # Owner is automatically a member
-                'member_details': {
-                    username: {
-                        'name': current_user_data.get('student_name', username),
-                        'joined_at': datetime.now().isoformat(),
-                        'role': 'owner'
-                    }
-                },
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
+        # Display name was stored in the session at login
+        student_name = session.get('student_name', username)
+
+        team_data = {
+            'name': team_name,
+            'description': description,
+            'owner': username,
+            'owner_name': student_name,
+            'members': [username],  # Owner is automatically a member
+            'member_details': {
+                username: {
+                    'name': student_name,
+                    'joined_at': datetime.now().isoformat(),
+                    'role': 'owner'
+                }
+            },
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
 
-            doc_ref = db.collection('teams').add(team_data)
-            team_id = doc_ref[1].id
+        team_id = storage.add('teams', team_data)
 
-            return jsonify({
-                'success': True,
-                'message': 'Team created successfully',
-                'team_id': team_id
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({
+            'success': True,
+            'message': 'Team created successfully',
+            'team_id': team_id
+        })
 
     except Exception as e:
-        print(f"Error creating team: {e}")
+        social_logger.error("Error creating team: %s", e)
         return jsonify({'error': 'Error creating team', 'details': str(e)}), 500
 
 @app.route('/api/team-invitations', methods=['POST'])
@@ -3641,98 +4582,80 @@ def send_team_invitation():
         if not team_id or not friend_usernames:
             return jsonify({'success': False, 'message': 'Team ID and friends list are required'}), 400
 
-        if db:
-            # Verify user owns the team
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
+        # Verify user owns the team
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
+
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
 
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
+        if team_data.get('owner') != username:
+            return jsonify({'success': False, 'message': 'Only team owner can send invitations'}), 403
 
-            team_data = team_doc.to_dict()
-            if team_data.get('owner') != username:
-                return jsonify({'success': False, 'message': 'Only team owner can send invitations'}), 403
+        # Display name was stored in the session at login
+        student_name = session.get('student_name', username)
 
-            # Get current user data
-            current_user_data = {}
+        successful_invitations = []
+        failed_invitations = []
+
+        for friend_username in friend_usernames:
             try:
-                user_ref = get_user_profile_ref(username)
-                user_doc = user_ref.get()
-                if user_doc.exists:
-                    current_user_data = user_doc.to_dict()
-            except Exception as e:
-                print(f"Error getting user data: {e}")
+                # Check if they are friends
+                friends1 = storage.stream('friend_requests', [('from_username', '==', username), ('to_username', '==', friend_username), ('status', '==', 'accepted')])
+                friends2 = storage.stream('friend_requests', [('from_username', '==', friend_username), ('to_username', '==', username), ('status', '==', 'accepted')])
 
-            successful_invitations = []
-            failed_invitations = []
+                if not friends1 and not friends2:
+                    failed_invitations.append({'username': friend_username, 'reason': 'Not friends'})
+                    continue
 
-            for friend_username in friend_usernames:
-                try:
-                    # Check if they are friends
-                    friends_ref1 = db.collection('friend_requests').where('from_username', '==', username).where('to_username', '==', friend_username).where('status', '==', 'accepted')
-                    friends_ref2 = db.collection('friend_requests').where('from_username', '==', friend_username).where('to_username', '==', username).where('status', '==', 'accepted')
-
-                    friends1 = list(friends_ref1.stream())
-                    friends2 = list(friends_ref2.stream())
-
-                    if not friends1 and not friends2:
-                        failed_invitations.append({'username': friend_username, 'reason': 'Not friends'})
-                        continue
-
-                    # Check if already a team member
-                    if friend_username in team_data.get('members', []):
-                        failed_invitations.append({'username': friend_username, 'reason': 'Already a team member'})
-                        continue
-
-                    # Check if invitation already exists
-                    existing_invitation_ref = db.collection('team_invitations').where('team_id', '==', team_id).where('to_username', '==', friend_username).where('status', '==', 'pending')
-                    existing_invitations = list(existing_invitation_ref.stream())
-
-                    if existing_invitations:
-                        failed_invitations.append({'username': friend_username, 'reason': 'Invitation already sent'})
-                        continue
-
-                    # Get friend's data
-                    friend_data = {}
-                    try:
-                        friend_ref = get_user_profile_ref(friend_username)
-                        friend_doc = friend_ref.get()
-                        if friend_doc.exists:
-                            friend_data = friend_doc.to_dict()
-                    except Exception as e:
-                        print(f"Error getting friend data: {e}")
-
-                    # Create team invitation
-                    invitation_data = {
-                        'team_id': team_id,
-                        'team_name': team_data.get('name', ''),
-                        'from_username': username,
-                        'from_name': current_user_data.get('student_name', username),
-                        'to_username': friend_username,
-                        'to_name': friend_data.get('student_name', friend_username),
-                        'status': 'pending',
-                        'created_at': datetime.now().isoformat(),
-                        'updated_at': datetime.now().isoformat()
-                    }
+                # Check if already a team member
+                if friend_username in team_data.get('members', []):
+                    failed_invitations.append({'username': friend_username, 'reason': 'Already a team member'})
+                    continue
+
+                # Check if invitation already exists
+                existing_invitations = storage.stream('team_invitations', [('team_id', '==', team_id), ('to_username', '==', friend_username), ('status', '==', 'pending')])
 
-                    db.collection('team_invitations').add(invitation_data)
-                    successful_invitations.append(friend_username)
+                if existing_invitations:
+                    failed_invitations.append({'username': friend_username, 'reason': 'Invitation already sent'})
+                    continue
 
+                # Get friend's data
+                friend_data = {}
+                try:
+                    friend_data = storage.get(get_user_profile_path(friend_username)) or {}
                 except Exception as e:
-                    print(f"Error sending invitation to {friend_username}: {e}")
-                    failed_invitations.append({'username': friend_username, 'reason': 'Server error'})
+                    social_logger.error("Error getting friend data: %s", e)
+
+                # Create team invitation
+                invitation_data = {
+                    'team_id': team_id,
+                    'team_name': team_data.get('name', ''),
+                    'from_username': username,
+                    'from_name': student_name,
+                    'to_username': friend_username,
+                    'to_name': friend_data.get('student_name', friend_username),
+                    'status': 'pending',
+                    'created_at': datetime.now().isoformat(),
+                    'updated_at': datetime.now().isoformat()
+                }
 
-            return jsonify({
-                'success': True,
-                'message': f'Sent {len(successful_invitations)} invitations successfully',
-                'successful': successful_invitations,
-                'failed': failed_invitations
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+                storage.add('team_invitations', invitation_data)
+                successful_invitations.append(friend_username)
+
+            except Exception as e:
+                social_logger.error("Error sending invitation to %s: %s", friend_username, e)
+                failed_invitations.append({'username': friend_username, 'reason': 'Server error'})
+
+        return jsonify({
+            'success': True,
+            'message': f'Sent {len(successful_invitations)} invitations successfully',
+            'successful': successful_invitations,
+            'failed': failed_invitations
+        })
 
     except Exception as e:
-        print(f"Error sending team invitations: {e}")
+        social_logger.error("Error sending team invitations: %s", e)
         return jsonify({'error': 'Error sending team invitations', 'details': str(e)}), 500
 
 @app.route('/api/team-invitations', methods=['GET'])
@@ -3744,22 +4667,18 @@ def get_team_invitations():
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            invitations = []
+        invitations = []
 
-            # Get pending invitations for this user
-            invitations_ref = db.collection('team_invitations').where('to_username', '==', username).where('status', '==', 'pending')
-            for doc in invitations_ref.stream():
-                invitation_data = doc.to_dict()
-                invitation_data['id'] = doc.id
-                invitations.append(invitation_data)
+        # Get pending invitations for this user
+        invitations_docs = storage.stream('team_invitations', [('to_username', '==', username), ('status', '==', 'pending')])
+        for doc_id, invitation_data in invitations_docs:
+            invitation_data['id'] = doc_id
+            invitations.append(invitation_data)
 
-            return jsonify({'success': True, 'invitations': invitations})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'invitations': invitations})
 
     except Exception as e:
-        print(f"Error getting team invitations: {e}")
+        social_logger.error("Error getting team invitations: %s", e)
         return jsonify({'error': 'Error getting team invitations', 'details': str(e)}), 500
 
 @app.route('/api/team-invitations/<invitation_id>', methods=['PUT'])
@@ -3777,85 +4696,70 @@ def respond_team_invitation(invitation_id):
         if action not in ['accept', 'decline']:
             return jsonify({'success': False, 'message': 'Invalid action. Use accept or decline'}), 400
 
-        if db:
-            # Get the invitation
-            invitation_ref = db.collection('team_invitations').document(invitation_id)
-            invitation_doc = invitation_ref.get()
-
-            if not invitation_doc.exists:
-                return jsonify({'success': False, 'message': 'Invitation not found'}), 404
+        # Get the invitation
+        invitation_path = f"team_invitations/{invitation_id}"
+        invitation_data = storage.get(invitation_path)
 
-            invitation_data = invitation_doc.to_dict()
+        if invitation_data is None:
+            return jsonify({'success': False, 'message': 'Invitation not found'}), 404
 
-            # Verify this invitation is for the current user
-            if invitation_data.get('to_username') != username:
-                return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-
-            # Check if invitation is still pending
-            if invitation_data.get('status') != 'pending':
-                return jsonify({'success': False, 'message': 'Invitation already processed'}), 400
-
-            if action == 'accept':
-                # Add user to team
-                team_id = invitation_data.get('team_id')
-                team_ref = db.collection('teams').document(team_id)
-                team_doc = team_ref.get()
+        # Verify this invitation is for the current user
+        if invitation_data.get('to_username') != username:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
-                if not team_doc.exists:
-                    return jsonify({'success': False, 'message': 'Team no longer exists'}), 404
+        # Check if invitation is still pending
+        if invitation_data.get('status') != 'pending':
+            return jsonify({'success': False, 'message': 'Invitation already processed'}), 400
 
-                team_data = team_doc.to_dict()
+        if action == 'accept':
+            # Add user to team
+            team_id = invitation_data.get('team_id')
+            team_path = f"teams/{team_id}"
+            team_data = storage.get(team_path)
 
-                # Get current user data
-                current_user_data = {}
-                try:
-                    user_ref = get_user_profile_ref(username)
-                    user_doc = user_ref.get()
-                    if user_doc.exists:
-                        current_user_data = user_doc.to_dict()
-                except Exception as e:
-                    print(f"Error getting user data: {e}")
+            if team_data is None:
+                return jsonify({'success': False, 'message': 'Team no longer exists'}), 404
 
-                # Update team with new member
-                updated_members = team_data.get('members', [])
-                if username not in updated_members:
-                    updated_members.append(username)
+            # Display name was stored in the session at login
+            student_name = session.get('student_name', username)
 
-                updated_member_details = team_data.get('member_details', {})
-                updated_member_details[username] = {
-                    'name': current_user_data.get('student_name', username),
-                    'joined_at': datetime.now().isoformat(),
-                    'role': 'member'
-                }
+            # Update team with new member
+            updated_members = team_data.get('members', [])
+            if username not in updated_members:
+                updated_members.append(username)
 
-                team_ref.update({
-                    'members': updated_members,
-                    'member_details': updated_member_details,
-                    'updated_at': datetime.now().isoformat()
-                })
+            updated_member_details = team_data.get('member_details', {})
+            updated_member_details[username] = {
+                'name': student_name,
+                'joined_at': datetime.now().isoformat(),
+                'role': 'member'
+            }
 
-                # Update invitation status
-                invitation_ref.update({
-                    'status': 'accepted',
-                    'updated_at': datetime.now().isoformat()
-                })
+            storage.update(team_path, {
+                'members': updated_members,
+                'member_details': updated_member_details,
+                'updated_at': datetime.now().isoformat()
+            })
 
-                return jsonify({'success': True, 'message': 'Team invitation accepted successfully'})
+            # Update invitation status
+            storage.update(invitation_path, {
+                'status': 'accepted',
+                'updated_at': datetime.now().isoformat()
+            })
 
-            else:  # decline
-                # Update invitation status
-                invitation_ref.update({
-                    'status': 'declined',
-                    'updated_at': datetime.now().isoformat()
-                })
+            return jsonify({'success': True, 'message': 'Team invitation accepted successfully'})
 
-                return jsonify({'success': True, 'message': 'Team invitation declined'})
+        else:  # decline
+            # Update invitation status
+            storage.update(invitation_path, {
+                'status': 'declined',
+                'updated_at': datetime.now().isoformat()
+            })
 
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+            return jsonify({'success': True, 'message': 'Team invitation declined'})
 
     except Exception as e:
-        print(f"Error responding to team invitation: {e}")
+        social_logger.error("Error responding to team invitation: %s", e)
         return jsonify({'error': 'Error responding to team invitation', 'details': str(e)}), 500
 
 @app.route('/api/team-invitations/<invitation_id>', methods=['DELETE'])
@@ -3867,33 +4771,28 @@ def delete_team_invitation(invitation_id):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get the invitation
-            invitation_ref = db.collection('team_invitations').document(invitation_id)
-            invitation_doc = invitation_ref.get()
-
-            if not invitation_doc.exists:
-                return jsonify({'success': False, 'message': 'Invitation not found'}), 404
+        # Get the invitation
+        invitation_path = f"team_invitations/{invitation_id}"
+        invitation_data = storage.get(invitation_path)
 
-            invitation_data = invitation_doc.to_dict()
+        if invitation_data is None:
+            return jsonify({'success': False, 'message': 'Invitation not found'}), 404
 
-            # Verify the user is the sender of the invitation
-            if invitation_data.get('from_username') != username:
-                return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        # Verify the user is the sender of the invitation
+        if invitation_data.get('from_username') != username:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
-            # Only allow deletion of declined invitations
-            if invitation_data.get('status') != 'declined':
-                return jsonify({'success': False, 'message': 'Can only delete declined invitations'}), 400
+        # Only allow deletion of declined invitations
+        if invitation_data.get('status') != 'declined':
+            return jsonify({'success': False, 'message': 'Can only delete declined invitations'}), 400
 
-            # Delete the invitation
-            invitation_ref.delete()
+        # Delete the invitation
+        storage.delete(invitation_path)
 
-            return jsonify({'success': True, 'message': 'Invitation deleted successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': 'Invitation deleted successfully'})
 
     except Exception as e:
-        print(f"Error deleting team invitation: {e}")
+        social_logger.error("Error deleting team invitation: %s", e)
         return jsonify({'error': 'Error deleting team invitation', 'details': str(e)}), 500
 
 @app.route('/api/teams/<team_id>/star-member', methods=['PUT'])
@@ -3912,49 +4811,43 @@ def manage_star_member(team_id):
         if not target_username or action not in ['add', 'remove']:
             return jsonify({'success': False, 'message': 'Invalid request parameters'}), 400
 
-        if db:
-            # Get the team
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
-
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
-
-            team_data = team_doc.to_dict()
-
-            # Check if user is the owner
-            if team_data.get('owner') != username:
-                return jsonify({'success': False, 'message': 'Only team owners can manage star members'}), 403
-
-            # Check if target user is a member
-            if target_username not in team_data.get('members', []):
-                return jsonify({'success': False, 'message': 'User is not a team member'}), 400
-
-            # Update member role
-            member_details = team_data.get('member_details', {})
-            if target_username in member_details:
-                if action == 'add':
-                    member_details[target_username]['role'] = 'star'
-                    message = f'{target_username} is now a star member'
-                else:  # remove
-                    member_details[target_username]['role'] = 'member'
-                    message = f'Removed star status from {target_username}'
-
-                # Update the team
-                team_ref.update({
-                    'member_details': member_details,
-                    'updated_at': datetime.now().isoformat()
-                })
+        # Get the team
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
 
-                return jsonify({'success': True, 'message': message})
-            else:
-                return jsonify({'success': False, 'message': 'Member details not found'}), 400
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
+
+        # Check if user is the owner
+        if team_data.get('owner') != username:
+            return jsonify({'success': False, 'message': 'Only team owners can manage star members'}), 403
+
+        # Check if target user is a member
+        if target_username not in team_data.get('members', []):
+            return jsonify({'success': False, 'message': 'User is not a team member'}), 400
+
+        # Update member role
+        member_details = team_data.get('member_details', {})
+        if target_username in member_details:
+            if action == 'add':
+                member_details[target_username]['role'] = 'star'
+                message = f'{target_username} is now a star member'
+            else:  # remove
+                member_details[target_username]['role'] = 'member'
+                message = f'Removed star status from {target_username}'
+
+            # Update the team
+            storage.update(team_path, {
+                'member_details': member_details,
+                'updated_at': datetime.now().isoformat()
+            })
 
+            return jsonify({'success': True, 'message': message})
         else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+            return jsonify({'success': False, 'message': 'Member details not found'}), 400
 
     except Exception as e:
-        print(f"Error managing star member: {e}")
+        social_logger.error("Error managing star member: %s", e)
         return jsonify({'error': 'Error managing star member', 'details': str(e)}), 500
 
 @app.route('/api/teams/<team_id>/remove-member', methods=['PUT'])
@@ -3972,54 +4865,48 @@ def remove_team_member(team_id):
         if not target_username:
             return jsonify({'success': False, 'message': 'Username is required'}), 400
 
-        if db:
-            # Get the team
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
-
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
-
-            team_data = team_doc.to_dict()
-
-            # Check permissions: owner or star member can remove others
-            user_role = 'member'  # default
-            if username == team_data.get('owner'):
-                user_role = 'owner'
-            elif username in team_data.get('member_details', {}):
-                user_role = team_data['member_details'][username].get('role', 'member')
-
-            if user_role not in ['owner', 'star']:
-                return jsonify({'success': False, 'message': 'Only owners and star members can remove team members'}), 403
-
-            # Cannot remove the owner
-            if target_username == team_data.get('owner'):
-                return jsonify({'success': False, 'message': 'Cannot remove team owner'}), 400
-
-            # Check if target user is a member
-            if target_username not in team_data.get('members', []):
-                return jsonify({'success': False, 'message': 'User is not a team member'}), 400
-
-            # Remove member
-            updated_members = [m for m in team_data.get('members', []) if m != target_username]
-            updated_member_details = team_data.get('member_details', {})
-            if target_username in updated_member_details:
-                del updated_member_details[target_username]
-
-            # Update the team
-            team_ref.update({
-                'members': updated_members,
-                'member_details': updated_member_details,
-                'updated_at': datetime.now().isoformat()
-            })
-
-            return jsonify({'success': True, 'message': f'{target_username} has been removed from the team'})
+        # Get the team
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
+
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
+
+        # Check permissions: owner or star member can remove others
+        user_role = 'member'  # default
+        if username == team_data.get('owner'):
+            user_role = 'owner'
+        elif username in team_data.get('member_details', {}):
+            user_role = team_data['member_details'][username].get('role', 'member')
+
+        if user_role not in ['owner', 'star']:
+            return jsonify({'success': False, 'message': 'Only owners and star members can remove team members'}), 403
+
+        # Cannot remove the owner
+        if target_username == team_data.get('owner'):
+            return jsonify({'success': False, 'message': 'Cannot remove team owner'}), 400
+
+        # Check if target user is a member
+        if target_username not in team_data.get('members', []):
+            return jsonify({'success': False, 'message': 'User is not a team member'}), 400
+
+        # Remove member
+        updated_members = [m for m in team_data.get('members', []) if m != target_username]
+        updated_member_details = team_data.get('member_details', {})
+        if target_username in updated_member_details:
+            del updated_member_details[target_username]
+
+        # Update the team
+        storage.update(team_path, {
+            'members': updated_members,
+            'member_details': updated_member_details,
+            'updated_at': datetime.now().isoformat()
+        })
 
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': f'{target_username} has been removed from the team'})
 
     except Exception as e:
-        print(f"Error removing team member: {e}")
+        social_logger.error("Error removing team member: %s", e)
         return jsonify({'error': 'Error removing team member', 'details': str(e)}), 500
 
 @app.route('/api/teams/<team_id>', methods=['DELETE'])
@@ -4031,40 +4918,34 @@ def dismantle_team(team_id):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Get the team
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
+        # Get the team
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
 
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
 
-            team_data = team_doc.to_dict()
+        # Check if user is the owner
+        if team_data.get('owner') != username:
+            return jsonify({'success': False, 'message': 'Only team owners can dismantle teams'}), 403
 
-            # Check if user is the owner
-            if team_data.get('owner') != username:
-                return jsonify({'success': False, 'message': 'Only team owners can dismantle teams'}), 403
+        # Delete all team messages
+        messages_docs = storage.stream('team_messages', [('team_id', '==', team_id)])
+        for message_id, _ in messages_docs:
+            storage.delete(f"team_messages/{message_id}")
 
-            # Delete all team messages
-            messages_ref = db.collection('team_messages').where('team_id', '==', team_id)
-            for message_doc in messages_ref.stream():
-                message_doc.reference.delete()
+        # Delete all team invitations
+        invitations_docs = storage.stream('team_invitations', [('team_id', '==', team_id)])
+        for invitation_id, _ in invitations_docs:
+            storage.delete(f"team_invitations/{invitation_id}")
 
-            # Delete all team invitations
-            invitations_ref = db.collection('team_invitations').where('team_id', '==', team_id)
-            for invitation_doc in invitations_ref.stream():
-                invitation_doc.reference.delete()
+        # Delete the team
+        storage.delete(team_path)
 
-            # Delete the team
-            team_ref.delete()
-
-            return jsonify({'success': True, 'message': f'Team "{team_data.get("name", "Unknown")}" has been dismantled'})
-
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': f'Team "{team_data.get("name", "Unknown")}" has been dismantled'})
 
     except Exception as e:
-        print(f"Error dismantling team: {e}")
+        social_logger.error("Error dismantling team: %s", e)
         return jsonify({'error': 'Error dismantling team', 'details': str(e)}), 500
 
 @app.route('/api/team-messages/<team_id>', methods=['GET'])
@@ -4076,35 +4957,30 @@ def get_team_messages(team_id):
         if not username:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        if db:
-            # Verify user is a team member
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
+        # Verify user is a team member
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
 
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
 
-            team_data = team_doc.to_dict()
-            if username not in team_data.get('members', []):
-                return jsonify({'success': False, 'message': 'Access denied'}), 403
+        if username not in team_data.get('members', []):
+            return jsonify({'success': False, 'message': 'Access denied'}), 403
 
-            # Get team messages (without ordering to avoid index requirement)
-            messages = []
-            messages_ref = db.collection('team_messages').where('team_id', '==', team_id)
-            for doc in messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['id'] = doc.id
-                messages.append(message_data)
+        # Get team messages (without ordering to avoid index requirement)
+        messages = []
+        messages_docs = storage.stream('team_messages', [('team_id', '==', team_id)])
+        for doc_id, message_data in messages_docs:
+            message_data['id'] = doc_id
+            messages.append(message_data)
 
-            # Sort messages by created_at in Python
-            messages.sort(key=lambda x: x.get('created_at', ''), reverse=False)
+        # Sort messages by created_at in Python
+        messages.sort(key=lambda x: x.get('created_at', ''), reverse=False)
 
-            return jsonify({'success': True, 'messages': messages, 'team_name': team_data.get('name', '')})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'messages': messages, 'team_name': team_data.get('name', '')})
 
     except Exception as e:
-        print(f"Error getting team messages: {e}")
+        social_logger.error("Error getting team messages: %s", e)
         return jsonify({'error': 'Error getting team messages', 'details': str(e)}), 500
 
 @app.route('/api/team-messages', methods=['POST'])
@@ -4126,49 +5002,38 @@ def send_team_message():
         if not team_id or not content:
             return jsonify({'success': False, 'message': 'Team ID and content are required'}), 400
 
-        if db:
-            # Verify user is a team member
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
+        # Verify user is a team member
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
 
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
 
-            team_data = team_doc.to_dict()
-            if username not in team_data.get('members', []):
-                return jsonify({'success': False, 'message': 'Access denied'}), 403
+        if username not in team_data.get('members', []):
+            return jsonify({'success': False, 'message': 'Access denied'}), 403
 
-            # Get current user data
-            current_user_data = {}
-            try:
-                user_ref = get_user_profile_ref(username)
-                user_doc = user_ref.get()
-                if user_doc.exists:
-                    current_user_data = user_doc.to_dict()
-            except Exception as e:
-                print(f"Error getting user data: {e}")
-
-            # Create team message
-            message_data = {
-                'team_id': team_id,
-                'from_username': username,
-                'from_name': current_user_data.get('student_name', username),
-                'content': content,
-                'type': message_type,
-                'file_url': file_url,
-                'file_name': file_name,
-                'created_at': datetime.now().isoformat(),
-                'read_by': [username]  # Sender has read the message
-            }
+        # Display name was stored in the session at login
+        student_name = session.get('student_name', username)
+
+        # Create team message
+        message_data = {
+            'team_id': team_id,
+            'from_username': username,
+            'from_name': student_name,
+            'content': content,
+            'type': message_type,
+            'file_url': file_url,
+            'file_name': file_name,
+            'created_at': datetime.now().isoformat(),
+            'read_by': [username]  # Sender has read the message
+        }
 
-            db.collection('team_messages').add(message_data)
+        storage.add('team_messages', message_data)
 
-            return jsonify({'success': True, 'message': 'Message sent successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({'success': True, 'message': 'Message sent successfully'})
 
     except Exception as e:
-        print(f"Error sending team message: {e}")
+        social_logger.error("Error sending team message: %s", e)
         return jsonify({'error': 'Error sending team message', 'details': str(e)}), 500
 
 @app.route('/api/team-messages/<message_id>', methods=['PUT'])
@@ -4183,14 +5048,12 @@ def update_team_message(message_id):
             return jsonify({'success': False, 'message': 'Content cannot be empty'}), 400
 
         # Get the message to verify ownership
-        message_ref = db.collection('team_messages').document(message_id)
-        message_doc = message_ref.get()
+        message_path = f"team_messages/{message_id}"
+        message_data = storage.get(message_path)
 
-        if not message_doc.exists:
+        if message_data is None:
             return jsonify({'success': False, 'message': 'Message not found'}), 404
 
-        message_data = message_doc.to_dict()
-
         # Check if user owns the message
         if message_data.get('from_username') != username:
             return jsonify({'success': False, 'message': 'Unauthorized'}), 403
@@ -4200,7 +5063,7 @@ def update_team_message(message_id):
             return jsonify({'success': False, 'message': 'Only text messages can be edited'}), 400
 
         # Update the message
-        message_ref.update({
+        storage.update(message_path, {
             'content': new_content,
             'updated_at': datetime.now().isoformat(),
             'edited': True
@@ -4209,7 +5072,7 @@ def update_team_message(message_id):
         return jsonify({'success': True, 'message': 'Message updated successfully'})
 
     except Exception as e:
-        print(f"Error updating team message: {e}")
+        social_logger.error("Error updating team message: %s", e)
         return jsonify({'success': False, 'message': 'Failed to update message'}), 500
 
 @app.route('/api/team-messages/<message_id>', methods=['DELETE'])
@@ -4219,20 +5082,18 @@ def delete_team_message(message_id):
         username = session.get('username')
 
         # Get the message to verify ownership
-        message_ref = db.collection('team_messages').document(message_id)
-        message_doc = message_ref.get()
+        message_path = f"team_messages/{message_id}"
+        message_data = storage.get(message_path)
 
-        if not message_doc.exists:
+        if message_data is None:
             return jsonify({'success': False, 'message': 'Message not found'}), 404
 
-        message_data = message_doc.to_dict()
-
         # Check if user owns the message
         if message_data.get('from_username') != username:
             return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
         # Delete the message
-        message_ref.delete()
+        storage.delete(message_path)
 
         # If it's a file message, optionally delete the file from storage
         # (For now, we'll keep files in storage for safety)
@@ -4240,7 +5101,7 @@ def delete_team_message(message_id):
         return jsonify({'success': True, 'message': 'Message deleted successfully'})
 
     except Exception as e:
-        print(f"Error deleting team message: {e}")
+        social_logger.error("Error deleting team message: %s", e)
         return jsonify({'success': False, 'message': 'Failed to delete message'}), 500
 
 @app.route('/api/team-file-upload', methods=['POST'])
@@ -4278,47 +5139,43 @@ def upload_team_file():
         if file_size > 10 * 1024 * 1024:  # 10MB
             return jsonify({'success': False, 'message': 'File too large (max 10MB)'}), 400
 
-        if db:
-            # Verify user is a team member
-            team_ref = db.collection('teams').document(team_id)
-            team_doc = team_ref.get()
+        # Verify user is a team member
+        team_path = f"teams/{team_id}"
+        team_data = storage.get(team_path)
 
-            if not team_doc.exists:
-                return jsonify({'success': False, 'message': 'Team not found'}), 404
+        if team_data is None:
+            return jsonify({'success': False, 'message': 'Team not found'}), 404
 
-            team_data = team_doc.to_dict()
-            if username not in team_data.get('members', []):
-                return jsonify({'success': False, 'message': 'Access denied'}), 403
+        if username not in team_data.get('members', []):
+            return jsonify({'success': False, 'message': 'Access denied'}), 403
 
-            # Create uploads directory if it doesn't exist
-            upload_dir = os.path.join('static', 'uploads', 'team_files')
-            os.makedirs(upload_dir, exist_ok=True)
+        # Create uploads directory if it doesn't exist
+        upload_dir = os.path.join('static', 'uploads', 'team_files')
+        os.makedirs(upload_dir, exist_ok=True)
 
-            # Generate unique filename
-            import uuid
-            unique_filename = f"{uuid.uuid4()}_{file.filename}"
-            file_path = os.path.join(upload_dir, unique_filename)
+        # Generate unique filename
+        import uuid
+        unique_filename = f"{uuid.uuid4()}_{file.filename}"
+        file_path = os.path.join(upload_dir, unique_filename)
 
-            # Save file
-            file.save(file_path)
+        # Save file
+        file.save(file_path)
 
-            # Generate file URL
-            file_url = f"/static/uploads/team_files/{unique_filename}"
+        # Generate file URL
+        file_url = f"/static/uploads/team_files/{unique_filename}"
 
-            # Determine message type
-            message_type = 'image' if file_ext in {'png', 'jpg', 'jpeg', 'gif'} else 'pdf'
+        # Determine message type
+        message_type = 'image' if file_ext in {'png', 'jpg', 'jpeg', 'gif'} else 'pdf'
 
-            return jsonify({
-                'success': True,
-                'file_url': file_url,
-                'file_name': file.filename,
-                'message_type': message_type
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Database not available'}), 500
+        return jsonify({
+            'success': True,
+            'file_url': file_url,
+            'file_name': file.filename,
+            'message_type': message_type
+        })
 
     except Exception as e:
-        print(f"Error uploading team file: {e}")
+        social_logger.error("Error uploading team file: %s", e)
         return jsonify({'error': 'Error uploading file', 'details': str(e)}), 500
 
 @app.route('/health')
@@ -4327,7 +5184,12 @@ def health_check():
         'status': 'ok',
         'message': 'Server is running with Firebase storage and Smart Reminder System',
         'environment': os.getenv('FLASK_ENV', 'development'),
-        'firebase_configured': db is not None
+        'firebase_configured': db is not None,
+        'storage_backend': storage.name,
+        'user_data_cache': user_data_cache.stats(),
+        'reminder_list_cache': reminder_list_cache.stats(),
+        'smtp_pool': smtp_pool.stats() if smtp_pool else None,
+        'email_outbox': email_outbox.stats()
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,231 @@
+"""Throughput and accuracy benchmark for the reminder message parser.
+
+Runs classify_reminder_type, parse_date_from_text, extract_title_from_message
+and extract_subject_from_message over the labelled messages in
+parser_corpus.json and reports:
+
+* messages per second for the whole pipeline,
+* time per call of each function,
+* accuracy of type, date, time, title and subject, overall and per style.
+
+Relative dates are resolved against the corpus's frozen "now" (or --now),
+so two runs on different days give the same answers.  Use --json to save a
+run and --baseline to compare against a saved one:
+
+    python benchmarks/parser_bench.py --json before.json
+    python benchmarks/parser_bench.py --baseline before.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from reminder_parser import (  # noqa: E402
+    DEFAULT_KEYWORDS_FILE, ReminderClassifier, extract_subject_from_message,
+    extract_title_from_message, parse_date_from_text,
+)
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parser_corpus.json')
+FIELDS = ('type', 'date', 'time', 'title', 'subject')
+
+
+def load_corpus(path):
+    """Read the corpus and return (document, sha256 of its bytes)"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return json.loads(raw), hashlib.sha256(raw).hexdigest()
+
+
+def build_pipeline(classifier, now):
+    """The four parser stages, called the way parse_reminder_message calls them"""
+    def classify(message):
+        return classifier.classify(message['text'])
+
+    def parse_date(message):
+        return parse_date_from_text(message['text'], now=now)
+
+    def extract_title(message):
+        return extract_title_from_message(message['text'], message['_type'])
+
+    def extract_subject(message):
+        return extract_subject_from_message(message['text'])
+
+    return [('classify_reminder_type', classify), ('parse_date_from_text', parse_date),
+            ('extract_title_from_message', extract_title), ('extract_subject_from_message', extract_subject)]
+
+
+def run_message(classifier, message, now):
+    """Parse one message into the fields the corpus labels"""
+    reminder_type = classifier.classify(message['text'])
+    due = parse_date_from_text(message['text'], now=now)
+    return {
+        'type': reminder_type,
+        'date': due.strftime('%Y-%m-%d') if due else None,
+        'time': due.strftime('%H:%M') if due else None,
+        'title': extract_title_from_message(message['text'], reminder_type),
+        'subject': extract_subject_from_message(message['text']),
+    }
+
+
+def field_matches(field, expected, actual):
+    if field == 'title':
+        options = expected if isinstance(expected, list) else [expected]
+        return actual is not None and actual.strip().casefold() in {option.casefold() for option in options}
+    if field == 'subject' and expected is not None and actual is not None:
+        return expected.casefold() == actual.casefold()
+    return expected == actual
+
+
+def measure_accuracy(classifier, messages, now):
+    """Score every labelled field; returns (summary, misses)"""
+    totals = {}
+    misses = []
+    for message in messages:
+        actual = run_message(classifier, message, now)
+        for field in FIELDS:
+            if field not in message['expected']:
+                continue
+            expected = message['expected'][field]
+            ok = field_matches(field, expected, actual[field])
+            for group in ('all', message.get('style', 'unknown')):
+                counts = totals.setdefault(group, {}).setdefault(field, [0, 0])
+                counts[0] += ok
+                counts[1] += 1
+            if not ok:
+                misses.append({'id': message['id'], 'field': field, 'expected': expected, 'actual': actual[field]})
+
+    summary = {
+        group: {field: round(correct / total, 4) for field, (correct, total) in fields.items()}
+        for group, fields in totals.items()
+    }
+    return summary, misses
+
+
+def measure_speed(classifier, messages, now, repeat):
+    """Time each stage over the whole corpus `repeat` times; per-call figures use the fastest pass"""
+    # Titles depend on the type; classify once up front so the title stage is timed on its own
+    for message in messages:
+        message['_type'] = classifier.classify(message['text'])
+
+    stages = build_pipeline(classifier, now)
+    passes = {name: [] for name, _ in stages}
+    perf_counter = time.perf_counter
+    for _ in range(repeat):
+        for name, func in stages:
+            started = perf_counter()
+            for message in messages:
+                func(message)
+            passes[name].append(perf_counter() - started)
+
+    count = len(messages)
+    functions = {
+        name: {
+            'us_per_call': round(min(times) / count * 1e6, 2),
+            'median_us_per_call': round(statistics.median(times) / count * 1e6, 2),
+        }
+        for name, times in passes.items()
+    }
+    pipeline_seconds = sum(min(times) for times in passes.values())
+    share = {name: round(min(times) / pipeline_seconds, 4) for name, times in passes.items()}
+    for name in functions:
+        functions[name]['share'] = share[name]
+    return {
+        'messages_per_second': round(count / pipeline_seconds, 1),
+        'us_per_message': round(pipeline_seconds / count * 1e6, 2),
+        'functions': functions,
+    }
+
+
+def print_report(result, baseline=None, show_misses=False):
+    speed = result['speed']
+
+    def delta(current, previous, higher_is_better):
+        if previous in (None, 0):
+            return ''
+        change = (current - previous) / previous * 100
+        better = change > 0 if higher_is_better else change < 0
+        return f"  ({change:+.1f}% {'better' if better else 'worse'})" if abs(change) >= 0.05 else '  (same)'
+
+    base_speed = baseline['speed'] if baseline else {}
+    print(f"Corpus: {result['corpus']['messages']} messages, now={result['now']}, repeat={result['repeat']}")
+    print(f"Pipeline: {speed['messages_per_second']:.0f} msg/s ({speed['us_per_message']:.1f} us/msg)"
+          + delta(speed['messages_per_second'], base_speed.get('messages_per_second'), True))
+    for name, stats in speed['functions'].items():
+        previous = base_speed.get('functions', {}).get(name, {}).get('us_per_call')
+        print(f"  {name:<30} {stats['us_per_call']:>8.2f} us/call  {stats['share'] * 100:5.1f}%"
+              + delta(stats['us_per_call'], previous, False))
+
+    base_accuracy = baseline['accuracy'] if baseline else {}
+    print('Accuracy:')
+    for group, fields in result['accuracy'].items():
+        parts = []
+        for field in FIELDS:
+            if field in fields:
+                previous = base_accuracy.get(group, {}).get(field)
+                marker = '' if previous is None or previous == fields[field] else f" ({(fields[field] - previous) * 100:+.1f})"
+                parts.append(f"{field} {fields[field] * 100:.1f}%{marker}")
+        print(f"  {group:<10} " + '  '.join(parts))
+
+    if show_misses:
+        print('Misses:')
+        for miss in result['misses']:
+            print(f"  {miss['id']:<14} {miss['field']:<8} expected {miss['expected']!r}, got {miss['actual']!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='labelled corpus JSON')
+    parser.add_argument('--keywords', default=DEFAULT_KEYWORDS_FILE, help='reminder keyword table')
+    parser.add_argument('--now', help="frozen current time (ISO format); defaults to the corpus's")
+    parser.add_argument('--repeat', type=int, default=20, help='timed passes over the corpus')
+    parser.add_argument('--json', help="write the result as JSON to this file ('-' for stdout)")
+    parser.add_argument('--baseline', help='earlier --json output to compare against')
+    parser.add_argument('--show-misses', action='store_true', help='list every wrong field')
+    args = parser.parse_args(argv)
+
+    corpus, digest = load_corpus(args.corpus)
+    now = datetime.fromisoformat(args.now or corpus['now'])
+    messages = corpus['messages']
+    classifier = ReminderClassifier.from_file(args.keywords)
+
+    accuracy, misses = measure_accuracy(classifier, messages, now)
+    result = {
+        'now': now.isoformat(),
+        'repeat': args.repeat,
+        'corpus': {'path': os.path.relpath(args.corpus, REPO_ROOT), 'sha256': digest, 'messages': len(messages)},
+        'environment': {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                        'machine': platform.machine()},
+        'speed': measure_speed(classifier, messages, now, max(1, args.repeat)),
+        'accuracy': accuracy,
+        'misses': misses,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('corpus', {}).get('sha256') != digest:
+            print('Warning: baseline was run on a different corpus; accuracy is not comparable', file=sys.stderr)
+
+    if args.json == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return 0
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    print_report(result, baseline, args.show_misses)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Leader election so only one process runs the reminder scheduler.
+
+Under gunicorn every worker imports app.py and starts a scheduler thread.
+Each thread asks a lock whether it may do scheduler work this round; only
+the holder proceeds.  Two implementations are provided:
+
+* ``LeaseLock`` stores a lease document (holder + expiry) in the storage
+  backend.  The holder renews it on every round; when it stops renewing, any
+  other process takes over once the lease expires.  Works across hosts.
+* ``FileLock`` holds an exclusive ``flock`` on a local file for as long as the
+  process lives.  Simplest option when every worker runs on one host.
+"""
+
+import os
+import socket
+import time
+import uuid
+
+
+def make_holder_id():
+    """Identify this process in lease documents and logs"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLock:
+    """Lease stored as a document, acquired and renewed with a transaction"""
+
+    def __init__(self, storage, path, ttl=90, holder=None, clock=time.time):
+        self.storage = storage
+        self.path = path
+        self.ttl = ttl
+        self.holder = holder or make_holder_id()
+        self._clock = clock
+
+    def acquire(self):
+        """Acquire or renew the lease; returns True while this process holds it"""
+        now = self._clock()
+
+        def claim(current):
+            if current and current.get('holder') != self.holder and current.get('expires_at', 0) > now:
+                return None
+            acquired_at = current.get('acquired_at', now) if current and current.get('holder') == self.holder else now
+            return {
+                'holder': self.holder,
+                'acquired_at': acquired_at,
+                'heartbeat_at': now,
+                'expires_at': now + self.ttl
+            }
+
+        return self.storage.transact(self.path, claim) is not None
+
+    def release(self):
+        """Give the lease up early so another process can take over immediately"""
+        def expire(current):
+            if not current or current.get('holder') != self.holder:
+                return None
+            return {**current, 'expires_at': 0}
+
+        self.storage.transact(self.path, expire)
+
+
+class FileLock:
+    """Exclusive advisory lock on a local file, held until release or exit"""
+
+    def __init__(self, path):
+        self.path = path
+        self.holder = make_holder_id()
+        self._file = None
+
+    def acquire(self):
+        if self._file is not None:
+            return True
+        import fcntl
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(self.holder)
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None:
+            import fcntl
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,109 @@
+"""Logging setup shared by app.py and the helper modules.
+
+Everything logs through the standard ``logging`` module with %-style
+arguments, so a disabled debug call costs one level check and its message
+is never formatted.  configure_logging() reads:
+
+* ``LOG_LEVEL``: root level (default INFO).
+* ``LOG_LEVELS``: per-logger overrides, e.g.
+  ``app.reminders=DEBUG,reminder_parser=DEBUG,mailer=WARNING``.
+* ``LOG_FORMAT``: ``text`` (default) or ``json`` (one object per line).
+* ``LOG_DEBUG_SAMPLE_EVERY``: emit only every Nth record of each DEBUG
+  message (default 1, i.e. all of them).  Low-volume debug lines still show
+  up the first time; hot ones are thinned out.
+
+Records are handed to a background thread through a queue, so request
+threads never wait on the log stream.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+class DebugSampleFilter(logging.Filter):
+    """Lets through one in every `every` DEBUG records per message template"""
+
+    def __init__(self, every=1):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counters = {}
+
+    def filter(self, record):
+        if self.every == 1 or record.levelno != logging.DEBUG:
+            return True
+        key = (record.name, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any extra= fields included"""
+
+    # Attributes every LogRecord has; anything else came from extra=
+    _standard = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._standard and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_levels(spec):
+    """Parse "name=LEVEL,name=LEVEL" into {name: level}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Install the queue-backed handler on the root logger (safe to call more than once)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(DebugSampleFilter(os.getenv('LOG_DEBUG_SAMPLE_EVERY', '1')))
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        for name, level in parse_levels(os.getenv('LOG_LEVELS')).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(_listener.stop)
@@ -0,0 +1,373 @@
+"""Outgoing email for the reminder system.
+
+``SMTPConnectionPool`` keeps a few authenticated SMTP sessions open and
+reuses them across messages, instead of paying a TCP connect, STARTTLS
+handshake and login for every email.  Idle sessions are checked with NOOP
+before reuse, and a session that has dropped is replaced transparently.
+
+``EmailOutbox`` takes sending off the caller's thread: messages are queued
+and a few worker threads drain the queue, with retries and a rate limit.
+"""
+
+import heapq
+import itertools
+import logging
+import queue
+import smtplib
+import socket
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the session is unusable and should be replaced.  Every
+# smtplib.SMTPException is an OSError, so OSError itself must not be listed:
+# a refused recipient or a rejected DATA says nothing about the session.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class PooledConnection:
+    """An open SMTP session plus the bookkeeping the pool needs"""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of persistent SMTP sessions"""
+
+    def __init__(self, host, port, username=None, password=None, size=2, use_tls=True,
+                 timeout=30, noop_after=30, max_idle=240, max_messages=100, smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        # Idle sessions older than noop_after are probed before reuse; ones
+        # older than max_idle are assumed dropped by the server and replaced
+        self.noop_after = noop_after
+        self.max_idle = max_idle
+        # Gmail and most providers cap messages per session
+        self.max_messages = max_messages
+        self.smtp_class = smtp_class
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+
+    def _connect(self):
+        smtp = self.smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            smtp.ehlo_or_helo_if_needed()
+            if self.username and self.password and smtp.has_extn('auth'):
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn):
+        idle_for = time.monotonic() - conn.last_used
+        if idle_for > self.max_idle or conn.messages_sent >= self.max_messages:
+            return False
+        if idle_for <= self.noop_after:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except CONNECTION_ERRORS + (smtplib.SMTPException, OSError):
+            return False
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_alive(conn):
+                    return conn
+                self._close(conn.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken=False):
+        try:
+            if broken:
+                self._close(conn.smtp)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def send(self, from_addr, to_addrs, message):
+        """Send one message, reconnecting once if the pooled session has gone stale.
+
+        Once the server has answered with an error (refused sender, recipients
+        or data) the message is never resent; the error is raised as is.
+        """
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.smtp.sendmail(from_addr, to_addrs, message)
+            except smtplib.SMTPRecipientsRefused:
+                # The session itself is fine
+                self._release(conn)
+                raise
+            except CONNECTION_ERRORS:
+                self._release(conn, broken=True)
+                if attempt:
+                    raise
+                with self._lock:
+                    self.reconnects += 1
+                continue
+            except smtplib.SMTPResponseException as e:
+                # 421 means the server is closing the session; anything else
+                # leaves it usable (sendmail has already sent RSET)
+                self._release(conn, broken=e.smtp_code == 421)
+                raise
+            except Exception:
+                self._release(conn, broken=True)
+                raise
+            conn.messages_sent += 1
+            self._release(conn)
+            with self._lock:
+                self.messages_sent += 1
+            return
+
+    def close_all(self):
+        """Close every idle session"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn.smtp)
+
+    def stats(self):
+        return {
+            'idle_connections': self._idle.qsize(),
+            'connections_opened': self.connections_opened,
+            'reconnects': self.reconnects,
+            'messages_sent': self.messages_sent,
+        }
+
+
+class EmailJob:
+    """One queued message and what to do once it is delivered or abandoned.
+
+    before_send, if given, is called right before every attempt; returning
+    False cancels the job (e.g. another process has taken the work over).
+    """
+
+    def __init__(self, recipient, payload, dedup_key=None, on_sent=None, on_failed=None, before_send=None):
+        self.recipient = recipient
+        self.payload = payload
+        self.dedup_key = (recipient, dedup_key) if dedup_key is not None else None
+        self.before_send = before_send
+        self.on_sent = on_sent
+        self.on_failed = on_failed
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+
+class EmailOutbox:
+    """Bounded in-process email queue drained by a pool of worker threads.
+
+    send_func(recipient, payload) must return True once the message is
+    accepted.  A False return or an exception is retried with exponential
+    backoff (retry_base * 2**n seconds) up to max_retries times.  At most
+    rate_per_minute messages are sent per minute across all workers.
+    """
+
+    def __init__(self, send_func, workers=2, max_queue=1000, max_retries=4,
+                 retry_base=30, rate_per_minute=20, clock=time.monotonic):
+        self.send_func = send_func
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.rate_per_minute = rate_per_minute
+        self._clock = clock
+        # Heap of (ready_at, seq, job); retries sit here until their backoff ends
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending_keys = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        # Token bucket for the rate limit
+        self._rate_lock = threading.Lock()
+        self._tokens = float(rate_per_minute)
+        self._tokens_at = clock()
+        self._latencies = deque(maxlen=500)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.cancelled = 0
+
+    def start(self):
+        with self._cond:
+            self._stopping = False
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name=f"email-outbox-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the workers once they finish their current message"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, recipient, payload, dedup_key=None, on_sent=None, on_failed=None, before_send=None):
+        """Queue a message; returns False if an identical one is pending or the queue is full"""
+        job = EmailJob(recipient, payload, dedup_key, on_sent, on_failed, before_send)
+        with self._cond:
+            if job.dedup_key is not None and job.dedup_key in self._pending_keys:
+                self.deduplicated += 1
+                return False
+            if len(self._heap) >= self.max_queue:
+                self.dropped += 1
+                return False
+            if job.dedup_key is not None:
+                self._pending_keys.add(job.dedup_key)
+            heapq.heappush(self._heap, (self._clock(), next(self._seq), job))
+            self._cond.notify()
+        return True
+
+    def _next_job(self):
+        with self._cond:
+            while not self._stopping:
+                if self._heap:
+                    wait = self._heap[0][0] - self._clock()
+                    if wait <= 0:
+                        job = heapq.heappop(self._heap)[2]
+                        self.in_flight += 1
+                        return job
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _take_token(self):
+        """Block until the rate limit allows another send"""
+        if self.rate_per_minute <= 0:
+            return
+        while True:
+            with self._rate_lock:
+                now = self._clock()
+                self._tokens = min(float(self.rate_per_minute),
+                                   self._tokens + (now - self._tokens_at) * self.rate_per_minute / 60.0)
+                self._tokens_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * 60.0 / self.rate_per_minute
+            time.sleep(wait)
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._process(job)
+
+    def _process(self, job):
+        """Make one delivery attempt for a job taken off the queue"""
+        self._take_token()
+        if job.before_send is not None:
+            try:
+                proceed = job.before_send()
+            except Exception as e:
+                logger.exception("❌ Outbox pre-send check for %s failed: %s", job.recipient, e)
+                proceed = False
+            if not proceed:
+                self._cancel(job)
+                return
+        job.attempts += 1
+        started = self._clock()
+        try:
+            ok = self.send_func(job.recipient, job.payload)
+        except Exception as e:
+            logger.exception("❌ Outbox send to %s raised: %s", job.recipient, e)
+            ok = False
+        self._latencies.append(self._clock() - started)
+        self._finish(job, ok)
+
+    def _cancel(self, job):
+        with self._cond:
+            self.in_flight -= 1
+            self.cancelled += 1
+            self._pending_keys.discard(job.dedup_key)
+
+    def _finish(self, job, ok):
+        callback = None
+        with self._cond:
+            self.in_flight -= 1
+            if ok:
+                self.sent += 1
+                callback = job.on_sent
+            elif job.attempts <= self.max_retries:
+                self.retried += 1
+                delay = self.retry_base * (2 ** (job.attempts - 1))
+                heapq.heappush(self._heap, (self._clock() + delay, next(self._seq), job))
+                self._cond.notify()
+                return
+            else:
+                self.failed += 1
+                callback = job.on_failed
+            self._pending_keys.discard(job.dedup_key)
+        if callback is not None:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception("❌ Outbox callback for %s failed: %s", job.recipient, e)
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self._latencies)
+            return {
+                'queue_depth': len(self._heap),
+                'in_flight': self.in_flight,
+                'workers': len(self._threads),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'deduplicated': self.deduplicated,
+                'dropped': self.dropped,
+                'cancelled': self.cancelled,
+                'send_latency_ms': {
+                    'avg': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                    'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None,
+                    'max': round(latencies[-1] * 1000, 1) if latencies else None,
+                },
+            }
@@ -0,0 +1,577 @@
+"""Turning pasted messages into reminder dates, times and titles.
+
+Every pattern is compiled once at import.  The functions still try their
+patterns in priority order and take the first one that matches anywhere in
+the text, exactly as before; ``PatternSet`` just skips the regex search for
+patterns whose required words don't appear in the message, which is what
+most of the twenty-odd searches per message used to be spent on.
+
+Reminder types are scored by ``ReminderClassifier`` from the keyword and
+phrase weights in reminder_keywords.json.  Each distinct word or phrase is
+looked for once, and every score it feeds is updated in the same pass.
+
+Subjects come from the catalogues in subject_catalogues/, compiled into a
+word trie by ``SubjectCatalogue`` so lookups don't slow down as colleges add
+courses.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_KEYWORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reminder_keywords.json')
+DEFAULT_SUBJECTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'subject_catalogues')
+
+logger = logging.getLogger(__name__)
+
+
+# The only non-ASCII characters IGNORECASE matches against ASCII letters;
+# lower() alone would leave them (or, for the dotted I, expand them)
+IGNORECASE_ASCII_FOLDS = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+
+
+class PatternSet:
+    """Named regexes tried in priority order.
+
+    Each entry is (name, pattern) or (name, pattern, required), where
+    required lists literal substrings that any match must contain.  They are
+    checked with a plain ``in`` before the regex runs.
+    """
+
+    def __init__(self, patterns, flags=0):
+        self.flags = flags
+        self.entries = []
+        for name, pattern, *required in patterns:
+            required = tuple(required[0]) if required else ()
+            if flags & re.IGNORECASE:
+                required = tuple(word.lower() for word in required)
+            self.entries.append((name, re.compile(pattern, flags), required))
+
+    def _haystack(self, text):
+        if not self.flags & re.IGNORECASE:
+            return text
+        return text.translate(IGNORECASE_ASCII_FOLDS).lower()
+
+    def matches(self, text):
+        """Yield (name, match) for each pattern that matches text, in priority order"""
+        haystack = self._haystack(text)
+        for name, pattern, required in self.entries:
+            if all(word in haystack for word in required):
+                match = pattern.search(text)
+                if match:
+                    yield name, match
+
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6,
+    'july': 7, 'jul': 7, 'august': 8, 'aug': 8, 'september': 9, 'sep': 9, 'sept': 9,
+    'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12
+}
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+MONTH_NAMES = ('january|february|march|april|may|june|july|august|september|october|november|december'
+               '|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec')
+
+TIME_PATTERNS = PatternSet([
+    # 12-hour format with AM/PM (e.g., "11:59 PM", "11am", "1:30 pm")
+    ('clock_12h', r'(\d{1,2}):?(\d{2})?\s*(am|pm)'),
+    # O'clock variations (e.g., "12 o'clock", "12'o clock", "12 oclock")
+    ('oclock', r'(\d{1,2})\s*[\'o]*\s*clock', ['clock']),
+    # 24-hour format (e.g., "23:59", "1430")
+    ('clock_24h', r'(\d{1,2}):(\d{2})', [':']),
+    # 4-digit time format (e.g., "1159", "0800")
+    ('four_digit', r'\b(\d{4})\b'),
+    # Simple hour with AM/PM (e.g., "11am", "3pm")
+    ('hour_ampm', r'\b(\d{1,2})\s*(am|pm)'),
+])
+
+TIME_CONVERTERS = {
+    'clock_12h': lambda m: (int(m.group(1)) % 12 + (12 if m.group(3) == 'pm' else 0),
+                            int(m.group(2)) if m.group(2) else 0),
+    'oclock': lambda m: (int(m.group(1)) % 24, 0),
+    'clock_24h': lambda m: (int(m.group(1)), int(m.group(2))),
+    'four_digit': lambda m: (int(m.group(1)[:2]), int(m.group(1)[2:])),
+    'hour_ampm': lambda m: (int(m.group(1)) % 12 + (12 if m.group(2) == 'pm' else 0), 0),
+}
+
+RELATIVE_DATE_PATTERNS = PatternSet([
+    ('today', r'\btoday\b', ['today']),
+    ('tomorrow', r'\btomorrow\b', ['tomorrow']),
+    ('yesterday', r'\byesterday\b', ['yesterday']),
+    ('next_week', r'\bnext week\b', ['next week']),
+    ('next_month', r'\bnext month\b', ['next month']),
+    ('in_days', r'\bin (\d+) days?\b', ['in ', 'day']),
+    ('in_weeks', r'\bin (\d+) weeks?\b', ['in ', 'week']),
+    ('in_a_week', r'\bin a week\b', ['in a week']),
+    ('in_a_month', r'\bin a month\b', ['in a month']),
+    ('day_after_tomorrow', r'\bday after tomorrow\b', ['day after tomorrow']),
+    ('this_weekday', r'\bthis (monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', ['this ']),
+    ('next_weekday', r'\bnext (monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', ['next ']),
+])
+
+RELATIVE_DATE_CONVERTERS = {
+    'today': lambda m, today: today,
+    'tomorrow': lambda m, today: today + timedelta(days=1),
+    'yesterday': lambda m, today: today - timedelta(days=1),
+    'next_week': lambda m, today: today + timedelta(days=7),
+    'next_month': lambda m, today: today + timedelta(days=30),
+    'in_days': lambda m, today: today + timedelta(days=int(m.group(1))),
+    'in_weeks': lambda m, today: today + timedelta(weeks=int(m.group(1))),
+    'in_a_week': lambda m, today: today + timedelta(days=7),
+    'in_a_month': lambda m, today: today + timedelta(days=30),
+    'day_after_tomorrow': lambda m, today: today + timedelta(days=2),
+    'this_weekday': lambda m, today: today + timedelta(days=(WEEKDAYS.index(m.group(1)) - today.weekday()) % 7),
+    'next_weekday': lambda m, today: today + timedelta(days=((WEEKDAYS.index(m.group(1)) - today.weekday()) % 7) or 7),
+}
+
+DATE_PATTERNS = PatternSet([
+    # DD/MM/YYYY, DD-MM-YYYY, DD.MM.YYYY
+    ('dmy', r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})'),
+    # MM/DD/YYYY (US format), tried when the day-first reading is not a real date
+    ('mdy', r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})'),
+    # DD/MM, DD-MM, DD.MM (current year)
+    ('dm', r'(\d{1,2})[/\-\.](\d{1,2})(?![/\-\.]\d)'),
+    # YYYY-MM-DD (ISO format)
+    ('ymd', r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})'),
+    # Month DD, YYYY or Month DD
+    ('month_day', rf'({MONTH_NAMES})\s+(\d{{1,2}}),?\s*(\d{{4}})?'),
+    # DD Month YYYY or DD Month
+    ('day_month', rf'(\d{{1,2}})\s+({MONTH_NAMES})\s*(\d{{4}})?'),
+    # DDth/st/nd/rd Month YYYY (e.g., "14th July", "1st March")
+    ('ordinal_day_month', rf'(\d{{1,2}})(?:st|nd|rd|th)?\s+({MONTH_NAMES})\s*(\d{{4}})?'),
+    # Month DDth/st/nd/rd (e.g., "July 14th", "March 1st")
+    ('month_ordinal_day', rf'({MONTH_NAMES})\s+(\d{{1,2}})(?:st|nd|rd|th)?\s*(\d{{4}})?'),
+])
+
+DATE_CONVERTERS = {
+    'dmy': lambda m, today: datetime(int(m.group(3)), int(m.group(2)), int(m.group(1))),
+    'mdy': lambda m, today: datetime(int(m.group(3)), int(m.group(1)), int(m.group(2))),
+    'dm': lambda m, today: datetime(today.year, int(m.group(2)), int(m.group(1))),
+    'ymd': lambda m, today: datetime(int(m.group(1)), int(m.group(2)), int(m.group(3))),
+    'month_day': lambda m, today: datetime(int(m.group(3)) if m.group(3) else today.year, MONTHS[m.group(1)], int(m.group(2))),
+    'day_month': lambda m, today: datetime(int(m.group(3)) if m.group(3) else today.year, MONTHS[m.group(2)], int(m.group(1))),
+    'ordinal_day_month': lambda m, today: datetime(int(m.group(3)) if m.group(3) else today.year, MONTHS[m.group(2)], int(m.group(1))),
+    'month_ordinal_day': lambda m, today: datetime(int(m.group(3)) if m.group(3) else today.year, MONTHS[m.group(1)], int(m.group(2))),
+}
+
+# Default time of day when the message names none, checked in this order
+DEFAULT_TIMES = (
+    (re.compile(r'assignment|homework|submit|due|project'), (23, 59)),
+    (re.compile(r'exam|test|quiz|examination'), (9, 0)),
+    (re.compile(r'lab|laboratory|labsheet|practical'), (14, 0)),  # 2:00 PM for labs
+)
+
+TITLE_PATTERNS = PatternSet([
+    # Lab-specific patterns (highest priority for lab reminders)
+    ('having_lab', r'having\s+([A-Z][A-Z\s]*?)\s+lab', ['having', 'lab']),  # "having ELECTRONICS lab" - captures just the subject
+    ('subject_lab', r'([A-Z][A-Z\s]*?)\s+lab(?:\s+on|\s+at|\s+session|\s*$)', ['lab']),  # "ELECTRONICS LAB"
+    ('subject_laboratory', r'([A-Z][A-Z\s]*?)\s+laboratory', ['laboratory']),  # "ELECTRONICS laboratory"
+    ('subject_practical', r'([A-Z][A-Z\s]*?)\s+practical', ['practical']),  # "ELECTRONICS practical"
+    # Pattern for "FOR [SUBJECT]" - most common in academic messages
+    ('for_subject', r'for\s+([\w\s]+?)(?:\s+on|\s+at|\s*$)', ['for']),
+    ('in_subject', r'in\s+([\w\s]+?)(?:\s+on|\s+at|\s*$)', ['in']),
+    # Pattern for "your [SUBJECT] assignment/exam/project" - extract just the subject
+    ('your_subject_work', r'your\s+([\w\s]+?)\s+(assignment|homework|task|exam|test|quiz|project|presentation)', ['your']),
+    # Pattern for "submit your [SUBJECT] assignment" - extract just the subject
+    ('submit_your_subject', r'submit\s+your\s+([\w\s]+?)\s+(assignment|homework|task|exam|test|quiz|project)', ['submit', 'your']),
+    # Pattern for "[SUBJECT] assignment/exam/project"
+    ('subject_work', r'([\w\s]+?)\s+(assignment|homework|task|exam|test|quiz|project|presentation)'),
+    # Pattern for "[SUBJECT] is due"
+    ('subject_is_due', r'([\w\s]+?)\s+is\s+due', ['due']),
+    # Pattern for "[SUBJECT] submission"
+    ('subject_submission', r'([\w\s]+?)\s+submission', ['submission']),
+    # Pattern for general "submit [SUBJECT]" (fallback)
+    ('submit_subject', r'submit\s+([\w\s]+?)(?:\s+on|\s+at|\s*$)', ['submit']),
+], flags=re.IGNORECASE)
+
+MESSAGE_PREFIX = re.compile(r'^(re:|fwd:|subject:|from:|to:)', re.IGNORECASE)
+TITLE_ARTICLES = re.compile(r'\b(the|a|an)\b', re.IGNORECASE)
+SENTENCE_END = re.compile(r'[.!?]')
+GREETING = re.compile(r'^(hi|hello|dear|students|reminder|notice|important)', re.IGNORECASE)
+
+
+def parse_time_from_text(text):
+    """Parse time from various text formats"""
+    text = text.lower().strip()
+
+    for name, match in TIME_PATTERNS.matches(text):
+        try:
+            hour, minute = TIME_CONVERTERS[name](match)
+            if 0 <= hour <= 23 and 0 <= minute <= 59:
+                return hour, minute
+        except (ValueError, IndexError):
+            continue
+
+    return None
+
+
+def parse_date_from_text(text, now=None):
+    """Parse date and time from various text formats including WhatsApp and email formats.
+
+    Relative dates ("tomorrow", "next friday") count from `now`, which
+    defaults to the current local time.
+    """
+    text = text.lower().strip()
+    today = now or datetime.now()
+
+    # Parse date first
+    parsed_date = None
+
+    # Try relative patterns first
+    for name, match in RELATIVE_DATE_PATTERNS.matches(text):
+        try:
+            parsed_date = RELATIVE_DATE_CONVERTERS[name](match, today)
+            break
+        except (ValueError, IndexError, TypeError):
+            continue
+
+    # If no relative date found, try day names
+    if not parsed_date:
+        for i, day in enumerate(WEEKDAYS):
+            if f' {day}' in text or text.startswith(day):
+                days_ahead = i - today.weekday()
+                if days_ahead <= 0:  # Target day already happened this week
+                    days_ahead += 7
+                parsed_date = today + timedelta(days=days_ahead)
+                break
+
+    # If no relative date found, try date patterns
+    if not parsed_date:
+        for name, match in DATE_PATTERNS.matches(text):
+            try:
+                parsed_date = DATE_CONVERTERS[name](match, today)
+                break
+            except (ValueError, IndexError):
+                continue
+
+    # If no date found, default to today
+    if not parsed_date:
+        parsed_date = today
+
+    # Now parse time and combine with date
+    time_info = parse_time_from_text(text)
+    if time_info:
+        hour, minute = time_info
+    else:
+        # If no time specified, default to 11:59 PM for assignments/projects, 9:00 AM for exams, 2:00 PM for labs
+        # and to end of day for other reminders
+        hour, minute = next((default for keywords, default in DEFAULT_TIMES if keywords.search(text)), (23, 59))
+    return parsed_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def extract_title_from_message(text, reminder_type):
+    """Extract a meaningful title from the message text"""
+    text = text.strip()
+    lines = text.split('\n')
+
+    # Remove common email/message prefixes
+    first_line = lines[0] if lines else text
+    first_line = MESSAGE_PREFIX.sub('', first_line).strip()
+
+    logger.debug("🔍 Extracting %s title from %d chars", reminder_type, len(text))
+
+    # Look for subject-specific patterns (ordered by priority)
+    for name, match in TITLE_PATTERNS.matches(text):
+        title = match.group(1).strip()
+        logger.debug("✅ Title pattern '%s' matched: '%s'", name, title)
+        # Clean up the title
+        title = TITLE_ARTICLES.sub('', title).strip()
+        if len(title) > 2 and len(title) < 50:
+            # For lab reminders, add "LAB" suffix if not already present
+            if reminder_type == 'lab' and 'lab' not in title.lower():
+                final_title = f"{title.upper()} LAB"
+                logger.debug("🧪 Lab title created: '%s'", final_title)
+                return final_title
+            logger.debug("📝 Title extracted: '%s'", title)
+            return title.upper()  # Return in uppercase for consistency
+
+    # Fallback: use first meaningful sentence
+    sentences = SENTENCE_END.split(first_line)
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if len(sentence) > 10 and len(sentence) < 100:
+            # Remove common words at the beginning
+            sentence = GREETING.sub('', sentence).strip()
+            if sentence:
+                return sentence[:50] + ('...' if len(sentence) > 50 else '')
+
+    # Final fallback
+    if len(first_line) > 10:
+        return first_line[:50] + ('...' if len(first_line) > 50 else '')
+
+    return f"{reminder_type.title()} Reminder"
+
+
+# Catalogue matching works on lowercase runs of letters and digits, so word
+# boundaries come for free and "CS-301", "cs 301" and "CS301" line up
+SUBJECT_TOKEN = re.compile(r'[a-z0-9]+')
+SUBJECT_CODE_PARTS = re.compile(r'[a-z]+|[0-9]+')
+
+
+class SubjectCatalogue:
+    """Subject names, abbreviations and course codes compiled into a token trie.
+
+    Each entry is {"name", "aliases", "codes"}; the name, every alias and
+    every code are looked for as whole words.  Matching walks the trie from
+    each word of the message, so its cost depends on the message length and
+    the longest alias, not on how many subjects the catalogue holds.  The
+    leftmost match wins, and among matches starting at the same word the
+    longest one ("cyber security" over "security").
+    """
+
+    _END = ''  # Trie key marking a complete alias; tokens are never empty
+
+    def __init__(self, subjects):
+        self.subjects = list(subjects)
+        self._trie = {}
+        for subject in self.subjects:
+            name = subject['name']
+            for alias in [name] + list(subject.get('aliases', ())):
+                self._add(SUBJECT_TOKEN.findall(alias.lower()), name)
+            for code in subject.get('codes', ()):
+                code = code.lower()
+                self._add(SUBJECT_TOKEN.findall(code), name)
+                self._add(SUBJECT_CODE_PARTS.findall(code), name)
+
+    def _add(self, tokens, name):
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # First entry to claim an alias keeps it
+        node.setdefault(self._END, name)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r') as f:
+            return cls(json.load(f)['subjects'])
+
+    def merged(self, other):
+        """A catalogue with other's subjects added; other wins on shared aliases"""
+        return SubjectCatalogue(list(other.subjects) + self.subjects)
+
+    def find(self, text):
+        """Get the catalogue name of the first subject mentioned in text, or None"""
+        tokens = SUBJECT_TOKEN.findall(text.lower())
+        trie = self._trie
+        end = self._END
+        for start, token in enumerate(tokens):
+            node = trie.get(token)
+            if node is None:
+                continue
+            found = node.get(end)
+            for token in tokens[start + 1:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                found = node.get(end, found)
+            if found is not None:
+                return found
+        return None
+
+
+class SubjectCatalogueStore:
+    """Per-college subject catalogues that reload when their files change.
+
+    directory holds default.json plus optional <college-slug>.json files
+    (e.g. "st-thomas-college.json"); a college's subjects are added on top of
+    the default ones.  File modification times are checked at most every
+    check_interval seconds, so edits go live without a restart.  A file that
+    fails to load leaves the previous catalogue in use.
+    """
+
+    def __init__(self, directory=DEFAULT_SUBJECTS_DIR, check_interval=30, clock=time.monotonic):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._clock = clock
+        # Loading a college's catalogue loads the default one under the same lock
+        self._lock = threading.RLock()
+        # slug -> (catalogue, file signature, checked_at)
+        self._loaded = {}
+
+    @staticmethod
+    def college_slug(college):
+        return re.sub(r'[^a-z0-9]+', '-', (college or '').lower()).strip('-') or 'default'
+
+    def _signature(self, paths):
+        signature = []
+        for path in paths:
+            try:
+                signature.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def get(self, college=None):
+        """Get the catalogue for a college (the default one if it has none)"""
+        slug = self.college_slug(college)
+        now = self._clock()
+        cached = self._loaded.get(slug)
+        if cached is not None and now - cached[2] < self.check_interval:
+            return cached[0]
+
+        with self._lock:
+            cached = self._loaded.get(slug)
+            paths = [os.path.join(self.directory, 'default.json')]
+            if slug != 'default':
+                paths.append(os.path.join(self.directory, f"{slug}.json"))
+            signature = self._signature(paths)
+            if cached is not None and cached[1] == signature:
+                self._loaded[slug] = (cached[0], signature, now)
+                return cached[0]
+            try:
+                catalogue = self._load(slug, paths, signature)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                if cached is None:
+                    raise
+                logger.warning("Keeping the previous %s subject catalogue: %s", slug, e)
+                catalogue = cached[0]
+            self._loaded[slug] = (catalogue, signature, now)
+            return catalogue
+
+    def _load(self, slug, paths, signature):
+        if slug == 'default':
+            catalogue = SubjectCatalogue.from_file(paths[0])
+        else:
+            default = self.get(None)
+            if signature[1] is None:
+                return default
+            catalogue = default.merged(SubjectCatalogue.from_file(paths[1]))
+        logger.info("Loaded %s subject catalogue (%d subjects)", slug, len(catalogue.subjects))
+        return catalogue
+
+
+DEFAULT_SUBJECT_CATALOGUE = SubjectCatalogue.from_file(os.path.join(DEFAULT_SUBJECTS_DIR, 'default.json'))
+
+
+def extract_subject_from_message(text, catalogue=None):
+    """Extract subject/course name from message"""
+    return (catalogue or DEFAULT_SUBJECT_CATALOGUE).find(text)
+
+
+class ReminderClassifier:
+    """Weighted keyword scoring of a message into one reminder type.
+
+    keywords maps each type to {keyword: weight}; every keyword found in the
+    message adds its weight once.  phrase_bonuses is a list of
+    {"category", "weight", "phrases"} rules that add weight once if any of the
+    phrases is found.  The highest score wins, ties going to the type listed
+    first; a message with no score at all gets the default type.
+    """
+
+    def __init__(self, keywords, phrase_bonuses=(), default=None):
+        self.categories = list(keywords)
+        self.default = default or self.categories[0]
+        self._bonuses = [(rule['category'], rule['weight']) for rule in phrase_bonuses]
+        # One entry per distinct word or phrase: (word, [(type, weight)], [bonus rule index])
+        table = {}
+        for category, weights in keywords.items():
+            for word, weight in weights.items():
+                table.setdefault(word.lower(), ([], set()))[0].append((category, weight))
+        for rule_id, rule in enumerate(phrase_bonuses):
+            for phrase in rule['phrases']:
+                table.setdefault(phrase.lower(), ([], set()))[1].add(rule_id)
+        self._entries = [(word, weights, rule_ids) for word, (weights, rule_ids) in table.items()]
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_KEYWORDS_FILE):
+        with open(path, 'r') as f:
+            config = json.load(f)
+        return cls(config['keywords'], config.get('phrase_bonuses', ()), config.get('default'))
+
+    def scores(self, text):
+        """Get {type: score} for a message"""
+        text = text.lower()
+        scores = dict.fromkeys(self.categories, 0)
+        fired = set()
+        for word, weights, rule_ids in self._entries:
+            if word in text:
+                for category, weight in weights:
+                    scores[category] += weight
+                fired.update(rule_ids)
+        for rule_id in fired:
+            category, weight = self._bonuses[rule_id]
+            scores[category] += weight
+        return scores
+
+    def classify(self, text):
+        """Get the best-scoring reminder type for a message"""
+        scores = self.scores(text)
+        max_score = max(scores.values())
+        if max_score == 0:
+            return self.default
+        return next(category for category in self.categories if scores[category] == max_score)
+
+
+# WhatsApp export headers: "12/10/2025, 9:41 pm - Name: text" (Android) or
+# "[12/10/25, 9:41:23 PM] Name: text" (iOS)
+CHAT_HEADER = re.compile(
+    r'^\[?(?P<date>\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}),?\s+'
+    r'(?P<time>\d{1,2}[:.]\d{2}(?:[:.]\d{2})?(?:\s*[ap]\.?\s?m\.?)?)\]?\s*(?:-\s*)?(?P<rest>.*)$',
+    re.IGNORECASE
+)
+CHAT_SENDER = re.compile(r'^(?P<sender>[^:]{1,80}):\s(?P<text>.*)$', re.DOTALL)
+CHAT_PLACEHOLDER = re.compile(
+    r'^(?:<media omitted>|<attached: [^>]*>|.* omitted|this message was deleted|you deleted this message)$',
+    re.IGNORECASE
+)
+# Invisible marks some exports put at the start of lines
+CHAT_LINE_MARKS = '\ufeff\u200e\u200f'
+
+
+def split_chat_export(lines):
+    """Split a chat export or digest into messages, yielding them as soon as each is complete.
+
+    lines is any iterable of text lines.  In a WhatsApp export every message
+    starts with a timestamp header and runs until the next one; each yielded
+    dict has 'sent_at', 'sender' and 'text'.  System notices (no sender) and
+    media placeholders are skipped.  Text before the first header, or text
+    with no headers at all, is split on blank lines instead.
+    """
+    current = None
+    paragraph = []
+
+    def finish_message(message):
+        text = '\n'.join(message['lines']).strip()
+        if message['sender'] is not None and text and not CHAT_PLACEHOLDER.match(text):
+            return {'sent_at': message['sent_at'], 'sender': message['sender'], 'text': text}
+        return None
+
+    for line in lines:
+        line = line.rstrip('\r\n').lstrip(CHAT_LINE_MARKS)
+        header = CHAT_HEADER.match(line)
+        if header is None:
+            if current is not None:
+                current['lines'].append(line)
+            elif line.strip():
+                paragraph.append(line.strip())
+            elif paragraph:
+                yield {'sent_at': None, 'sender': None, 'text': '\n'.join(paragraph)}
+                paragraph = []
+            continue
+
+        if paragraph:
+            yield {'sent_at': None, 'sender': None, 'text': '\n'.join(paragraph)}
+            paragraph = []
+        if current is not None:
+            message = finish_message(current)
+            if message:
+                yield message
+        sender = CHAT_SENDER.match(header.group('rest'))
+        current = {
+            'sent_at': f"{header.group('date')} {header.group('time')}",
+            'sender': sender.group('sender').strip() if sender else None,
+            'lines': [sender.group('text') if sender else header.group('rest')]
+        }
+
+    if paragraph:
+        yield {'sent_at': None, 'sender': None, 'text': '\n'.join(paragraph)}
+    if current is not None:
+        message = finish_message(current)
+        if message:
+            yield message
@@ -1893,6 +1893,14 @@ function displayExamCountdown(exam) {
 
   subjectElement.textContent = exam.subject
 
+  // The response may be a revalidated cached copy, so count down from the start time
+  if (exam.starts_at) {
+    const secondsLeft = Math.max(0, Math.floor(exam.starts_at - Date.now() / 1000))
+    exam.days_left = Math.floor(secondsLeft / 86400)
+    exam.hours_left = Math.floor((secondsLeft % 86400) / 3600)
+    exam.minutes_left = Math.floor((secondsLeft % 3600) / 60)
+  }
+
   // Format countdown text
   let countdownText = ''
   if (exam.days_left > 0) {
@@ -0,0 +1,483 @@
+"""Document storage backends for the Academic Calculator app.
+
+Every read and write in app.py goes through a ``Storage`` instance instead of
+the raw Firestore client.  Documents are addressed by slash-separated paths
+(``users/students/profiles/alice``) and collections by the path of their
+parent plus the collection name, exactly like Firestore paths.
+
+Two backends are provided:
+
+* ``FirestoreStorage`` wraps a ``google.cloud.firestore`` client.
+* ``MemoryStorage`` keeps everything in process memory so the whole app can
+  run (and be load-tested or profiled) without any network access.
+"""
+
+import copy
+import threading
+import uuid
+
+
+class NotFoundError(LookupError):
+    """Raised when updating a document that does not exist"""
+
+
+def split_path(path):
+    """Split a document path into (collection_path, document_id)"""
+    collection_path, _, doc_id = path.strip('/').rpartition('/')
+    if not collection_path or not doc_id:
+        raise ValueError(f"Invalid document path: {path}")
+    return collection_path, doc_id
+
+
+class Storage:
+    """Interface implemented by every storage backend"""
+
+    name = 'base'
+
+    def get(self, path):
+        """Return the document at path as a dict, or None if it does not exist"""
+        raise NotImplementedError
+
+    def set(self, path, data, merge=False):
+        """Create or overwrite the document at path"""
+        raise NotImplementedError
+
+    def update(self, path, fields):
+        """Update top-level fields of an existing document"""
+        raise NotImplementedError
+
+    def delete(self, path):
+        """Delete the document at path (no error if it does not exist)"""
+        raise NotImplementedError
+
+    def add(self, collection_path, data):
+        """Add a document with a generated id and return that id"""
+        raise NotImplementedError
+
+    def stream(self, collection_path, filters=(), limit=None, order_by=None, descending=False):
+        """Return [(doc_id, data)] for documents in a collection.
+
+        filters is a sequence of (field, op, value) tuples using Firestore
+        operators ('==', '!=', '<', '<=', '>', '>=', 'in', 'array_contains').
+        order_by names a field to sort on (ascending unless descending=True);
+        as in Firestore, documents without that field are left out.
+        """
+        raise NotImplementedError
+
+    def transact(self, path, update_fn):
+        """Atomically read-modify-write one document.
+
+        update_fn receives the current document (or None) and returns the
+        document to store, or None to leave it untouched.  Returns whatever
+        update_fn returned.  update_fn may run more than once on contention.
+        """
+        raise NotImplementedError
+
+    def run_transaction(self, fn):
+        """Atomically read several documents and write a batch based on them.
+
+        fn receives a read(path) function and returns (operations, result),
+        where operations is a list for batch_write.  The writes are applied
+        only if nothing fn read has changed meanwhile; fn may run more than
+        once on contention.  Returns result.
+        """
+        raise NotImplementedError
+
+    def increment(self, path, deltas):
+        """Atomically add numeric deltas to fields, creating the document if needed.
+
+        deltas may nest dicts, e.g. {'categories': {'Food': {'total': 12.5}}}.
+        """
+        self.batch_write([('increment', path, deltas)])
+
+    def batch_write(self, operations):
+        """Apply a list of ('set' | 'update' | 'delete' | 'increment', path, data) operations in one batch"""
+        raise NotImplementedError
+
+
+def _firestore_increments(deltas):
+    """Turn nested numeric deltas into Firestore Increment transforms"""
+    from google.cloud.firestore import Increment
+    return {
+        key: _firestore_increments(value) if isinstance(value, dict) else Increment(value)
+        for key, value in deltas.items()
+    }
+
+
+class FirestoreStorage(Storage):
+    """Storage backed by a Cloud Firestore client"""
+
+    name = 'firestore'
+    # Firestore rejects batches with more than 500 writes
+    max_batch_size = 500
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, path):
+        doc = self.client.document(path).get()
+        return doc.to_dict() if doc.exists else None
+
+    def set(self, path, data, merge=False):
+        self.client.document(path).set(data, merge=merge)
+
+    def update(self, path, fields):
+        from google.api_core.exceptions import NotFound
+        try:
+            self.client.document(path).update(fields)
+        except NotFound as e:
+            raise NotFoundError(path) from e
+
+    def delete(self, path):
+        self.client.document(path).delete()
+
+    def transact(self, path, update_fn):
+        from google.cloud import firestore as cloud_firestore
+        ref = self.client.document(path)
+
+        @cloud_firestore.transactional
+        def run(transaction):
+            snapshot = ref.get(transaction=transaction)
+            new_data = update_fn(snapshot.to_dict() if snapshot.exists else None)
+            if new_data is not None:
+                transaction.set(ref, new_data)
+            return new_data
+
+        return run(self.client.transaction())
+
+    def _write(self, writer, op, path, data):
+        """Queue one batch operation on a WriteBatch or Transaction"""
+        ref = self.client.document(path)
+        if op == 'set':
+            writer.set(ref, data)
+        elif op == 'update':
+            writer.update(ref, data)
+        elif op == 'delete':
+            writer.delete(ref)
+        elif op == 'increment':
+            writer.set(ref, _firestore_increments(data), merge=True)
+        else:
+            raise ValueError(f"Unknown batch operation: {op}")
+
+    def run_transaction(self, fn):
+        from google.cloud import firestore as cloud_firestore
+
+        @cloud_firestore.transactional
+        def run(transaction):
+            def read(path):
+                snapshot = self.client.document(path).get(transaction=transaction)
+                return snapshot.to_dict() if snapshot.exists else None
+
+            operations, result = fn(read)
+            for op, path, data in operations:
+                self._write(transaction, op, path, data)
+            return result
+
+        return run(self.client.transaction())
+
+    def add(self, collection_path, data):
+        _, doc_ref = self.client.collection(collection_path).add(data)
+        return doc_ref.id
+
+    def stream(self, collection_path, filters=(), limit=None, order_by=None, descending=False):
+        query = self.client.collection(collection_path)
+        for field, op, value in filters:
+            query = query.where(field, op, value)
+        if order_by is not None:
+            query = query.order_by(order_by, direction='DESCENDING' if descending else 'ASCENDING')
+        if limit is not None:
+            query = query.limit(limit)
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    def batch_write(self, operations):
+        for start in range(0, len(operations), self.max_batch_size):
+            batch = self.client.batch()
+            for op, path, data in operations[start:start + self.max_batch_size]:
+                self._write(batch, op, path, data)
+            batch.commit()
+
+
+def _matches(data, filters):
+    """Evaluate Firestore-style filters against a document dict"""
+    for field, op, value in filters:
+        if field not in data:
+            return False
+        current = data[field]
+        try:
+            if op == '==':
+                ok = current == value
+            elif op == '!=':
+                ok = current != value
+            elif op == '<':
+                ok = current < value
+            elif op == '<=':
+                ok = current <= value
+            elif op == '>':
+                ok = current > value
+            elif op == '>=':
+                ok = current >= value
+            elif op == 'in':
+                ok = current in value
+            elif op == 'array_contains':
+                ok = isinstance(current, list) and value in current
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        except TypeError:
+            # Firestore never matches values of different types in range filters
+            ok = False
+        if not ok:
+            return False
+    return True
+
+
+def _deep_merge(target, data):
+    """Merge data into target in place, recursing into nested maps like Firestore's set(merge=True)"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _apply_increments(target, deltas):
+    """Add nested numeric deltas into target in place"""
+    for key, value in deltas.items():
+        if isinstance(value, dict):
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            _apply_increments(target[key], value)
+        else:
+            current = target.get(key)
+            target[key] = (current if isinstance(current, (int, float)) else 0) + value
+
+
+class MemoryStorage(Storage):
+    """Thread-safe in-process stand-in for Firestore.
+
+    Documents are deep-copied on the way in and out so callers cannot mutate
+    stored state by accident, mirroring the serialization boundary of a real
+    database.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.RLock()
+
+    def get(self, path):
+        collection_path, doc_id = split_path(path)
+        with self._lock:
+            data = self._collections.get(collection_path, {}).get(doc_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def set(self, path, data, merge=False):
+        collection_path, doc_id = split_path(path)
+        with self._lock:
+            docs = self._collections.setdefault(collection_path, {})
+            if merge and doc_id in docs:
+                _deep_merge(docs[doc_id], data)
+            else:
+                docs[doc_id] = copy.deepcopy(data)
+
+    def update(self, path, fields):
+        collection_path, doc_id = split_path(path)
+        with self._lock:
+            docs = self._collections.get(collection_path, {})
+            if doc_id not in docs:
+                raise NotFoundError(path)
+            docs[doc_id].update(copy.deepcopy(fields))
+
+    def delete(self, path):
+        collection_path, doc_id = split_path(path)
+        with self._lock:
+            self._collections.get(collection_path, {}).pop(doc_id, None)
+
+    def transact(self, path, update_fn):
+        with self._lock:
+            new_data = update_fn(self.get(path))
+            if new_data is not None:
+                self.set(path, new_data)
+            return copy.deepcopy(new_data)
+
+    def run_transaction(self, fn):
+        with self._lock:
+            operations, result = fn(self.get)
+            self.batch_write(operations)
+            return result
+
+    def add(self, collection_path, data):
+        doc_id = uuid.uuid4().hex[:20]
+        self.set(f"{collection_path.strip('/')}/{doc_id}", data)
+        return doc_id
+
+    def stream(self, collection_path, filters=(), limit=None, order_by=None, descending=False):
+        with self._lock:
+            docs = self._collections.get(collection_path.strip('/'), {})
+            # Firestore returns documents ordered by id when no order is given
+            doc_ids = sorted(docs)
+            if order_by is not None:
+                doc_ids = [doc_id for doc_id in doc_ids if order_by in docs[doc_id]]
+                doc_ids.sort(key=lambda doc_id: docs[doc_id][order_by], reverse=descending)
+            results = []
+            for doc_id in doc_ids:
+                if _matches(docs[doc_id], filters):
+                    results.append((doc_id, copy.deepcopy(docs[doc_id])))
+                    if limit is not None and len(results) >= limit:
+                        break
+            return results
+
+    def batch_write(self, operations):
+        with self._lock:
+            # Validate first so a failing update leaves the batch unapplied
+            exists = {}
+            for op, path, _ in operations:
+                if op not in ('set', 'update', 'delete', 'increment'):
+                    raise ValueError(f"Unknown batch operation: {op}")
+                if op == 'update':
+                    if path not in exists:
+                        collection_path, doc_id = split_path(path)
+                        exists[path] = doc_id in self._collections.get(collection_path, {})
+                    if not exists[path]:
+                        raise NotFoundError(path)
+                else:
+                    exists[path] = op != 'delete'
+            for op, path, data in operations:
+                if op == 'set':
+                    self.set(path, data)
+                elif op == 'update':
+                    self.update(path, data)
+                elif op == 'increment':
+                    collection_path, doc_id = split_path(path)
+                    doc = self._collections.setdefault(collection_path, {}).setdefault(doc_id, {})
+                    _apply_increments(doc, data)
+                else:
+                    self.delete(path)
+
+
+class ReadMemo:
+    """Documents read or written during one unit of work (normally a request).
+
+    docs maps path -> dict, or None for a document known not to exist.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+        self.reads_saved = 0
+
+
+class MemoizingStorage(Storage):
+    """Wraps a backend so each document is fetched at most once per memo scope.
+
+    memo_getter returns the active ReadMemo, or None to pass straight through
+    (e.g. in background threads with no request).  Writes made through this
+    wrapper update the memo, so later reads in the same scope see them.
+    """
+
+    def __init__(self, backend, memo_getter):
+        self.backend = backend
+        self._memo_getter = memo_getter
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def get(self, path):
+        memo = self._memo_getter()
+        if memo is None:
+            return self.backend.get(path)
+        if path in memo.docs:
+            memo.reads_saved += 1
+            data = memo.docs[path]
+        else:
+            data = self.backend.get(path)
+            memo.reads += 1
+            memo.docs[path] = data
+        return copy.deepcopy(data) if data is not None else None
+
+    def _remember(self, path, data):
+        memo = self._memo_getter()
+        if memo is not None:
+            memo.docs[path] = copy.deepcopy(data)
+
+    def _forget(self, path):
+        memo = self._memo_getter()
+        if memo is not None:
+            memo.docs.pop(path, None)
+
+    def _merge(self, path, fields, deep=False):
+        memo = self._memo_getter()
+        if memo is None:
+            return
+        if memo.docs.get(path) is not None and not any('.' in key for key in fields):
+            if deep:
+                _deep_merge(memo.docs[path], fields)
+            else:
+                memo.docs[path].update(copy.deepcopy(fields))
+        else:
+            # Unknown base document or nested field paths: fetch again if asked
+            memo.docs.pop(path, None)
+
+    def set(self, path, data, merge=False):
+        self.backend.set(path, data, merge=merge)
+        if merge:
+            # set(merge=True) merges nested maps; update() replaces them
+            self._merge(path, data, deep=True)
+        else:
+            self._remember(path, data)
+
+    def update(self, path, fields):
+        self.backend.update(path, fields)
+        self._merge(path, fields)
+
+    def delete(self, path):
+        self.backend.delete(path)
+        self._remember(path, None)
+
+    def transact(self, path, update_fn):
+        # Always read through to the backend; a memoized copy could be stale
+        new_data = self.backend.transact(path, update_fn)
+        if new_data is not None:
+            self._remember(path, new_data)
+        else:
+            self._forget(path)
+        return new_data
+
+    def run_transaction(self, fn):
+        # Reads go straight to the backend; forget whatever the writes touched
+        applied = []
+
+        def run(read):
+            operations, result = fn(read)
+            applied[:] = operations
+            return operations, result
+
+        result = self.backend.run_transaction(run)
+        for _, path, _ in applied:
+            self._forget(path)
+        return result
+
+    def add(self, collection_path, data):
+        doc_id = self.backend.add(collection_path, data)
+        self._remember(f"{collection_path.strip('/')}/{doc_id}", data)
+        return doc_id
+
+    def stream(self, collection_path, filters=(), limit=None, order_by=None, descending=False):
+        # Queries aren't memoized, but they still count towards the report
+        memo = self._memo_getter()
+        if memo is not None:
+            memo.reads += 1
+        return self.backend.stream(collection_path, filters, limit, order_by, descending)
+
+    def batch_write(self, operations):
+        self.backend.batch_write(operations)
+        for op, path, data in operations:
+            if op == 'set':
+                self._remember(path, data)
+            elif op == 'update':
+                self._merge(path, data)
+            elif op == 'increment':
+                self._forget(path)
+            else:
+                self._remember(path, None)
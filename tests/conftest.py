@@ -0,0 +1,35 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Run the whole app against the in-process storage backend
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as academia  # noqa: E402
+
+
+@pytest.fixture
+def app_module():
+    return academia
+
+
+@pytest.fixture
+def username():
+    return f"user{uuid.uuid4().hex[:10]}"
+
+
+@pytest.fixture
+def client(username):
+    """A test client logged in as a freshly registered user"""
+    client = academia.app.test_client()
+    client.post('/register', data={
+        'student_name': 'Test Student', 'username': username, 'password': 'pw12345',
+        'confirm_password': 'pw12345', 'email': f'{username}@example.com', 'student_id': '1',
+        'phone': '1', 'college': 'Test College', 'course': 'B.Tech', 'from_year': '2023', 'to_year': '2027',
+    })
+    response = client.post('/login', data={'username': username, 'password': 'pw12345'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,55 @@
+import pytest
+
+
+def test_closed_form_matches_step_by_step(app_module):
+    plan = app_module.attendance_plan(60, 100, 75)
+    # (60 + 60) / (100 + 60) == 75%, one class fewer is short
+    assert plan['future_classes'] == 60
+    assert plan['status'] == 'at_risk'
+
+    plan = app_module.attendance_plan(80, 100, 75)
+    # 80 / (100 + 6) >= 75% but 80 / 107 is not
+    assert plan['can_skip'] == 6
+    assert plan['status'] == 'safe'
+
+
+def test_zero_percent_required_allows_skipping_everything(app_module):
+    plan = app_module.attendance_plan(0, 10, 0)
+    assert plan['status'] == 'safe'
+    assert plan['can_skip'] is None
+    assert plan['future_classes'] == 0
+
+
+def test_hundred_percent_required(app_module):
+    perfect = app_module.attendance_plan(10, 10, 100)
+    assert (perfect['status'], perfect['can_skip'], perfect['future_classes']) == ('safe', 0, 0)
+
+    missed = app_module.attendance_plan(9, 10, 100)
+    assert missed['status'] == 'at_risk'
+    assert missed['future_classes'] is None
+    assert 'can no longer be reached' in missed['recommendation']
+
+
+@pytest.mark.parametrize('attended', [7.9, '7.5', True, 'seven'])
+def test_rejects_non_integer_counts(client, attended):
+    response = client.post('/api/calculate_attendance', json={'attended': attended, 'total': 10})
+    assert response.status_code == 400
+
+
+def test_accepts_integral_values(app_module):
+    assert app_module.attendance_plan(7.0, '10', 75)['attended'] == 7
+
+
+def test_batch_reports_unreachable_subjects(client):
+    response = client.post('/api/calculate_attendance/batch', json={'save': False, 'subjects': [
+        {'subject_name': 'Maths', 'attended': 60, 'total': 100, 'min_required': 75},
+        {'subject_name': 'Lab', 'attended': 9, 'total': 10, 'min_required': 100},
+        {'subject_name': 'Physics', 'attended': 7.9, 'total': 10},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['overall']['classes_needed'] == 60
+    assert body['overall']['unreachable'] == ['Lab']
+    assert body['overall']['at_risk'] == ['Maths', 'Lab']
+    assert body['errors'] == 1
+    assert body['subjects'][2]['error'] == 'Attended and total classes must be whole numbers'
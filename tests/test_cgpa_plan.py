@@ -0,0 +1,60 @@
+def plan(client, **body):
+    return client.post('/api/cgpa/plan', json=body)
+
+
+def test_ten_point_scale_targets_and_what_if(client):
+    response = plan(client, semesters=[{'sgpa': 8, 'credits': 20}], remaining_credits=[10, 10],
+                    targets=[4, 8.5, 9.5], sgpas=[6, 10])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['current_cgpa'] == 8
+    assert body['lower_is_better'] is False
+    assert body['required_curve'] == [
+        {'target': 4.0, 'required_sgpa': 0.0, 'achievable': True, 'already_met': True},
+        {'target': 8.5, 'required_sgpa': 9.0, 'achievable': True, 'already_met': False},
+        {'target': 9.5, 'required_sgpa': 11.0, 'achievable': False, 'already_met': False},
+    ]
+    assert [(row['sgpa'], row['cgpa']) for row in body['what_if']] == [(6.0, 7.0), (10.0, 9.0)]
+    assert body['what_if'][1]['gpa_5_scale'] == 4.5
+
+
+def test_five_point_scale_lower_is_better(client):
+    body = plan(client, scale=5, semesters=[{'sgpa': 2.0, 'credits': 30}], remaining_credits=30,
+                targets=[1.5, 1.4, 3.5], sgpas=[1.0]).get_json()
+    assert body['lower_is_better'] is True
+    assert [(row['required_sgpa'], row['achievable'], row['already_met']) for row in body['required_curve']] == [
+        (1.0, True, False),   # needs the best grade
+        (0.8, False, False),  # better than the best grade
+        (5.0, True, True),    # even the worst grade keeps it
+    ]
+    assert body['what_if'][0]['cgpa'] == 1.5
+
+
+def test_default_grid_covers_the_scale(client):
+    body = plan(client, scale=5, semesters=[{'sgpa': 2.0, 'credits': 30}], remaining_credits=30).get_json()
+    sgpas = [row['sgpa'] for row in body['what_if']]
+    assert sgpas[0] == 1.0 and sgpas[-1] == 5.0 and len(sgpas) == 41
+
+
+def test_grid_limit(client, app_module):
+    too_fine = plan(client, semesters=[{'sgpa': 8, 'credits': 20}], remaining_credits=20,
+                    targets={'start': 0, 'stop': 10, 'step': 0.01})
+    assert too_fine.status_code == 400
+    assert too_fine.get_json()['error'] == f'At most {app_module.CGPA_PLAN_MAX_POINTS} grid points per request'
+
+    # Each grid fits, but together they do not
+    combined = plan(client, semesters=[{'sgpa': 8, 'credits': 20}], remaining_credits=20,
+                    targets=[8] * (app_module.CGPA_PLAN_MAX_POINTS - 10), sgpas={'start': 0, 'stop': 10, 'step': 0.25})
+    assert combined.status_code == 400
+
+
+def test_rejects_plans_that_cannot_be_evaluated(client):
+    assert plan(client, semesters=[{'sgpa': 8, 'credits': 20}], remaining_credits=0).status_code == 400
+    assert plan(client, semesters=[{'sgpa': 8, 'credits': 20}], remaining_credits=20, scale=7).status_code == 400
+    assert plan(client, semesters=[{'sgpa': 8, 'credits': 20}], remaining_credits=20,
+                targets={'start': 9, 'stop': 8}).status_code == 400
+
+    # No completed semesters: targets are still planned, there is just no current CGPA
+    body = plan(client, remaining_credits=20, targets=[9], sgpas=[9]).get_json()
+    assert body['current_cgpa'] is None
+    assert body['required_curve'][0]['required_sgpa'] == 9.0
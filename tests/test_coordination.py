@@ -0,0 +1,55 @@
+from coordination import FileLock, LeaseLock
+from storage import MemoryStorage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lease_is_taken_over_after_expiry():
+    storage, clock = MemoryStorage(), FakeClock()
+    first = LeaseLock(storage, 'leases/scheduler', ttl=90, holder='a', clock=clock)
+    second = LeaseLock(storage, 'leases/scheduler', ttl=90, holder='b', clock=clock)
+
+    assert first.acquire()
+    assert not second.acquire()
+
+    # Renewing pushes the expiry out but keeps the original acquisition time
+    clock.now += 60
+    assert first.acquire()
+    assert storage.get('leases/scheduler')['acquired_at'] == 1000.0
+    clock.now += 89
+    assert not second.acquire()
+
+    # The leader stops renewing; once the lease lapses the other process takes it
+    clock.now += 1
+    assert second.acquire()
+    assert not first.acquire()
+    assert storage.get('leases/scheduler')['holder'] == 'b'
+
+
+def test_released_lease_can_be_taken_immediately():
+    storage, clock = MemoryStorage(), FakeClock()
+    first = LeaseLock(storage, 'leases/scheduler', holder='a', clock=clock)
+    second = LeaseLock(storage, 'leases/scheduler', holder='b', clock=clock)
+    assert first.acquire()
+    # Only the holder can release
+    second.release()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / 'scheduler.lock')
+    first, second = FileLock(path), FileLock(path)
+    assert first.acquire()
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+
+def exam_on(app_module, days, subject, time='10:00'):
+    date = (datetime.now(app_module.IST) + timedelta(days=days)).strftime('%Y-%m-%d')
+    return {'subject': subject, 'date': date, 'time': time}
+
+
+def test_next_exam_etag_is_stable_between_polls(client, app_module):
+    client.post('/api/exam-timetable', json={'exam_timetable': {'exams': [
+        exam_on(app_module, 5, 'Physics', '14:00 (AN)'), exam_on(app_module, -1, 'Past'), exam_on(app_module, 2, 'Maths'),
+    ]}})
+
+    response = client.get('/api/next-exam')
+    assert response.get_json()['next_exam']['subject'] == 'Maths'
+    assert response.get_json()['next_exam']['starts_at'] > 0
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidated = client.get('/api/next-exam', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_save_from_another_worker_is_seen(client, app_module, username):
+    client.post('/api/exam-timetable', json={'exam_timetable': {'exams': [exam_on(app_module, 3, 'Maths')]}})
+    etag = client.get('/api/next-exam').headers['ETag']
+
+    # Another worker saves; this process still holds the old index in its caches
+    other = app_module.index_exam_timetable({'exams': [exam_on(app_module, 1, 'Chemistry')]})
+    app_module.storage.batch_write([
+        ('set', app_module.get_user_data_path(username, 'exam_timetable'), {'data': other}),
+        ('set', app_module.get_user_data_path(username, 'exam_timetable_version'), {'version': other['exam_index']['version']}),
+    ])
+
+    response = client.get('/api/next-exam', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['next_exam']['subject'] == 'Chemistry'
+
+
+def test_exam_index_is_not_returned(client, app_module):
+    client.post('/api/exam-timetable', json={'exam_timetable': {'exams': [exam_on(app_module, 3, 'Maths')], 'semester': 'S5'}})
+    timetable = client.get('/api/exam-timetable').get_json()['exam_timetable']
+    assert 'exam_index' not in timetable
+    assert timetable['semester'] == 'S5'
@@ -0,0 +1,40 @@
+def add_expense(client, amount, category, date):
+    response = client.post('/api/expenses', json={'amount': amount, 'category': category,
+                                                  'description': f'{category} spend', 'date': date})
+    assert response.status_code == 200
+    return response.get_json()['expense']
+
+
+def test_rollups_follow_add_update_and_delete(client):
+    lunch = add_expense(client, 120.5, 'Food', '2026-10-03T12:00:00')
+    add_expense(client, 80, 'Food', '2026-10-20T12:00:00')
+    bus = add_expense(client, 40, 'Travel', '2026-11-01T08:00:00')
+
+    stats = client.get('/api/expense-stats').get_json()
+    assert stats['monthly_totals'] == {'2026-10': {'Food': 200.5}, '2026-11': {'Travel': 40.0}}
+    assert stats['category_totals'] == {'Food': 200.5, 'Travel': 40.0}
+
+    # Moving an expense to another month and category moves its amount too
+    client.put(f"/api/expenses/{lunch['id']}", json={'category': 'Travel', 'date': '2026-11-02T12:00:00'})
+    assert client.get('/api/expense-stats').get_json()['monthly_totals'] == {
+        '2026-10': {'Food': 80.0}, '2026-11': {'Travel': 160.5}}
+
+    client.delete(f"/api/expenses/{bus['id']}")
+    client.delete(f"/api/expenses/{lunch['id']}")
+    stats = client.get('/api/expense-stats').get_json()
+    # A category whose last expense is gone drops out instead of showing 0
+    assert stats['monthly_totals'] == {'2026-10': {'Food': 80.0}}
+    assert stats['total_expenses'] == 80.0
+
+
+def test_legacy_migration_tolerates_rows_without_ids(client, app_module, username):
+    app_module.save_user_data(username, 'expenses', [
+        {'id': 'e1', 'amount': 50.0, 'category': 'Food', 'description': 'x', 'date': '2026-09-01T10:00:00'},
+        {'amount': 25.0, 'category': 'Food', 'description': 'no id', 'date': '2026-09-02T10:00:00'},
+        {'id': 'broken', 'category': 'Food', 'description': 'no amount'},
+    ])
+
+    expenses = client.get('/api/expenses').get_json()['expenses']
+    assert sorted(e['description'] for e in expenses) == ['no id', 'x']
+    assert all(e['id'] for e in expenses)
+    assert client.get('/api/expense-stats').get_json()['monthly_totals'] == {'2026-09': {'Food': 75.0}}
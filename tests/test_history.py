@@ -0,0 +1,46 @@
+LEGACY_CALCULATIONS = {
+    'cgpa': [{'result': {'cgpa': 7.5, 'scale': 10}, 'timestamp': '2025-01-01T10:00:00'},
+             {'result': {'cgpa': 8.0, 'scale': 10}, 'timestamp': '2025-02-01T10:00:00'}],
+    'attendance': [{'result': {'current_percent': 80.0, 'subject_name': 'Maths'}, 'timestamp': '2025-01-05T09:00:00'}],
+}
+
+
+def stored_records(app_module, username):
+    return app_module.storage.stream(app_module.get_user_calculations_path(username))
+
+
+def test_migrating_twice_does_not_duplicate_history(client, app_module, username):
+    app_module.save_user_data(username, 'calculations', LEGACY_CALCULATIONS)
+    assert app_module.migrate_legacy_calculations(username) == 3
+
+    # A second request that also saw the unmigrated document
+    app_module.save_user_data(username, 'calculations', LEGACY_CALCULATIONS)
+    assert app_module.migrate_legacy_calculations(username) == 3
+
+    assert len(stored_records(app_module, username)) == 3
+    history = client.get('/api/history').get_json()
+    assert [record['result']['cgpa'] for record in history['cgpa']] == [7.5, 8.0]
+    assert client.get('/api/history/trends').get_json()['records'] == 3
+
+
+def test_append_during_trends_rebuild_is_not_lost(client, app_module, username, monkeypatch):
+    client.post('/api/calculate_cgpa', json={'semesters': [{'sgpa': 7, 'credits': 20}]})
+    app_module.mark_user_trends_stale(username)
+
+    stream = app_module.storage.stream
+    appended = []
+
+    def stream_then_append(collection_path, *args, **kwargs):
+        records = stream(collection_path, *args, **kwargs)
+        if collection_path == app_module.get_user_calculations_path(username) and not appended:
+            # An append lands after the rebuild has read history
+            appended.append(app_module.add_user_calculation(username, 'cgpa', {'cgpa': 8.0, 'scale': 10}))
+        return records
+
+    monkeypatch.setattr(app_module.storage, 'stream', stream_then_append)
+    trends = client.get('/api/history/trends').get_json()
+    monkeypatch.undo()
+
+    assert appended == [True]
+    assert trends['records'] == 2
+    assert trends['cgpa']['10']['latest'] == 8.0
@@ -0,0 +1,101 @@
+import smtplib
+
+import pytest
+
+from mailer import SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records sessions and can be told to fail"""
+
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        self.fail_with = None
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def has_extn(self, name):
+        return True
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        return (250, b'OK')
+
+    def sendmail(self, from_addr, to_addrs, message):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.sent.append((from_addr, to_addrs, message))
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    FakeSMTP.instances = []
+    return SMTPConnectionPool('smtp.example.com', 587, 'user', 'secret', size=1, smtp_class=FakeSMTP)
+
+
+def test_session_is_reused(pool):
+    pool.send('a@example.com', ['b@example.com'], 'one')
+    pool.send('a@example.com', ['b@example.com'], 'two')
+    [smtp] = FakeSMTP.instances
+    assert [m[2] for m in smtp.sent] == ['one', 'two']
+    assert pool.stats()['connections_opened'] == 1
+
+
+def test_stale_session_is_replaced(pool):
+    pool.send('a@example.com', ['b@example.com'], 'one')
+    FakeSMTP.instances[0].fail_with = smtplib.SMTPServerDisconnected('gone')
+
+    pool.send('a@example.com', ['b@example.com'], 'two')
+    stale, fresh = FakeSMTP.instances
+    assert stale.closed
+    assert fresh.sent[0][2] == 'two'
+    assert pool.stats()['reconnects'] == 1
+
+
+def test_idle_session_is_probed_before_reuse(pool, monkeypatch):
+    pool.send('a@example.com', ['b@example.com'], 'one')
+    pool.noop_after = 0
+    monkeypatch.setattr(FakeSMTP, 'noop', lambda self: (421, b'closing'))
+
+    pool.send('a@example.com', ['b@example.com'], 'two')
+    assert len(FakeSMTP.instances) == 2
+    assert pool.stats()['reconnects'] == 0
+
+
+@pytest.mark.parametrize('error', [
+    smtplib.SMTPRecipientsRefused({'b@example.com': (550, b'no such user')}),
+    smtplib.SMTPDataError(552, b'message too big'),
+    smtplib.SMTPSenderRefused(553, b'bad sender', 'a@example.com'),
+])
+def test_server_rejection_is_not_resent(pool, error):
+    pool.send('a@example.com', ['b@example.com'], 'one')
+    smtp = FakeSMTP.instances[0]
+    smtp.fail_with = error
+
+    with pytest.raises(type(error)):
+        pool.send('a@example.com', ['b@example.com'], 'two')
+    assert len(FakeSMTP.instances) == 1
+    assert not smtp.closed
+    assert pool.stats()['reconnects'] == 0
+
+    # The healthy session goes back to the pool
+    smtp.fail_with = None
+    pool.send('a@example.com', ['b@example.com'], 'three')
+    assert [m[2] for m in smtp.sent] == ['one', 'three']
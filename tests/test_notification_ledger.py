@@ -0,0 +1,78 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class StubOutbox:
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue(self, recipient, payload, **callbacks):
+        self.jobs.append({'recipient': recipient, 'payload': payload, **callbacks})
+        return True
+
+
+@pytest.fixture
+def outbox(app_module, monkeypatch):
+    stub = StubOutbox()
+    monkeypatch.setattr(app_module, 'email_outbox', stub)
+    return stub
+
+
+def jobs_for(outbox, username):
+    return [job for job in outbox.jobs if job['recipient'] == f'{username}@example.com']
+
+
+def test_claim_confirm_and_mark_sent(client, app_module, username, outbox):
+    client.post('/api/reminders/email-settings', json={'enabled': True})
+    due = datetime.now(app_module.IST) + timedelta(hours=23, minutes=30)
+    reminder = client.post('/api/reminders', json={'title': 'Viva', 'due_date': due.isoformat()}).get_json()['reminder']
+    entry_path = app_module.get_schedule_entry_path(username, reminder['id'], '24_hour')
+
+    app_module.check_and_send_email_reminders()
+    [job] = jobs_for(outbox, username)
+    assert job['payload']['notification_type'] == '24_hour'
+
+    # The entry is claimed, so a second scan (or another scheduler) skips it
+    app_module.check_and_send_email_reminders()
+    assert len(jobs_for(outbox, username)) == 1
+    assert app_module.claim_schedule_entry(entry_path, time.time()) is None
+    assert not app_module.confirm_schedule_claim(entry_path, 'someone-else')
+    assert job['before_send']()
+
+    job['on_sent']()
+    job['on_sent']()
+    ledger = app_module.load_sent_notifications(username)
+    assert ledger[reminder['id']]['types'] == {'24_hour'}
+    assert app_module.storage.get(entry_path) is None
+
+    # Re-indexing brings the entry back, but the ledger keeps it from being sent twice
+    app_module.reschedule_user_reminders(username)
+    assert app_module.storage.get(entry_path) is not None
+    app_module.check_and_send_email_reminders()
+    assert len(jobs_for(outbox, username)) == 1
+    assert app_module.storage.get(entry_path) is None
+
+
+def test_ledger_resets_when_due_time_moves(app_module):
+    ledger = {'r1': {'due_at': 1000.0, 'types': {'24_hour', '1_hour'}}}
+    assert app_module.notification_already_sent(ledger, 'r1', '1_hour', 1000.0)
+    assert not app_module.notification_already_sent(ledger, 'r1', 'overdue', 1000.0)
+    assert not app_module.notification_already_sent(ledger, 'r1', '1_hour', 5000.0)
+
+
+def test_mark_sent_for_a_new_due_time_starts_a_fresh_entry(app_module, username):
+    path = app_module.get_sent_notification_path(username, 'r1')
+    app_module.mark_notification_sent(username, 'r1', '24_hour', 1000.0, 'notification_schedule/none')
+    app_module.mark_notification_sent(username, 'r1', '1_hour', 1000.0, 'notification_schedule/none')
+    assert app_module.storage.get(path)['types'] == ['1_hour', '24_hour']
+    app_module.mark_notification_sent(username, 'r1', '1_hour', 2000.0, 'notification_schedule/none')
+    assert app_module.storage.get(path)['types'] == ['1_hour']
+    assert app_module.storage.get(path)['due_at'] == 2000.0
+
+
+def test_expired_ledger_entries_are_dropped(app_module, username):
+    app_module.mark_notification_sent(username, 'r1', 'overdue', 1000.0, 'notification_schedule/none')
+    assert app_module.load_sent_notifications(username, now=1000.0 + app_module.OVERDUE_NOTIFY_WINDOW_SECONDS) == {}
+    assert app_module.storage.get(app_module.get_sent_notification_path(username, 'r1')) is None
@@ -0,0 +1,50 @@
+DUE_AT = 1_800_000_000.0
+
+
+def scheduled(app_module, now, username='alice', reminder_id='r1'):
+    """Get {notification_type: entry} for the entries a reminder due at DUE_AT keeps at `now`"""
+    reminder = {'id': reminder_id, 'due_date': app_module.format_due_date(DUE_AT)}
+    entries = {}
+    for op, path, data in app_module.reminder_schedule_operations(username, reminder_id, reminder, now=now):
+        if path.startswith(app_module.NOTIFICATION_SCHEDULE_COLLECTION) and op == 'set':
+            entries[data['notification_type']] = data
+    return entries
+
+
+def test_entries_fire_at_their_window_start(app_module):
+    entries = scheduled(app_module, DUE_AT - 48 * 3600)
+    assert entries['24_hour']['fire_at'] == DUE_AT - 24 * 3600
+    assert entries['1_hour']['fire_at'] == DUE_AT - 3600
+    assert entries['overdue']['fire_at'] == DUE_AT
+
+
+def test_24_hour_window_edge(app_module):
+    assert '24_hour' in scheduled(app_module, DUE_AT - 23 * 3600 - 1)
+    assert '24_hour' not in scheduled(app_module, DUE_AT - 23 * 3600)
+
+
+def test_1_hour_window_edge(app_module):
+    assert '1_hour' in scheduled(app_module, DUE_AT - 1801)
+    assert '1_hour' not in scheduled(app_module, DUE_AT - 1800)
+
+
+def test_overdue_window_edge(app_module):
+    assert set(scheduled(app_module, DUE_AT + app_module.OVERDUE_NOTIFY_WINDOW_SECONDS - 1)) == {'overdue'}
+    assert scheduled(app_module, DUE_AT + app_module.OVERDUE_NOTIFY_WINDOW_SECONDS) == {}
+
+
+def test_completed_or_undated_reminders_are_unscheduled(app_module):
+    for reminder in ({'id': 'r1', 'due_date': app_module.format_due_date(DUE_AT), 'completed': True}, {'id': 'r1'}):
+        operations = app_module.reminder_schedule_operations('alice', 'r1', reminder, now=DUE_AT - 48 * 3600)
+        assert all(op == 'delete' for op, path, _ in operations
+                   if path.startswith(app_module.NOTIFICATION_SCHEDULE_COLLECTION))
+
+
+def test_saving_a_reminder_writes_its_schedule(client, app_module, username):
+    reminder = client.post('/api/reminders', json={'title': 'Viva', 'due_date': '2099-12-01T09:00:00'}).get_json()['reminder']
+    for notification_type in app_module.NOTIFICATION_TYPES:
+        entry = app_module.storage.get(app_module.get_schedule_entry_path(username, reminder['id'], notification_type))
+        assert entry['due_at'] == reminder['due_at']
+
+    client.delete(f"/api/reminders/{reminder['id']}")
+    assert app_module.storage.get(app_module.get_schedule_entry_path(username, reminder['id'], 'overdue')) is None
@@ -0,0 +1,126 @@
+import pytest
+
+import mailer
+from mailer import EmailOutbox
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # The rate limiter sleeps for real; let it advance the fake clock instead
+    monkeypatch.setattr(mailer.time, 'sleep', lambda seconds: setattr(clock, 'now', clock.now + seconds))
+    return clock
+
+
+def make_outbox(clock, results, **kwargs):
+    sent = []
+
+    def send(recipient, payload):
+        sent.append((clock.now, recipient, payload))
+        return results.pop(0) if results else True
+
+    kwargs.setdefault('rate_per_minute', 0)
+    return EmailOutbox(send, clock=clock, **kwargs), sent
+
+
+def run_ready(outbox):
+    """Process every job that is due now, without worker threads"""
+    while outbox._heap and outbox._heap[0][0] <= outbox._clock():
+        outbox._process(outbox._next_job())
+
+
+def test_failed_send_is_retried_with_backoff(clock):
+    outbox, sent = make_outbox(clock, [False, False, True], retry_base=30)
+    delivered = []
+    outbox.enqueue('a@example.com', 'hi', on_sent=lambda: delivered.append(True))
+
+    run_ready(outbox)
+    clock.now += 29
+    run_ready(outbox)
+    assert len(sent) == 1
+    clock.now += 1
+    run_ready(outbox)
+    clock.now += 59
+    run_ready(outbox)
+    assert len(sent) == 2
+    clock.now += 1
+    run_ready(outbox)
+
+    assert [at - 1000 for at, _, _ in sent] == [0, 30, 90]
+    assert delivered == [True]
+    assert outbox.stats()['retried'] == 2
+    assert outbox.stats()['sent'] == 1
+
+
+def test_gives_up_after_max_retries(clock):
+    outbox, sent = make_outbox(clock, [False] * 10, max_retries=1, retry_base=1)
+    failed = []
+    outbox.enqueue('a@example.com', 'hi', on_failed=lambda: failed.append(True))
+    for _ in range(5):
+        run_ready(outbox)
+        clock.now += 10
+    assert len(sent) == 2
+    assert failed == [True]
+    assert outbox.stats()['failed'] == 1
+
+
+def test_duplicate_pending_message_is_dropped(clock):
+    outbox, sent = make_outbox(clock, [])
+    assert outbox.enqueue('a@example.com', 'first', dedup_key='r1:24h')
+    assert not outbox.enqueue('a@example.com', 'second', dedup_key='r1:24h')
+    assert outbox.enqueue('b@example.com', 'other', dedup_key='r1:24h')
+    run_ready(outbox)
+    # Once delivered the key is free again
+    assert outbox.enqueue('a@example.com', 'again', dedup_key='r1:24h')
+    assert [payload for _, _, payload in sent] == ['first', 'other']
+    assert outbox.stats()['deduplicated'] == 1
+
+
+def test_full_queue_drops_new_messages(clock):
+    outbox, _ = make_outbox(clock, [], max_queue=2)
+    assert outbox.enqueue('a@example.com', 1)
+    assert outbox.enqueue('a@example.com', 2)
+    assert not outbox.enqueue('a@example.com', 3)
+    assert outbox.stats()['dropped'] == 1
+    assert outbox.stats()['queue_depth'] == 2
+
+
+def test_before_send_can_cancel(clock):
+    outbox, sent = make_outbox(clock, [])
+    outbox.enqueue('a@example.com', 'cancelled', dedup_key='k', before_send=lambda: False)
+    outbox.enqueue('b@example.com', 'kept', before_send=lambda: True)
+    run_ready(outbox)
+    assert [payload for _, _, payload in sent] == ['kept']
+    assert outbox.stats()['cancelled'] == 1
+    assert outbox.enqueue('a@example.com', 'again', dedup_key='k')
+
+
+def test_rate_limit_spaces_out_sends(clock):
+    outbox, sent = make_outbox(clock, [], rate_per_minute=2)
+    for n in range(4):
+        outbox.enqueue('a@example.com', n)
+    run_ready(outbox)
+    # Two tokens up front, then one every 30 seconds
+    assert [at - 1000 for at, _, _ in sent] == [0, 0, 30, 60]
+
+
+def test_worker_threads_deliver(clock):
+    outbox, sent = make_outbox(clock, [])
+    outbox.start()
+    try:
+        outbox.enqueue('a@example.com', 'hi')
+        for _ in range(200):
+            if sent:
+                break
+            mailer.threading.Event().wait(0.01)
+    finally:
+        outbox.stop(timeout=2)
+    assert [payload for _, _, payload in sent] == ['hi']
@@ -0,0 +1,31 @@
+import io
+import json
+
+EXPORT = (
+    "12/10/2025, 09:15 - Asha: DBMS assignment due tomorrow 5 pm\n"
+    "12/10/2025, 09:20 - Ravi: Physics quiz on 20/10/2025\n"
+)
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_text_plain_body_is_parsed(client):
+    lines = ndjson(client.post('/api/reminders/parse-batch', data=EXPORT, content_type='text/plain'))
+    assert lines[-1]['done'] is True
+    assert lines[-1]['parsed'] == 2
+    assert lines[0]['sender'] == 'Asha'
+
+
+def test_multipart_upload_over_the_limit_is_rejected(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PARSE_BATCH_MAX_UPLOAD_BYTES', 64)
+    response = client.post('/api/reminders/parse-batch', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(EXPORT.encode('utf-8')), 'chat.txt')})
+    assert response.status_code == 413
+
+
+def test_multipart_upload_within_the_limit(client):
+    response = client.post('/api/reminders/parse-batch', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(EXPORT.encode('utf-8')), 'chat.txt')})
+    assert ndjson(response)[-1]['parsed'] == 2
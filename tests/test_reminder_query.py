@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.fixture
+def reminders(client):
+    created = []
+    for day, kind in [(5, 'assignment'), (2, 'exam'), (9, 'assignment'), (3, 'assignment'),
+                      (7, 'assignment'), (1, 'assignment'), (4, 'exam')]:
+        created.append(client.post('/api/reminders', json={
+            'title': f'{kind} {day}', 'type': kind, 'due_date': f'2099-03-{day:02d}T10:00:00'
+        }).get_json()['reminder'])
+    client.put(f"/api/reminders/{created[3]['id']}", json={'completed': True})
+    return created
+
+
+def fetch_all(client, query, limit):
+    titles, cursor, pages = [], None, 0
+    while True:
+        url = f'/api/reminders?{query}&limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        titles += [r['title'] for r in body['reminders']]
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return titles, pages, body['total']
+
+
+@pytest.mark.parametrize('sort', ['due_at', '-due_at', 'title', 'created_at'])
+def test_cursor_pages_match_the_unpaged_result(client, reminders, sort):
+    query = f'type=assignment&completed=false&sort={sort}'
+    expected = [r['title'] for r in client.get(f'/api/reminders?{query}').get_json()['reminders']]
+    titles, pages, total = fetch_all(client, query, limit=2)
+    assert titles == expected
+    assert total == len(expected) == 4
+    assert pages == 2
+
+
+def test_filters_and_order(client, reminders):
+    body = client.get('/api/reminders?type=assignment&completed=false&sort=-due_at').get_json()
+    assert [r['title'] for r in body['reminders']] == ['assignment 9', 'assignment 7', 'assignment 5', 'assignment 1']
+
+    body = client.get('/api/reminders?due_after=2099-03-02&due_before=2099-03-05&sort=due_at').get_json()
+    assert [r['title'] for r in body['reminders']] == ['exam 2', 'assignment 3', 'exam 4']
+
+
+def test_bad_cursor_is_rejected(client, reminders):
+    cursor = client.get('/api/reminders?sort=due_at&limit=1').get_json()['next_cursor']
+    assert client.get(f'/api/reminders?sort=title&limit=1&cursor={cursor}').status_code == 400
+    assert client.get('/api/reminders?sort=due_at&cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/reminders?sort=colour').status_code == 400
@@ -0,0 +1,121 @@
+def test_create_rejects_non_string_due_date(client):
+    response = client.post('/api/reminders', json={'title': 'Lab record', 'due_date': 12345})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'due_date must be a date string'
+
+
+def test_update_rejects_non_string_due_date(client):
+    reminder = client.post('/api/reminders', json={'title': 'Lab record', 'due_date': '2026-12-01T09:00:00'}).get_json()['reminder']
+    response = client.put(f"/api/reminders/{reminder['id']}", json={'due_date': ['2026-12-02']})
+    assert response.status_code == 400
+
+
+def test_upgrade_tolerates_non_string_due_date(client, app_module, username):
+    # A legacy document written before due dates were validated
+    app_module.storage.set(app_module.get_user_reminder_path(username, 'legacy'), {
+        'id': 'legacy', 'title': 'Old reminder', 'type': 'assignment', 'due_date': 12345, 'completed': False
+    })
+    app_module.reminder_list_cache.invalidate(username)
+
+    response = client.get('/api/reminders')
+    assert response.status_code == 200
+    [reminder] = response.get_json()['reminders']
+    assert reminder['due_at'] is None
+    assert app_module.reminder_due_at({'due_date': {'date': '2026-12-01'}}) is None
+
+
+def test_bulk_rejects_non_string_id_per_item(client):
+    reminder = client.post('/api/reminders', json={'title': 'Lab record', 'due_date': '2026-12-01T09:00:00'}).get_json()['reminder']
+    response = client.post('/api/reminders/bulk', json={'operations': [
+        {'op': 'complete', 'id': reminder['id']},
+        {'op': 'delete', 'id': [1]},
+    ]})
+    assert response.status_code == 400
+    results = response.get_json()['results']
+    assert results[0]['status'] == 'ok'
+    assert results[1] == {'index': 1, 'op': 'delete', 'id': [1], 'status': 'error', 'error': 'Reminder id must be a string'}
+    # Nothing was applied
+    assert client.get('/api/reminders').get_json()['reminders'][0]['completed'] is False
+
+
+def test_fix_times_keeps_changes_made_by_another_worker(client, app_module, username):
+    reminder = client.post('/api/reminders', json={
+        'title': 'Viva', 'description': 'Viva at 5:00 PM', 'due_date': '2026-12-01T09:00:00+05:30'
+    }).get_json()['reminder']
+    client.get('/api/reminders')  # warms this worker's reminder cache
+
+    # Another worker completes the reminder while the cached copy is still fresh
+    path = app_module.get_user_reminder_path(username, reminder['id'])
+    app_module.storage.update(path, {'completed': True})
+
+    assert client.post('/api/reminders/fix-times').get_json()['updated_count'] == 1
+    stored = app_module.storage.get(path)
+    assert stored['completed'] is True
+    assert stored['due_date'] == '2026-12-01T11:30:00Z'  # 5 PM IST, stored in UTC
+
+
+def create_reminder(client, title, due_date='2026-12-01T09:00:00'):
+    return client.post('/api/reminders', json={'title': title, 'due_date': due_date}).get_json()['reminder']
+
+
+def test_bulk_sees_and_keeps_writes_from_another_worker(client, app_module, username):
+    mine = create_reminder(client, 'Lab record')
+    client.get('/api/reminders')  # warms this worker's reminder cache
+
+    # Another worker creates a reminder and renames this one
+    theirs = dict(mine, id='from-other-worker', title='Seminar', dedup_key=None)
+    app_module.storage.set(app_module.get_user_reminder_path(username, theirs['id']), theirs)
+    app_module.storage.update(app_module.get_user_reminder_path(username, mine['id']), {'description': 'edited elsewhere'})
+
+    response = client.post('/api/reminders/bulk', json={'operations': [
+        {'op': 'complete', 'id': mine['id']},
+        {'op': 'delete', 'id': theirs['id']},
+    ]})
+    assert response.status_code == 200
+    stored = app_module.storage.get(app_module.get_user_reminder_path(username, mine['id']))
+    assert stored['completed'] is True
+    assert stored['description'] == 'edited elsewhere'
+    assert app_module.storage.get(app_module.get_user_reminder_path(username, theirs['id'])) is None
+
+
+def test_bulk_rejects_update_into_copy_of_untouched_reminder(client, app_module, username):
+    first = create_reminder(client, 'Lab record')
+    second = create_reminder(client, 'Seminar')
+    response = client.post('/api/reminders/bulk', json={'operations': [
+        {'op': 'update', 'id': second['id'], 'fields': {'title': 'Lab record'}},
+    ]})
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['error'] == 'Duplicate reminder detected'
+
+    # Renaming the owner in the same batch frees its key
+    response = client.post('/api/reminders/bulk', json={'operations': [
+        {'op': 'update', 'id': first['id'], 'fields': {'title': 'Lab record (old)'}},
+        {'op': 'update', 'id': second['id'], 'fields': {'title': 'Lab record'}},
+    ]})
+    assert response.status_code == 200
+    key = response.get_json()['results'][1]['reminder']['dedup_key']
+    assert app_module.storage.get(app_module.get_reminder_key_path(username, key))['reminder_id'] == second['id']
+
+
+def test_bulk_complete_requires_boolean(client):
+    reminder = create_reminder(client, 'Lab record')
+    response = client.post('/api/reminders/bulk', json={'operations': [{'op': 'complete', 'id': reminder['id'], 'completed': 'no'}]})
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['error'] == 'completed must be true or false'
+
+
+def test_idempotency_key_of_crashed_request_is_freed_after_lease(client, app_module, username, monkeypatch):
+    reminder = create_reminder(client, 'Lab record')
+    body = {'operations': [{'op': 'complete', 'id': reminder['id']}]}
+    request_hash = app_module.hashlib.sha1(app_module.json.dumps(body['operations'], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    # A request that claimed the key and then died
+    assert app_module.begin_idempotent_request(username, 'k1', request_hash) == (None, None)
+    assert client.post('/api/reminders/bulk', json=body, headers={'Idempotency-Key': 'k1'}).status_code == 409
+
+    now = app_module.time.time()
+    monkeypatch.setattr(app_module.time, 'time', lambda: now + app_module.IDEMPOTENCY_LEASE_SECONDS + 1)
+    response = client.post('/api/reminders/bulk', json=body, headers={'Idempotency-Key': 'k1'})
+    assert response.status_code == 200
+    record = app_module.storage.get(app_module.get_idempotency_path(username, 'k1'))
+    assert record['state'] == 'done'
+    assert record['expires_at'] > now + app_module.IDEMPOTENCY_TTL_SECONDS
@@ -0,0 +1,44 @@
+from storage import MemoizingStorage, MemoryStorage, ReadMemo
+
+
+def test_memory_merge_set_merges_nested_maps():
+    storage = MemoryStorage()
+    storage.set('rollups/user/months/2026-10', {'categories': {'Food': {'total': 10, 'count': 1}}, 'owner': 'a'})
+    storage.set('rollups/user/months/2026-10', {'categories': {'Travel': {'total': 5}}, 'owner': 'b'}, merge=True)
+
+    assert storage.get('rollups/user/months/2026-10') == {
+        'categories': {'Food': {'total': 10, 'count': 1}, 'Travel': {'total': 5}},
+        'owner': 'b',
+    }
+
+
+def test_update_still_replaces_nested_maps():
+    storage = MemoryStorage()
+    storage.set('docs/a', {'categories': {'Food': 1}})
+    storage.update('docs/a', {'categories': {'Travel': 2}})
+    assert storage.get('docs/a') == {'categories': {'Travel': 2}}
+
+
+def test_memoized_copy_matches_merged_document():
+    memo = ReadMemo()
+    storage = MemoizingStorage(MemoryStorage(), lambda: memo)
+    storage.set('docs/a', {'stats': {'x': 1}})
+    storage.get('docs/a')
+    storage.set('docs/a', {'stats': {'y': 2}}, merge=True)
+
+    assert storage.get('docs/a') == storage.backend.get('docs/a') == {'stats': {'x': 1, 'y': 2}}
+
+
+def test_run_transaction_writes_batch_from_its_reads():
+    memo = ReadMemo()
+    storage = MemoizingStorage(MemoryStorage(), lambda: memo)
+    storage.set('counters/a', {'n': 1})
+    storage.get('counters/a')
+    storage.backend.set('counters/a', {'n': 5})  # changed behind the memo
+
+    def bump(read):
+        n = read('counters/a')['n']
+        return [('set', 'counters/a', {'n': n + 1}), ('delete', 'counters/b', None)], n
+
+    assert storage.run_transaction(bump) == 5
+    assert storage.get('counters/a') == {'n': 6}
@@ -0,0 +1,47 @@
+def event(title):
+    return {'title': title, 'date': '2026-11-20'}
+
+
+def stored_titles(app_module, username):
+    doc = app_module.storage.get(app_module.get_user_data_path(username, 'calendar_events'))
+    return [e['title'] for e in doc['data']['events']]
+
+
+def test_calendar_write_keeps_event_added_by_another_worker(client, app_module, username):
+    client.post('/api/calendar/events', json=event('first'))
+    assert client.get('/api/calendar/events').status_code == 200  # warms this worker's cache
+
+    # Another worker adds an event while this worker's cached copy is still fresh
+    path = app_module.get_user_data_path(username, 'calendar_events')
+    doc = app_module.storage.get(path)
+    doc['data']['events'].append({'id': 'other', **event('second')})
+    app_module.storage.set(path, doc)
+
+    client.post('/api/calendar/events', json=event('third'))
+    assert stored_titles(app_module, username) == ['first', 'second', 'third']
+
+    assert client.put('/api/calendar/events/other', json=event('second (edited)')).status_code == 200
+    assert client.delete('/api/calendar/events/other').status_code == 200
+    assert stored_titles(app_module, username) == ['first', 'third']
+    assert [e['title'] for e in client.get('/api/calendar/events').get_json()] == ['first', 'third']
+
+
+def test_update_missing_calendar_event_is_404(client):
+    assert client.put('/api/calendar/events/nope', json=event('x')).status_code == 404
+    client.post('/api/calendar/events', json=event('first'))
+    response = client.put('/api/calendar/events/nope', json=event('x'))
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Event not found'
+
+
+def test_set_budget_keeps_budget_set_by_another_worker(client, app_module, username):
+    client.post('/api/budgets', json={'category': 'Food', 'amount': 100, 'month': '2026-10'})
+    client.get('/api/budgets?month=2026-10')
+
+    path = app_module.get_user_data_path(username, 'budgets')
+    doc = app_module.storage.get(path)
+    doc['data']['2026-10']['Travel'] = 50.0
+    app_module.storage.set(path, doc)
+
+    client.post('/api/budgets', json={'category': 'Books', 'amount': 20, 'month': '2026-10'})
+    assert app_module.storage.get(path)['data']['2026-10'] == {'Food': 100.0, 'Travel': 50.0, 'Books': 20.0}